@@ -65,8 +65,9 @@ latest_predictions AS (
       ORDER BY created_at DESC
     ) AS rn
   FROM {{ source('energy_data', 'prediction_results') }}
+  WHERE COALESCE(model_id, 'champion') = 'champion'  -- チャレンジャーモデルの予測は除外
   {% if is_incremental() %}
-  WHERE prediction_date >= DATE_SUB(CURRENT_DATE('Asia/Tokyo'), INTERVAL 7 DAY)
+    AND prediction_date >= DATE_SUB(CURRENT_DATE('Asia/Tokyo'), INTERVAL 7 DAY)
   {% endif %}
 )
 
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+段階的予測 推論モード ベンチマーク（hourly vs batch）
+
+BigQueryに接続せず、合成データで学習したXGBoostモデルを使って
+14日間（336時間）の段階的予測を両モードで実行し、処理時間と予測値の一致を確認する。
+
+実行方法:
+    python -m scripts.benchmark_batch_inference
+    python -m scripts.benchmark_batch_inference --repeat 5 --train-days 730
+    python -m scripts.benchmark_batch_inference --forecast-days 60   # 長期ホライズン
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.prediction.iterative_inference import FEATURES, predict_batched, predict_hourly
+
+
+def make_synthetic_inputs(train_days=365, forecast_days=14, seed=42):
+    """
+    合成の学習データ・予測期間特徴量を生成（本番と同じカラム構成）
+
+    Args:
+        train_days (int): 学習データの日数
+        forecast_days (int): 予測日数
+        seed (int): 乱数シード
+
+    Returns:
+        tuple: (ml_features_train, future_features, business_days_train, business_days_future, start_date)
+    """
+    rng = np.random.default_rng(seed)
+    start_date = pd.Timestamp('2025-07-01')
+    index = pd.date_range(start_date - pd.Timedelta(days=train_days),
+                          start_date + pd.Timedelta(days=forecast_days) - pd.Timedelta(hours=1), freq='h')
+
+    frame = pd.DataFrame(index=index)
+    frame['hour'] = index.hour
+    frame['day_of_week'] = index.dayofweek
+    frame['is_weekend'] = index.dayofweek >= 5
+    frame['is_holiday'] = rng.random(len(index)) < 0.02
+    frame['month'] = index.month
+    frame['hour_sin'] = np.sin(2 * np.pi * frame['hour'] / 24)
+    frame['hour_cos'] = np.cos(2 * np.pi * frame['hour'] / 24)
+    frame['temperature_2m'] = 15 + 10 * np.sin(2 * np.pi * index.dayofyear / 365) + rng.normal(0, 2, len(index))
+    frame['relative_humidity_2m'] = rng.uniform(30, 90, len(index))
+    frame['precipitation'] = rng.exponential(0.3, len(index))
+
+    # 実績値（時間帯・曜日・気温に依存）
+    frame['actual_power'] = (
+        3000 + 800 * np.sin(2 * np.pi * (frame['hour'] - 6) / 24)
+        - 400 * frame['is_weekend'] + 20 * (frame['temperature_2m'] - 15) ** 2 / 10
+        + rng.normal(0, 50, len(index))
+    )
+
+    business = ~frame['is_weekend'] & ~frame['is_holiday']
+    frame['lag_1_day'] = frame['actual_power'].shift(24)
+    frame['lag_7_day'] = frame['actual_power'].shift(24 * 7)
+    frame['lag_1_business_day'] = frame['actual_power'].where(business).shift(24).ffill()
+
+    ml_features_train = frame[frame.index < start_date].copy()
+    future_features = frame[frame.index >= start_date].drop(
+        columns=['actual_power', 'lag_1_day', 'lag_7_day', 'lag_1_business_day']
+    )
+
+    lookback_start = start_date - pd.Timedelta(days=20)
+    business_days_train = ml_features_train[
+        (ml_features_train.index >= lookback_start) &
+        (~ml_features_train['is_holiday']) &
+        (~ml_features_train['is_weekend'])
+    ][['actual_power']]
+
+    calendar = future_features[['is_weekend', 'is_holiday']].groupby(future_features.index.date).first()
+    business_days_future = calendar[(~calendar['is_holiday']) & (~calendar['is_weekend'])].index
+
+    return ml_features_train, future_features, business_days_train, business_days_future, start_date
+
+
+def train_model(ml_features_train):
+    """本番と同じ設定でXGBoostモデルを学習"""
+    model = xgb.XGBRegressor(n_estimators=200, max_depth=8, learning_rate=0.05, random_state=42, verbosity=0)
+    model.fit(ml_features_train[FEATURES], ml_features_train['actual_power'])
+    return model
+
+
+def time_mode(predict_func, model, inputs, repeat, forecast_days=14):
+    """推論関数をrepeat回実行し、最速時間と予測結果を返す"""
+    ml_features_train, future_features, business_days_train, business_days_future, start_date = inputs
+    best = float('inf')
+    predictions = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        # 日次の進捗表示は計測対象外にする
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictions = predict_func(
+                model, start_date, forecast_days, future_features, ml_features_train,
+                business_days_train, business_days_future
+            )
+        best = min(best, time.perf_counter() - started)
+    return best, predictions
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='段階的予測 推論モードベンチマーク')
+    parser.add_argument('--train-days', type=int, default=365, help='合成学習データの日数 (デフォルト: 365)')
+    parser.add_argument('--forecast-days', type=int, default=14, help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最速値を採用） (デフォルト: 3)')
+    args = parser.parse_args()
+
+    inputs = make_synthetic_inputs(train_days=args.train_days, forecast_days=args.forecast_days)
+    model = train_model(inputs[0])
+    print(f"学習データ: {len(inputs[0]):,}件, 予測: {args.forecast_days}日×24時間")
+
+    hourly_seconds, hourly_predictions = time_mode(predict_hourly, model, inputs, args.repeat, args.forecast_days)
+    batch_seconds, batch_predictions = time_mode(predict_batched, model, inputs, args.repeat, args.forecast_days)
+
+    keys = sorted(hourly_predictions)
+    max_diff = float(np.max(np.abs(
+        np.array([hourly_predictions[k] for k in keys]) - np.array([batch_predictions[k] for k in keys])
+    )))
+
+    print("=" * 60)
+    print(f"hourly: {hourly_seconds * 1000:8.1f} ms  (predict {len(hourly_predictions)}回)")
+    print(f"batch : {batch_seconds * 1000:8.1f} ms  (inplace_predict {args.forecast_days}回)")
+    print(f"高速化: {hourly_seconds / batch_seconds:.1f}倍")
+    print(f"予測値の最大差: {max_diff:.6f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
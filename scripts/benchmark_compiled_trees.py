@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+推論バックエンド マイクロベンチマーク（XGBoost vs NumPy平坦化決定木）
+
+合成データで学習したXGBoostモデル（本番と同じ設定）について、
+24行（batchモード1日分）・336行（14日分）のバッチで1回あたりの推論時間を計測し、
+xgb_model.predict との予測値の一致（float32の許容誤差内）を確認する。
+
+実行方法:
+    python -m scripts.benchmark_compiled_trees
+    python -m scripts.benchmark_compiled_trees --repeat 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from scripts.benchmark_batch_inference import make_synthetic_inputs, train_model
+from src.prediction.compiled_trees import CompiledTreeEnsemble
+from src.prediction.iterative_inference import FEATURES
+
+
+def time_call(func, X, repeat):
+    """funcをrepeat回実行し、1回あたりの中央値（マイクロ秒）を返す"""
+    func(X)  # ウォームアップ
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(X)
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples)) * 1e6
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='推論バックエンド マイクロベンチマーク')
+    parser.add_argument('--train-days', type=int, default=365, help='合成学習データの日数 (デフォルト: 365)')
+    parser.add_argument('--repeat', type=int, default=200, help='計測回数（中央値を採用） (デフォルト: 200)')
+    args = parser.parse_args()
+
+    ml_features_train = make_synthetic_inputs(train_days=args.train_days)[0]
+    model = train_model(ml_features_train)
+    booster = model.get_booster()
+
+    started = time.perf_counter()
+    compiled = CompiledTreeEnsemble.from_model(model)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    print(f"木の数: {len(compiled.roots)}, ノード数: {len(compiled.threshold):,}, 最大深さ: {compiled.max_depth}, "
+          f"変換時間: {compile_ms:.1f} ms")
+    print("=" * 60)
+    print(f"{'行数':>6} {'predict':>12} {'inplace':>12} {'numpy':>12} {'最大誤差':>12}")
+
+    for rows in (24, 336):
+        X = ml_features_train[FEATURES].tail(rows).to_numpy(dtype=np.float32)
+        expected = model.predict(X)
+        max_diff = float(np.max(np.abs(compiled.predict(X) - expected)))
+        if not np.allclose(compiled.predict(X), expected, rtol=1e-5, atol=1e-2):
+            raise AssertionError(f"予測値が一致しません（{rows}行・最大誤差 {max_diff}）")
+
+        predict_us = time_call(model.predict, X, args.repeat)
+        inplace_us = time_call(booster.inplace_predict, X, args.repeat)
+        numpy_us = time_call(compiled.predict, X, args.repeat)
+        print(f"{rows:>6} {predict_us:>10.0f}us {inplace_us:>10.0f}us {numpy_us:>10.0f}us {max_diff:>12.6f}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
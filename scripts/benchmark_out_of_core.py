@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ストリーミング学習（out-of-core）ベンチマーク
+
+合成データで学習データキャッシュ（月単位Parquet）を作り、学習期間（年数）を変えながら
+従来方式（全期間をDataFrameに読み込んでXGBRegressor.fit）とストリーミング学習
+（quantile / external）の処理時間・ピークRSSを比較する。
+ピークRSSを正しく測るため、各方式は別プロセスで実行する。
+
+実行方法:
+    python -m scripts.benchmark_out_of_core
+    python -m scripts.benchmark_out_of_core --years 5 20 40 --batch-rows 32768
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+MODES = ('pandas', 'quantile', 'external')
+
+
+def write_synthetic_cache(cache_dir, years):
+    """合成の学習データを月単位パーティションとして書き込み"""
+    from scripts.benchmark_batch_inference import make_synthetic_inputs
+    from src.prediction.training_data_cache import TrainingDataCache
+
+    frame = make_synthetic_inputs(train_days=365 * years, forecast_days=1)[0]
+    frame['date'] = frame.index.normalize()
+    frame['supply_capacity'] = frame['actual_power'] * 1.1
+    frame['weather_code'] = 0
+
+    cache = TrainingDataCache(cache_dir)
+    df = cache._normalize(frame.reset_index(drop=True))
+    cache._write_partitions(df, set(pd.to_datetime(df['date']).dt.strftime('%Y%m')))
+    return len(df)
+
+
+def run_worker(mode, cache_dir, batch_rows):
+    """1方式を実行し、結果をJSONで標準出力に書く（子プロセス）"""
+    from src.prediction.out_of_core import peak_rss_mb, train_out_of_core
+    from src.prediction.prediction_iterative_with_export import XGB_PARAMS
+    from src.prediction.training_data_cache import TrainingDataCache
+
+    cache = TrainingDataCache(cache_dir)
+    started = time.perf_counter()
+    if mode == 'pandas':
+        from src.prediction.feature_frame import to_feature_frame
+        from src.prediction.iterative_inference import FEATURES
+        from src.prediction.training_engine import train_model
+
+        frame = to_feature_frame(cache._read_partitions())
+        train_model(frame[FEATURES], frame['actual_power'], XGB_PARAMS)
+    else:
+        train_out_of_core(XGB_PARAMS, matrix=mode, training_cache=cache, batch_rows=batch_rows)
+    print(json.dumps({'seconds': time.perf_counter() - started, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='ストリーミング学習 ベンチマーク')
+    parser.add_argument('--years', type=int, nargs='+', default=[5, 20, 40], help='学習データの年数 (デフォルト: 5 20 40)')
+    parser.add_argument('--batch-rows', type=int, default=8192, help='1バッチの目安行数 (デフォルト: 8192)')
+    parser.add_argument('--worker', nargs=2, metavar=('MODE', 'CACHE_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], args.worker[1], args.batch_rows)
+        return
+
+    print(f"{'年数':>4} {'行数':>10}  " + '  '.join(f"{mode + '[秒/MB]':>18}" for mode in MODES))
+    print("=" * 80)
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rows = write_synthetic_cache(cache_dir, years)
+            cells = []
+            for mode in MODES:
+                completed = subprocess.run(
+                    [sys.executable, '-m', 'scripts.benchmark_out_of_core',
+                     '--worker', mode, cache_dir, '--batch-rows', str(args.batch_rows)],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                cells.append(f"{result['seconds']:>8.2f} / {result['peak_rss_mb']:>7.0f}")
+            print(f"{years:>4} {rows:>10,}  " + '  '.join(f"{cell:>18}" for cell in cells))
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+学習エンジン ベンチマーク（sklearn vs hist）
+
+合成データで学習データの期間（年数）を変えながら、両エンジンの学習時間と
+histエンジンのフェーズ別処理時間（行列作成・ブースティング・評価、refit=Trueの場合は再学習も）を計測する。
+
+実行方法:
+    python -m scripts.benchmark_training_engine
+    python -m scripts.benchmark_training_engine --years 1 3 5 --nthread 4
+"""
+
+import argparse
+import time
+
+from scripts.benchmark_batch_inference import make_synthetic_inputs
+from src.prediction.iterative_inference import FEATURES
+from src.prediction.prediction_iterative_with_export import XGB_PARAMS
+from src.prediction.training_engine import load_engine_config, train_model
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='学習エンジン ベンチマーク')
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 5], help='学習データの年数 (デフォルト: 1 3 5)')
+    parser.add_argument('--nthread', type=int, help='学習スレッド数 (デフォルト: CPUコア数)')
+    args = parser.parse_args()
+
+    print(f"{'年数':>4} {'行数':>8} {'sklearn':>9} {'hist':>9} {'本数':>6}  histフェーズ別")
+    print("=" * 80)
+    for years in args.years:
+        ml_features_train = make_synthetic_inputs(train_days=365 * years)[0]
+        X_train = ml_features_train[FEATURES]
+        y_train = ml_features_train['actual_power']
+
+        started = time.perf_counter()
+        train_model(X_train, y_train, XGB_PARAMS, load_engine_config('sklearn', nthread=args.nthread))
+        sklearn_sec = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _, stats = train_model(X_train, y_train, XGB_PARAMS, load_engine_config('hist', nthread=args.nthread))
+        hist_sec = time.perf_counter() - started
+
+        phases = ', '.join(f"{phase} {seconds:.2f}" for phase, seconds in stats['timings'].items())
+        print(f"{years:>4} {len(X_train):>8,} {sklearn_sec:>8.2f}s {hist_sec:>8.2f}s {stats['boost_rounds']:>6}  {phases}")
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+差分学習（warm start）ベンチマーク
+
+合成データで「毎日全期間を学習し直す」場合と「前日のモデルに直近期間で木を追加する」場合を
+数日分シミュレーションし、1日ごとの学習時間と翌日（学習データ外）のMAPEを比較する。
+差分学習側はfull_retrain_days・drift_mapeの判定（plan_warm_start）も本番と同じく行う。
+
+実行方法:
+    python -m scripts.benchmark_warm_start
+    python -m scripts.benchmark_warm_start --days 10 --train-days 1095 --full-retrain-days 7
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from scripts.benchmark_batch_inference import make_synthetic_inputs
+from src.prediction.iterative_inference import FEATURES
+from src.prediction.prediction_iterative_with_export import XGB_PARAMS
+from src.prediction.training_engine import (
+    _mape, load_warm_start_config, plan_warm_start, train_model, warm_start_model
+)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='差分学習 ベンチマーク')
+    parser.add_argument('--days', type=int, default=8, help='シミュレーションする日数 (デフォルト: 8)')
+    parser.add_argument('--train-days', type=int, default=1095, help='初日の学習データ日数 (デフォルト: 1095)')
+    parser.add_argument('--full-retrain-days', type=int, help='全期間で学習し直す間隔（日）')
+    parser.add_argument('--drift-mape', type=float, help='全期間で学習し直す新着期間MAPEのしきい値（%%）')
+    args = parser.parse_args()
+
+    config = load_warm_start_config(full_retrain_days=args.full_retrain_days, drift_mape=args.drift_mape)
+    ml_features = make_synthetic_inputs(train_days=args.train_days + args.days + 1)[0]
+    first_end = ml_features.index.min() + pd.Timedelta(days=args.train_days)
+
+    previous_model, previous_fingerprint = None, None
+    print(f"{'日':>3} {'全期間[秒]':>10} {'MAPE':>6} {'差分[秒]':>9} {'MAPE':>6} {'本数':>5}  判定")
+    print("=" * 80)
+    full_total = warm_total = 0.0
+    for day in range(args.days):
+        train_end = first_end + pd.Timedelta(days=day)
+        train = ml_features[ml_features.index < train_end]
+        test = ml_features[(ml_features.index >= train_end) & (ml_features.index < train_end + pd.Timedelta(days=1))]
+        X_train, y_train = train[FEATURES], train['actual_power']
+
+        started = time.perf_counter()
+        full_model, _ = train_model(X_train, y_train, XGB_PARAMS)
+        full_sec = time.perf_counter() - started
+
+        started = time.perf_counter()
+        plan = plan_warm_start(previous_model, previous_fingerprint, X_train, y_train, config)
+        if plan['mode'] == 'warm_start':
+            model, _ = warm_start_model(previous_model, X_train, y_train, XGB_PARAMS, config)
+            lineage = {'full_max_datetime': (previous_fingerprint.get('lineage') or {}).get(
+                'full_max_datetime', previous_fingerprint['max_datetime'])}
+        else:
+            model = full_model
+            lineage = {'full_max_datetime': str(X_train.index.max())}
+        # 全期間学習の場合は上で学習済みのモデルを流用するため、その学習時間を加える
+        warm_sec = time.perf_counter() - started + (full_sec if plan['mode'] == 'full' else 0.0)
+        previous_model = model
+        previous_fingerprint = {'max_datetime': str(X_train.index.max()), 'lineage': lineage}
+
+        full_total += full_sec
+        warm_total += warm_sec
+        print(f"{day + 1:>3} {full_sec:>10.2f} {_mape(full_model, test[FEATURES], test['actual_power']):>5.2f}% "
+              f"{warm_sec:>9.2f} {_mape(model, test[FEATURES], test['actual_power']):>5.2f}% "
+              f"{model.get_booster().num_boosted_rounds():>5}  {plan['mode']} ({plan['reason']})")
+
+    print("=" * 80)
+    print(f"合計: 全期間 {full_total:.2f}秒, 差分 {warm_total:.2f}秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+-- prediction_results / prediction_accuracy にmodel_idカラムを追加
+-- チャンピオン/チャレンジャー予測（--challengers）導入前の既存テーブル用
+
+ALTER TABLE `prod_energy_data.prediction_results`
+  ADD COLUMN IF NOT EXISTS model_id STRING OPTIONS(description = 'モデルID（本番モデルは champion・NULLは導入前の本番モデル）');
+
+ALTER TABLE `prod_energy_data.prediction_accuracy`
+  ADD COLUMN IF NOT EXISTS model_id STRING OPTIONS(description = 'モデルID（champion＝本番モデル・それ以外はチャレンジャー）');
+
+-- 既存行は本番モデルの予測
+UPDATE `prod_energy_data.prediction_accuracy`
+SET model_id = 'champion'
+WHERE model_id IS NULL;
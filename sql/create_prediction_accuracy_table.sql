@@ -10,6 +10,7 @@ CREATE TABLE `prod_energy_data.prediction_accuracy` (
   execution_id STRING NOT NULL,              -- 実行ID（process_execution_logと紐付け）
   prediction_run_date DATE NOT NULL,         -- 予測実行日（パーティション用）
   prediction_run_datetime DATETIME NOT NULL, -- 予測実行日時（いつ予測したか）
+  model_id STRING,                           -- モデルID（'champion'＝本番モデル・それ以外はチャレンジャー・NULLは導入前の本番モデル）
 
   -- 予測対象情報
   prediction_date DATE NOT NULL,             -- 予測対象日
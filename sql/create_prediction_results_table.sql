@@ -7,6 +7,7 @@ CREATE OR REPLACE TABLE `prod_energy_data.prediction_results` (
   prediction_date DATE NOT NULL,       -- 予測対象日
   prediction_hour INT64 NOT NULL,      -- 予測対象時間（0-23）
   predicted_power_kwh FLOAT64 NOT NULL,-- 予測電力量（kWh）
+  model_id STRING,                     -- モデルID（本番モデルは'champion'・NULLは導入前の本番モデル）
   created_at DATETIME NOT NULL         -- レコード作成日時
 )
 PARTITION BY prediction_run_date
@@ -0,0 +1,23 @@
+-- prediction_scenario_bands テーブル作成
+-- 気象シナリオ予測（気温・湿度の摂動シナリオ）のパーセンタイル帯を保存するテーブル
+
+CREATE OR REPLACE TABLE `prod_energy_data.prediction_scenario_bands` (
+  execution_id STRING NOT NULL,        -- 実行ID（prediction_resultsと紐付け）
+  prediction_run_date DATE NOT NULL,   -- 予測実行日
+  prediction_date DATE NOT NULL,       -- 予測対象日
+  prediction_hour INT64 NOT NULL,      -- 予測対象時間（0-23）
+  scenario_count INT64 NOT NULL,       -- シナリオ数
+  base_power_kwh FLOAT64,              -- 予報そのまま（baseシナリオ）の予測電力量（kWh）
+  p10_power_kwh FLOAT64 NOT NULL,      -- 10パーセンタイル（kWh）
+  p50_power_kwh FLOAT64 NOT NULL,      -- 中央値（kWh）
+  p90_power_kwh FLOAT64 NOT NULL,      -- 90パーセンタイル（kWh）
+  min_power_kwh FLOAT64 NOT NULL,      -- 最小値（kWh）
+  max_power_kwh FLOAT64 NOT NULL,      -- 最大値（kWh）
+  created_at DATETIME NOT NULL         -- レコード作成日時
+)
+PARTITION BY prediction_run_date
+CLUSTER BY execution_id, prediction_hour
+OPTIONS(
+  description = '気象シナリオアンサンブルによる電力使用量予測のパーセンタイル帯テーブル',
+  labels = [("env", "production"), ("data_type", "prediction")]
+);
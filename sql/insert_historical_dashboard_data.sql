@@ -31,6 +31,7 @@ WITH latest_predictions AS (
       ORDER BY created_at DESC
     ) as rn
   FROM `prod_energy_data.prediction_results`
+  WHERE COALESCE(model_id, 'champion') = 'champion'  -- チャレンジャーモデルの予測は除外
 )
 SELECT
   e.date,
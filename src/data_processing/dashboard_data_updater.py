@@ -139,6 +139,7 @@ class DashboardDataUpdater:
                 ) as rn
               FROM `{self.project_id}.{self.dataset_id}.prediction_results`
               WHERE prediction_date >= DATE_SUB(CURRENT_DATE('Asia/Tokyo'), INTERVAL 7 DAY)
+                AND COALESCE(model_id, 'champion') = 'champion'  -- チャレンジャーモデルの予測は除外
             )
             SELECT
               e.date,
@@ -6,14 +6,35 @@
     python -m src.data_processing.data_downloader --days 7     # 過去7日分
     python -m src.data_processing.data_downloader --month 202505  # 指定月
     python -m src.data_processing.data_downloader --date 20250501  # 特定日
+    python -m src.data_processing.data_downloader --no-cache   # 条件付きGETを使わず必ず再取得
+    python -m src.data_processing.data_downloader --from-month 201604  # 201604～今月をBigQueryまで一括投入（中断後は続きから）
+    python -m src.data_processing.data_downloader --poll-interval 300  # 当日CSVを5分間隔で取得し、確定した時間帯を随時投入
+
+ダウンロードキャッシュ:
+    月ごとのZIPのETag・Last-Modifiedを {base_dir}/{YYYYMM}/zip/{YYYYMM}.cache.json に保存し、
+    次回は If-None-Match / If-Modified-Since を付けて取得する。
+    サーバーが304（更新なし）を返した場合はZIPを保存し直さず、保存済みZIPから対象日のCSVを解凍する
+    （解凍済みCSVはPOWER_BQ_LOADが投入後に削除するため、304でも毎回解凍する）。
+
+ストリーミング取得・選択解凍:
+    ZIPはレスポンス全体をメモリに保持せず、チャンク単位でファイルに書き込みながらSHA-256を計算する。
+    解凍は必要な日（--days の対象日）のCSVだけを行い、iter_day_csvs() でZIPから直接読むこともできる。
+
+並列取得:
+    複数月は接続プールを共有するrequests.Sessionとスレッドプール（--workers、デフォルト: 4）で並行して取得する。
+    月ごとの成功・失敗の判定とTEPCO_APIログは逐次取得の場合と同じ。
 """
 
 import os
+import hashlib
 import zipfile
 import requests
 import argparse
+import sys
 import uuid
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from pathlib import Path
@@ -23,14 +44,22 @@ class PowerDataDownloader:
     """東京電力でんき予報データダウンローダー"""
     
     BASE_URL = "https://www.tepco.co.jp/forecast/html/images"
+
+    # ストリーミング取得のチャンクサイズ（バイト）
+    CHUNK_SIZE = 64 * 1024
+
+    # 複数月を並行取得するスレッド数
+    DEFAULT_MAX_WORKERS = 4
     
-    def __init__(self, base_dir=None):
+    def __init__(self, base_dir=None, use_cache=True, max_workers=None):
         """
         初期化
 
         Args:
             base_dir (str): データ保存先のベースディレクトリ
                           Noneの場合は環境変数ENERGY_ENV_PATHから取得
+            use_cache (bool): ETag・Last-Modifiedによる条件付きGETを使うか
+            max_workers (int): 複数月を並行取得するスレッド数（Noneの場合はDEFAULT_MAX_WORKERS）
         """
         if base_dir is None:
             energy_env_path = os.getenv('ENERGY_ENV_PATH')
@@ -42,7 +71,17 @@ class PowerDataDownloader:
             self.log_dir = Path(base_dir).parent.parent / 'logs' / 'tepco_api'
 
         self.base_dir = Path(base_dir)
+        self.use_cache = use_cache
+        self.max_workers = max(1, max_workers or self.DEFAULT_MAX_WORKERS)
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._log_lock = threading.Lock()
+
+        # HTTPセッション（スレッド間で接続プールを共有・TLSハンドシェイクを再利用）
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'User-Agent': 'energy-env-power-downloader/1.0'})
 
         # BigQuery設定
         self.bq_client = bigquery.Client()
@@ -62,7 +101,8 @@ class PowerDataDownloader:
         log_file = self.log_dir / f"{log_date}_tepco_execution.jsonl"
 
         try:
-            with open(log_file, 'a', encoding='utf-8') as f:
+            # 並行取得時に行が混ざらないよう排他
+            with self._log_lock, open(log_file, 'a', encoding='utf-8') as f:
                 f.write(json.dumps(log_data, ensure_ascii=False) + '\n')
         except Exception as e:
             print(f"ログファイル書き込み失敗: {e}")
@@ -132,16 +172,149 @@ class PowerDataDownloader:
         print(f"日付 {date_str} に対応する月: {month}")
         return month
     
-    def download_month_data(self, yyyymm, target_date=None):
+    def _cache_meta_path(self, yyyymm):
+        """ダウンロードキャッシュ（ETag・Last-Modified）のパス"""
+        return self.base_dir / yyyymm / "zip" / f"{yyyymm}.cache.json"
+
+    def _read_cache_meta(self, yyyymm):
+        """
+        ダウンロードキャッシュ読み込み
+
+        ZIP本体が存在しない・メタデータが破損している場合はNone（通常のGETで再取得）
+        ※ 解凍済みCSVはPOWER_BQ_LOADが投入後に削除するため、有無は条件にしない
+
+        Returns:
+            dict | None: {'etag', 'last_modified', 'bytes', 'downloaded_at'}
+        """
+        meta_path = self._cache_meta_path(yyyymm)
+        zip_path = meta_path.with_name(f"{yyyymm}.zip")
+        if not self.use_cache or not meta_path.exists() or not zip_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"ダウンロードキャッシュ読み込み失敗（再取得します）: {e}")
+            return None
+
+    def _write_cache_meta(self, yyyymm, response, content_bytes, sha256=None):
+        """ダウンロードキャッシュ書き込み（ZIP保存・解凍の完了後に呼ぶ）"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        meta_path = self._cache_meta_path(yyyymm)
+        if etag is None and last_modified is None:
+            # 検証用ヘッダーがなければ条件付きGETはできない
+            meta_path.unlink(missing_ok=True)
+            return
+
+        meta = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'bytes': content_bytes,
+            'sha256': sha256,
+            'downloaded_at': datetime.now().isoformat(),
+        }
+        tmp_path = meta_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def get_required_dates(self, days=5):
+        """
+        指定日数分の日付を月ごとに取得（選択解凍用）
+
+        Args:
+            days (int): 昨日から遡る日数（デフォルト: 5）
+
+        Returns:
+            dict: {月 (YYYYMM): 日付文字列 (YYYYMMDD) のセット}
+        """
+        yesterday = datetime.now() - timedelta(days=1)
+        required = {}
+        for i in range(days + 1):
+            date = yesterday - timedelta(days=i)
+            required.setdefault(date.strftime('%Y%m'), set()).add(date.strftime('%Y%m%d'))
+        return required
+
+    def _stream_to_file(self, response, zip_path):
+        """
+        レスポンスをチャンク単位でZIPファイルに書き込みながらSHA-256を計算
+
+        一時ファイルに書き込んでから置き換えるため、途中で失敗しても前回のZIPは壊れない。
+
+        Returns:
+            tuple: (書き込みバイト数, SHA-256の16進文字列)
+        """
+        digest = hashlib.sha256()
+        written = 0
+        part_path = zip_path.with_suffix('.zip.part')
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+            os.replace(part_path, zip_path)
+        finally:
+            part_path.unlink(missing_ok=True)
+        return written, digest.hexdigest()
+
+    @staticmethod
+    def _select_members(zip_ref, dates=None):
+        """ZIP内のCSVのうち、対象日（ファイル名先頭のYYYYMMDD）のものを選択（datesがNoneなら全件）"""
+        members = [info for info in zip_ref.infolist() if not info.is_dir()]
+        if dates is None:
+            return members
+        return [info for info in members if Path(info.filename).name[:8] in dates]
+
+    def extract_days(self, yyyymm, dates=None):
+        """
+        保存済みZIPから対象日のCSVだけを解凍
+
+        Args:
+            yyyymm (str): 年月 (YYYYMM形式)
+            dates (set): 対象日 (YYYYMMDD形式) のセット（Noneの場合は全ファイル）
+
+        Returns:
+            list: 解凍したファイル名
+        """
+        month_dir = self.base_dir / yyyymm
+        zip_path = month_dir / "zip" / f"{yyyymm}.zip"
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = self._select_members(zip_ref, dates)
+            for info in members:
+                zip_ref.extract(info, month_dir)
+        return [info.filename for info in members]
+
+    def iter_day_csvs(self, yyyymm, dates=None, encoding='shift_jis'):
+        """
+        保存済みZIPから対象日のCSVを解凍ファイルを作らずに読む
+
+        Args:
+            yyyymm (str): 年月 (YYYYMM形式)
+            dates (set): 対象日 (YYYYMMDD形式) のセット（Noneの場合は全ファイル）
+            encoding (str): CSVの文字コード
+
+        Yields:
+            tuple: (ファイル名, CSVの内容（文字列）)
+        """
+        zip_path = self.base_dir / yyyymm / "zip" / f"{yyyymm}.zip"
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for info in self._select_members(zip_ref, dates):
+                with zip_ref.open(info) as f:
+                    yield Path(info.filename).name, f.read().decode(encoding)
+
+    def download_month_data(self, yyyymm, target_date=None, dates=None):
         """
         指定月のデータをダウンロード・解凍
 
         Args:
             yyyymm (str): 年月 (YYYYMM形式)
             target_date (str): 対象日付 (YYYY-MM-DD形式、ログ用)
+            dates (set): 解凍する日 (YYYYMMDD形式) のセット（Noneの場合はZIP内の全ファイル）
 
         Returns:
-            bool: ダウンロード成功時True
+            bool: ダウンロード成功時True（304: 更新なしの場合もTrue）
 
         Raises:
             requests.exceptions.RequestException: ダウンロードエラー
@@ -164,17 +337,25 @@ class PowerDataDownloader:
             month_dir.mkdir(parents=True, exist_ok=True)
             zip_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # ZIPダウンロード
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-
-            # ZIP保存
-            with open(zip_path, 'wb') as f:
-                f.write(response.content)
-
-            # ZIP解凍
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(month_dir)
+            # 前回取得時のETag・Last-Modifiedがあれば条件付きGET
+            cache_meta = self._read_cache_meta(yyyymm)
+            headers = {}
+            if cache_meta:
+                if cache_meta.get('etag'):
+                    headers['If-None-Match'] = cache_meta['etag']
+                if cache_meta.get('last_modified'):
+                    headers['If-Modified-Since'] = cache_meta['last_modified']
+
+            # ZIPダウンロード（チャンク単位でファイルに書き込み・メモリに全体を保持しない）
+            with self.session.get(url, headers=headers, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                cache_hit = response.status_code == 304
+                bytes_transferred, sha256 = (0, None) if cache_hit else self._stream_to_file(response, zip_path)
+
+            # 対象日のCSVだけ解凍（304の場合は保存済みZIPから）
+            extracted = self.extract_days(yyyymm, dates)
+            if not cache_hit:
+                self._write_cache_meta(yyyymm, response, bytes_transferred, sha256)
 
             # 成功ログ記録
             completed_at = datetime.now()
@@ -192,11 +373,23 @@ class PowerDataDownloader:
                 "duration_seconds": duration_seconds,
                 "records_processed": None,
                 "file_size_mb": file_size_mb,
-                "additional_info": json.dumps({"month": yyyymm, "url": url})
+                "additional_info": json.dumps({
+                    "month": yyyymm,
+                    "url": url,
+                    "http_status": response.status_code,
+                    "cache_hit": cache_hit,
+                    "bytes_transferred": bytes_transferred,
+                    "sha256": sha256,
+                    "extracted_files": len(extracted),
+                })
             }
 
             self._write_log(log_data)
-            print(f"{yyyymm} データのダウンロード・解凍が完了しました: {month_dir}")
+            if cache_hit:
+                print(f"{yyyymm} データは前回取得時から更新されていません（304・保存済みZIPから{len(extracted)}ファイル解凍）: {month_dir}")
+            else:
+                print(f"{yyyymm} データのダウンロード・解凍が完了しました: {month_dir} "
+                      f"({bytes_transferred:,} bytes, {len(extracted)}ファイル解凍)")
             return True
 
         except requests.exceptions.HTTPError as e:
@@ -267,6 +460,34 @@ class PowerDataDownloader:
             print(f"Error downloading {yyyymm}: {e}")
             raise
     
+    def _download_month_result(self, month, dates):
+        """1ヶ月分をダウンロードし、成功・失敗を返す（例外は失敗として扱う）"""
+        try:
+            return self.download_month_data(month, dates=dates)
+        except Exception as e:
+            print(f"Failed to download {month}: {e}")
+            return False
+
+    def download_months(self, months):
+        """
+        複数月を共有セッション・スレッドプールで並行ダウンロード
+
+        Args:
+            months (dict): {月 (YYYYMM): 解凍する日 (YYYYMMDD) のセット（Noneは全ファイル）}
+
+        Returns:
+            dict: ダウンロード結果 {'success': [...], 'failed': [...]}（それぞれ月の昇順）
+        """
+        ordered = sorted(months)
+        workers = min(self.max_workers, len(ordered)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tepco') as executor:
+            outcomes = list(executor.map(lambda month: self._download_month_result(month, months[month]), ordered))
+
+        results = {'success': [], 'failed': []}
+        for month, ok in zip(ordered, outcomes):
+            results['success' if ok else 'failed'].append(month)
+        return results
+
     def download_for_days(self, days=5):
         """
         指定日数分のデータをダウンロード
@@ -277,20 +498,10 @@ class PowerDataDownloader:
         Returns:
             dict: ダウンロード結果 {'success': [...], 'failed': [...]}
         """
-        months = self.get_required_months(days)
-        results = {'success': [], 'failed': []}
-        
-        for month in sorted(months):
-            try:
-                if self.download_month_data(month):
-                    results['success'].append(month)
-                else:
-                    results['failed'].append(month)
-            except Exception as e:
-                print(f"Failed to download {month}: {e}")
-                results['failed'].append(month)
-        
-        return results
+        # 月と解凍する日は同じ基準日から求める（日付をまたいだ実行で月と日がずれないようにする）
+        required_dates = self.get_required_dates(days)
+        print(f"過去{days}日分に必要な月: {sorted(required_dates)}")
+        return self.download_months(required_dates)
     
     def download_for_month(self, yyyymm):
         """
@@ -314,18 +525,7 @@ class PowerDataDownloader:
             current_month_str = current_month.strftime('%Y%m')
             raise ValueError(f"未来の月は指定できません: {yyyymm} (今月: {current_month_str})")
 
-        results = {'success': [], 'failed': []}
-        
-        try:
-            if self.download_month_data(yyyymm):
-                results['success'].append(yyyymm)
-            else:
-                results['failed'].append(yyyymm)
-        except Exception as e:
-            print(f"Failed to download {yyyymm}: {e}")
-            results['failed'].append(yyyymm)
-        
-        return results
+        return self.download_months({yyyymm: None})
     
     def download_for_date(self, date_str):
         """
@@ -341,7 +541,7 @@ class PowerDataDownloader:
         results = {'success': [], 'failed': []}
 
         try:
-            if self.download_month_data(month):
+            if self.download_month_data(month, dates={date_str}):
                 results['success'].append(month)
             else:
                 results['failed'].append(month)
@@ -372,6 +572,18 @@ def main():
                        help='特定日をダウンロード (YYYYMMDD形式)')
     parser.add_argument('--base-dir', type=str, default=default_base_dir,
                        help=f'保存先ディレクトリ (デフォルト: {default_base_dir})')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='ETag・Last-Modifiedによる条件付きGETを使わず必ず再取得する')
+    parser.add_argument('--from-month', type=str,
+                       help='バックフィル開始月 (YYYYMM形式、ダウンロード・解析・BigQuery投入まで行う)')
+    parser.add_argument('--to-month', type=str,
+                       help='バックフィル終了月 (YYYYMM形式、デフォルト: 今月)')
+    parser.add_argument('--poll-interval', type=int,
+                       help='当日データの随時取得モード: 取得間隔（秒）。確定した時間帯だけBigQueryに投入する')
+    parser.add_argument('--poll-count', type=int,
+                       help='随時取得の回数 (デフォルト: Ctrl+Cまで繰り返す)')
+    parser.add_argument('--workers', type=int, default=PowerDataDownloader.DEFAULT_MAX_WORKERS,
+                       help=f'複数月を並行取得するスレッド数 (デフォルト: {PowerDataDownloader.DEFAULT_MAX_WORKERS})')
     
     args = parser.parse_args()
     
@@ -379,17 +591,19 @@ def main():
     specified_args = [
         bool(args.month),
         bool(args.date),
+        bool(args.from_month),
+        bool(args.poll_interval),
         args.days != 5  # デフォルト値以外が指定された場合
     ]
     
     if sum(specified_args) > 1:
-        print("エラー: --days, --month, --date は同時に指定できません")
+        print("エラー: --days, --month, --date, --from-month, --poll-interval は同時に指定できません")
         print("   1つの実行で1つの処理のみ可能です")
         return
 
     # ダウンローダー初期化
     try:
-        downloader = PowerDataDownloader(args.base_dir)
+        downloader = PowerDataDownloader(args.base_dir, use_cache=not args.no_cache, max_workers=args.workers)
     except ValueError as e:
         print(f"エラー: {e}")
         print("   ENERGY_ENV_PATH環境変数を設定してください")
@@ -398,8 +612,37 @@ def main():
     print("東京電力でんき予報データダウンロード開始")
     print(f"保存先: {downloader.base_dir}")
     
+    if args.to_month and not args.from_month:
+        print("エラー: --to-month は --from-month と一緒に指定してください")
+        return
+
+    if args.poll_count and not args.poll_interval:
+        print("エラー: --poll-count は --poll-interval と一緒に指定してください")
+        return
+
     # 実行モード判定とダウンロード実行
-    if args.month:
+    if args.poll_interval:
+        from src.data_processing.power_bigquery_loader import PowerBigQueryLoader
+        from src.data_processing.power_intraday import PowerIntradayPoller
+
+        poller = PowerIntradayPoller(downloader, PowerBigQueryLoader(raw_data_dir=downloader.base_dir))
+        summary = poller.run(args.poll_interval, args.poll_count)
+        # 全ての取得が失敗した場合はexit code 1を返す
+        if summary['polls'] and summary['failed_polls'] == summary['polls']:
+            sys.exit(1)
+        return
+    elif args.from_month:
+        from src.data_processing.power_backfill import PowerBackfill
+        from src.data_processing.power_bigquery_loader import PowerBigQueryLoader
+
+        print(f"バックフィルモード: {args.from_month}～{args.to_month or '今月'}")
+        backfill = PowerBackfill(downloader, PowerBigQueryLoader(raw_data_dir=downloader.base_dir))
+        try:
+            results = backfill.run(args.from_month, args.to_month)
+        except ValueError as e:
+            print(f"エラー: {e}")
+            sys.exit(1)
+    elif args.month:
         print(f"指定月モード: {args.month}")
         results = downloader.download_for_month(args.month)
     elif args.date:
@@ -0,0 +1,218 @@
+"""
+電力データの過去分一括投入（バックフィル）
+
+指定した月の範囲（例: 201604～今月）について、月ごとに「ZIPダウンロード → ZIP内CSVの解析 →
+energy_data_hourlyへの投入」をスレッドプールで並行して実行する。
+CSVは解凍せずZIPから直接読む（日次処理の解凍済みCSVには触れない）。
+投入はロードジョブで行う（ストリーミングインサートの行はしばらくDELETEできず、今月分の再投入が失敗するため）。
+
+再開用マニフェスト:
+    投入が完了した月を {base_dir}/backfill_manifest.json に1ヶ月ごとに記録し、
+    中断後に再実行すると完了済みの月を飛ばして続きから処理する。
+    今月分はデータが日々追加されるため、完了済みでも毎回投入し直す。
+
+実行方法:
+    python -m src.data_processing.data_downloader --from-month 201604
+    python -m src.data_processing.data_downloader --from-month 201604 --to-month 202412 --workers 8
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+
+class PowerBackfill:
+    """電力データを月単位で並行してダウンロード・解析・投入するクラス"""
+
+    # でんき予報の月別ZIPが公開されている最初の月
+    EARLIEST_MONTH = '201604'
+
+    MANIFEST_FILE = 'backfill_manifest.json'
+
+    def __init__(self, downloader, loader, manifest_path=None):
+        """
+        初期化
+
+        Args:
+            downloader (PowerDataDownloader): ダウンローダー（共有セッション・--workersの並行数を使う）
+            loader (PowerBigQueryLoader): BigQuery投入クラス
+            manifest_path (str): 再開用マニフェスト（Noneの場合は {base_dir}/backfill_manifest.json）
+        """
+        self.downloader = downloader
+        self.loader = loader
+        self.manifest_path = downloader.base_dir / self.MANIFEST_FILE if manifest_path is None else manifest_path
+        self._manifest_lock = threading.Lock()
+        self.manifest = self._read_manifest()
+
+    @classmethod
+    def month_range(cls, from_month, to_month=None):
+        """
+        対象月のリストを作成
+
+        Args:
+            from_month (str): 開始月 (YYYYMM形式)
+            to_month (str): 終了月 (YYYYMM形式、Noneの場合は今月)
+
+        Returns:
+            list: 月の文字列リスト（昇順）
+        """
+        current_month = datetime.now().strftime('%Y%m')
+        to_month = to_month or current_month
+        for label, month in (('開始月', from_month), ('終了月', to_month)):
+            try:
+                datetime.strptime(month, '%Y%m')
+            except ValueError:
+                raise ValueError(f"{label}はYYYYMM形式で入力してください: {month}")
+
+        if from_month < cls.EARLIEST_MONTH:
+            raise ValueError(f"{cls.EARLIEST_MONTH}より前のデータは公開されていません: {from_month}")
+        if to_month > current_month:
+            raise ValueError(f"未来の月は指定できません: {to_month} (今月: {current_month})")
+        if from_month > to_month:
+            raise ValueError(f"開始月が終了月より後です: {from_month} > {to_month}")
+
+        months = []
+        year, month = int(from_month[:4]), int(from_month[4:])
+        while f"{year}{month:02d}" <= to_month:
+            months.append(f"{year}{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def _read_manifest(self):
+        """再開用マニフェスト読み込み（存在しない・破損している場合は空）"""
+        if not self.manifest_path.exists():
+            return {'months': {}}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"マニフェスト読み込み失敗（最初から処理します）: {e}")
+            return {'months': {}}
+
+    def _record_month(self, month, entry):
+        """1ヶ月分の完了をマニフェストに記録（一時ファイルに書いてから置き換え）"""
+        with self._manifest_lock:
+            self.manifest['months'][month] = entry
+            tmp_path = self.manifest_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+
+    def pending_months(self, months):
+        """マニフェストで完了済みの月（今月を除く）を除いた対象月"""
+        current_month = datetime.now().strftime('%Y%m')
+        done = self.manifest['months']
+        return [month for month in months if month == current_month or month not in done]
+
+    def backfill_month(self, month):
+        """
+        1ヶ月分をダウンロード・解析・投入
+
+        Args:
+            month (str): 年月 (YYYYMM形式)
+
+        Returns:
+            dict: {'files', 'rows'}
+        """
+        # ZIPの保存のみ（解凍しない）
+        if not self.downloader.download_month_data(month, dates=set()):
+            raise FileNotFoundError(f"{month} のデータが公開されていません")
+
+        rows = []
+        files = 0
+        for file_name, content in self.downloader.iter_day_csvs(month):
+            if not file_name.endswith('_power_usage.csv'):
+                continue
+            day_rows = self.loader.parse_csv_text(content, file_name)
+            if day_rows:
+                rows.extend(day_rows)
+                files += 1
+
+        if not rows:
+            raise ValueError(f"{month} のCSVから有効なデータ行が取得できませんでした")
+
+        self.loader.insert_rows(rows)
+        return {'files': files, 'rows': len(rows)}
+
+    def run(self, from_month, to_month=None):
+        """
+        バックフィル実行
+
+        Args:
+            from_month (str): 開始月 (YYYYMM形式)
+            to_month (str): 終了月 (YYYYMM形式、Noneの場合は今月)
+
+        Returns:
+            dict: {'success', 'failed', 'skipped', 'rows', 'seconds', 'months_per_minute'}
+        """
+        execution_id = str(uuid.uuid4())
+        started_at = datetime.now()
+        months = self.month_range(from_month, to_month)
+        pending = self.pending_months(months)
+        skipped = sorted(set(months) - set(pending))
+
+        print(f"バックフィル開始: {months[0]}～{months[-1]} ({len(months)}ヶ月, "
+              f"完了済み{len(skipped)}ヶ月をスキップ, 並行数: {self.downloader.max_workers})")
+
+        results = {'success': [], 'failed': [], 'skipped': skipped, 'rows': 0}
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.downloader.max_workers, thread_name_prefix='backfill')
+        try:
+            # 古い月から投入するため、中断してもマニフェストの完了月は先頭から連続しやすい
+            futures = {executor.submit(self.backfill_month, month): month for month in pending}
+            for future in as_completed(futures):
+                month = futures[future]
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    print(f"{month} のバックフィルに失敗しました: {e}")
+                    results['failed'].append(month)
+                    continue
+
+                self._record_month(month, {**stats, 'completed_at': datetime.now().isoformat()})
+                results['success'].append(month)
+                results['rows'] += stats['rows']
+                print(f"[{len(results['success']) + len(results['failed'])}/{len(pending)}] "
+                      f"{month} 投入完了: {stats['files']}ファイル, {stats['rows']}行")
+        finally:
+            # 中断時（Ctrl+C等）は未着手の月を取り消す（完了済みの月はマニフェストに記録済み）
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        seconds = time.perf_counter() - started
+        results['success'].sort()
+        results['failed'].sort()
+        results['seconds'] = round(seconds, 1)
+        results['months_per_minute'] = round(len(results['success']) / (seconds / 60), 2) if seconds > 0 else None
+
+        completed_at = datetime.now()
+        self.loader._write_log({
+            "execution_id": execution_id,
+            "date": completed_at.strftime('%Y-%m-%d'),
+            "process_type": "POWER_BQ_LOAD",
+            "status": "FAILED" if results['failed'] else "SUCCESS",
+            "error_message": f"バックフィル失敗: {', '.join(results['failed'])}" if results['failed'] else None,
+            "started_at": started_at.isoformat(),
+            "completed_at": completed_at.isoformat(),
+            "duration_seconds": (completed_at - started_at).total_seconds(),
+            "records_processed": results['rows'],
+            "file_size_mb": None,
+            "additional_info": json.dumps({
+                "mode": "backfill",
+                "from_month": months[0],
+                "to_month": months[-1],
+                "months_loaded": len(results['success']),
+                "months_failed": results['failed'],
+                "months_skipped": len(skipped),
+                "months_per_minute": results['months_per_minute'],
+                "workers": self.downloader.max_workers,
+            })
+        })
+
+        print(f"バックフィル完了: {len(results['success'])}ヶ月投入, {len(results['failed'])}ヶ月失敗, "
+              f"{len(skipped)}ヶ月スキップ, {results['rows']:,}行, {results['seconds']}秒 "
+              f"({results['months_per_minute']} ヶ月/分)")
+        return results
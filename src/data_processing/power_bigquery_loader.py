@@ -57,21 +57,33 @@ class PowerBigQueryLoader:
         """
         CSVファイルを解析してBQインサート用の行データに変換
 
-        CSVは複数セクションに分かれており、'DATE,TIME,当日実績(万kW)'を含むヘッダー行の
-        次の行から24行分（24時間分）を処理する
-
         Args:
             csv_file_path (Path): CSVファイルパス
 
         Returns:
             list: BQインサート用の辞書のリスト
         """
-        rows = []
-
         # shift_jisでファイル全体を読み込み
         with open(csv_file_path, 'r', encoding='shift_jis') as f:
             content = f.read()
 
+        return self.parse_csv_text(content, csv_file_path.name)
+
+    def parse_csv_text(self, content, file_name):
+        """
+        CSVの内容（文字列）を解析してBQインサート用の行データに変換
+
+        CSVは複数セクションに分かれており、'DATE,TIME,当日実績(万kW)'を含むヘッダー行の
+        次の行から24行分（24時間分）を処理する
+
+        Args:
+            content (str): CSVの内容
+            file_name (str): ファイル名（ログ用）
+
+        Returns:
+            list: BQインサート用の辞書のリスト
+        """
+        rows = []
         lines = content.split('\n')
 
         # ヘッダー行（DATE,TIME,当日実績(万kW)）を見つける
@@ -82,23 +94,23 @@ class PowerBigQueryLoader:
                 break
 
         if header_line_index == -1:
-            print(f"ヘッダー行が見つかりません: {csv_file_path.name}")
+            print(f"ヘッダー行が見つかりません: {file_name}")
             return rows
 
         # ヘッダーの次行から24行処理
         for i in range(header_line_index + 1, header_line_index + 25):
             if i >= len(lines):
-                print(f"24時間分のデータが不足しています: {csv_file_path.name} (取得行数: {len(rows)})")
+                print(f"24時間分のデータが不足しています: {file_name} (取得行数: {len(rows)})")
                 return []
 
             line = lines[i].strip()
             if not line:
-                print(f"空行が検出されました: {csv_file_path.name} 行{i}")
+                print(f"空行が検出されました: {file_name} 行{i}")
                 return []
 
             parts = line.split(',')
             if len(parts) < 6:
-                print(f"列数が不足しています: {csv_file_path.name} 行{i} (列数: {len(parts)})")
+                print(f"列数が不足しています: {file_name} 行{i} (列数: {len(parts)})")
                 return []
 
             try:
@@ -124,20 +136,62 @@ class PowerBigQueryLoader:
                 rows.append(row)
 
             except (ValueError, IndexError) as e:
-                print(f"行パースエラー: {csv_file_path.name} 行{i} - {e}")
+                print(f"行パースエラー: {file_name} 行{i} - {e}")
                 return []
 
         # 24行取得できたか確認
         if len(rows) != 24:
-            print(f"24時間分のデータが取得できませんでした: {csv_file_path.name} (取得行数: {len(rows)})")
+            print(f"24時間分のデータが取得できませんでした: {file_name} (取得行数: {len(rows)})")
             return []
 
         # 最後の行の時刻が23時であることを確認
         if rows[-1]['hour'] != 23:
-            print(f"最終行の時刻が23時ではありません: {csv_file_path.name} (最終時刻: {rows[-1]['hour']})")
+            print(f"最終行の時刻が23時ではありません: {file_name} (最終時刻: {rows[-1]['hour']})")
             return []
 
-        print(f"CSVファイル解析完了: {csv_file_path.name}, {len(rows)}行")
+        print(f"CSVファイル解析完了: {file_name}, {len(rows)}行")
+        return rows
+
+    def parse_completed_hours(self, content, file_name):
+        """
+        当日CSV（更新途中）から実績が確定した時間帯の行だけを取得
+
+        当日実績が空・0の時間帯（未確定）以降は対象外とする
+
+        Args:
+            content (str): CSVの内容
+            file_name (str): ファイル名（ログ用）
+
+        Returns:
+            list: BQインサート用の辞書のリスト（確定済みの時間帯のみ）
+        """
+        lines = content.split('\n')
+        header_line_index = next(
+            (i for i, line in enumerate(lines) if 'DATE,TIME,当日実績(万kW)' in line), -1
+        )
+        if header_line_index == -1:
+            print(f"ヘッダー行が見つかりません: {file_name}")
+            return []
+
+        rows = []
+        for line in lines[header_line_index + 1:header_line_index + 25]:
+            parts = line.strip().split(',')
+            if len(parts) < 6:
+                break
+            try:
+                actual_power = float(parts[2]) if parts[2].strip() else 0.0
+                if actual_power <= 0:
+                    break
+                rows.append({
+                    'date': datetime.strptime(parts[0].strip(), '%Y/%m/%d').strftime('%Y-%m-%d'),
+                    'hour': int(parts[1].strip().split(':')[0]),
+                    'actual_power': actual_power,
+                    'supply_capacity': float(parts[5]),
+                    'created_at': datetime.now().isoformat()
+                })
+            except (ValueError, IndexError) as e:
+                print(f"行パースエラー: {file_name} - {e}")
+                break
         return rows
 
     def delete_duplicate_data(self, rows):
@@ -167,6 +221,66 @@ class PowerBigQueryLoader:
 
         print(f"既存データ削除完了: {job.num_dml_affected_rows}行削除（期間: {min_date}～{max_date}）")
 
+    def insert_rows(self, rows):
+        """
+        同じ日付範囲の既存データを削除してから行データを投入
+
+        ストリーミングインサートの行はしばらくDELETEできず、同じ期間の再投入（日次処理の再実行・
+        バックフィルの今月分）が失敗するため、ロードジョブで追記する
+
+        Args:
+            rows (list): parse_csv_to_rows() / parse_csv_text() の戻り値
+
+        Returns:
+            int: 投入行数
+        """
+        self.delete_duplicate_data(rows)
+        self._load_rows(rows)
+
+        print(f"電力データインサート完了: {len(rows)}行")
+        return len(rows)
+
+    def _load_rows(self, rows):
+        """行データをロードジョブでenergy_data_hourlyに追記"""
+        table_ref = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+        job = self.bq_client.load_table_from_json(
+            rows,
+            table_ref,
+            job_config=bigquery.LoadJobConfig(
+                schema=self.bq_client.get_table(table_ref).schema,
+                write_disposition="WRITE_APPEND"
+            )
+        )
+        job.result()
+
+    def load_hours(self, rows):
+        """
+        指定の日時（date・hour）の既存データを置き換えて投入（当日分の随時投入用）
+
+        ストリーミングインサートの行は直後にDELETEできないため、ロードジョブで追記する
+
+        Args:
+            rows (list): parse_completed_hours() の戻り値
+
+        Returns:
+            int: 投入行数
+        """
+        table_ref = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+
+        hours_by_date = {}
+        for row in rows:
+            hours_by_date.setdefault(row['date'], []).append(row['hour'])
+        conditions = ' OR '.join(
+            f"(date = '{date}' AND hour IN ({', '.join(str(hour) for hour in sorted(hours))}))"
+            for date, hours in sorted(hours_by_date.items())
+        )
+        delete_job = self.bq_client.query(f"DELETE FROM `{table_ref}` WHERE {conditions}")
+        delete_job.result()
+        self._load_rows(rows)
+
+        print(f"電力データ随時投入完了: {len(rows)}行（既存{delete_job.num_dml_affected_rows}行を置換）")
+        return len(rows)
+
     def _write_log(self, log_data):
         """
         ログをローカルファイルとBigQueryに記録
@@ -267,17 +381,8 @@ class PowerBigQueryLoader:
 
             print(f"全CSVから取得した行数: {len(all_rows)}行")
 
-            # 4. 重複データ削除
-            self.delete_duplicate_data(all_rows)
-
-            # 5. データ投入
-            table_ref = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
-            errors = self.bq_client.insert_rows_json(table_ref, all_rows)
-            if errors:
-                raise Exception(f"BQインサートエラー: {errors}")
-
-            rows_inserted = len(all_rows)
-            print(f"電力データインサート完了: {rows_inserted}行")
+            # 4-5. 重複データ削除・データ投入
+            rows_inserted = self.insert_rows(all_rows)
 
             # 6. 成功時のみファイル削除
             for csv_file in processed_files:
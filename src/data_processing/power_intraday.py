@@ -0,0 +1,210 @@
+"""
+当日の電力データの随時取得（ポーリング）
+
+でんき予報の当月ZIPに含まれる当日CSVは1日を通して更新されるため、一定間隔で取得し、
+実績が確定した時間帯のうち未投入・値が変わったものだけをenergy_data_hourlyに投入する。
+日次処理（翌朝の一括投入）を待たずに、公開から数分で当日分の実績がBigQueryに入る。
+
+    - ZIPは条件付きGET（ETag・Last-Modified）で取得し、更新がなければ転送しない
+    - 当日CSV全体のSHA-256が前回と同じなら解析しない
+    - 時間帯ごとの行のハッシュを状態ファイルに保存し、新しく確定した（または値が変わった）時間帯だけ投入する
+    - 前日の23時台は日付が変わってから確定するため、前日分が24時間そろうまでは前日も対象にする
+    - 投入はロードジョブ（対象の日時を削除してから追記）で行う。翌朝の日次投入で日単位に置き換わる
+
+状態ファイル:
+    {base_dir}/intraday_state.json  {日付: {'csv_sha256', 'hours': {時: 行のハッシュ}}}
+
+実行方法:
+    python -m src.data_processing.data_downloader --poll-interval 300                # 5分間隔で取得し続ける
+    python -m src.data_processing.data_downloader --poll-interval 300 --poll-count 1 # 1回だけ取得
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+class PowerIntradayPoller:
+    """当日CSVを一定間隔で取得し、確定した時間帯だけBigQueryに投入するクラス"""
+
+    DEFAULT_INTERVAL_SECONDS = 300
+
+    STATE_FILE = 'intraday_state.json'
+
+    def __init__(self, downloader, loader, state_path=None):
+        """
+        初期化
+
+        Args:
+            downloader (PowerDataDownloader): ダウンローダー（条件付きGETのキャッシュを使う）
+            loader (PowerBigQueryLoader): BigQuery投入クラス
+            state_path (str): 状態ファイル（Noneの場合は {base_dir}/intraday_state.json）
+        """
+        self.downloader = downloader
+        self.loader = loader
+        self.state_path = downloader.base_dir / self.STATE_FILE if state_path is None else state_path
+        self.state = self._read_state()
+
+    def _read_state(self):
+        """状態ファイル読み込み（存在しない・破損している場合は空）"""
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"状態ファイル読み込み失敗（当日分を投入し直します）: {e}")
+            return {}
+
+    def _write_state(self):
+        """状態ファイル書き込み（直近2日分のみ保持）"""
+        self.state = {date: self.state[date] for date in sorted(self.state)[-2:]}
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _row_hash(row):
+        """1時間分の行のハッシュ（created_atは含めない）"""
+        key = f"{row['date']},{row['hour']},{row['actual_power']},{row['supply_capacity']}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    def target_dates(self, now):
+        """取得対象の日付（当日と、24時間分そろっていない前日）"""
+        today = now.date()
+        yesterday = today - timedelta(days=1)
+        entry = self.state.get(yesterday.isoformat())
+        if entry is not None and len(entry['hours']) < 24:
+            return [yesterday, today]
+        return [today]
+
+    def poll_once(self, now=None):
+        """
+        1回分の取得・投入
+
+        Args:
+            now (datetime): 現在時刻（日本時間・tzなし、Noneの場合は現在時刻）
+
+        Returns:
+            dict: {'pushed_rows', 'pushed_hours', 'changed_files', 'latency_minutes'}
+        """
+        now = now or datetime.now(ZoneInfo('Asia/Tokyo')).replace(tzinfo=None)
+        dates = self.target_dates(now)
+
+        # 月ごとに条件付きGET（ZIPの保存のみ・解凍しない）
+        available_months = set()
+        for month in sorted({date.strftime('%Y%m') for date in dates}):
+            if self.downloader.download_month_data(month, target_date=now.strftime('%Y-%m-%d'), dates=set()):
+                available_months.add(month)
+
+        pending_rows = []
+        updated_entries = {}
+        for date in dates:
+            month, day = date.strftime('%Y%m'), date.strftime('%Y%m%d')
+            if month not in available_months:
+                continue
+            entry = self.state.get(date.isoformat(), {'csv_sha256': None, 'hours': {}})
+
+            for file_name, content in self.downloader.iter_day_csvs(month, dates={day}):
+                csv_sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
+                if csv_sha256 == entry['csv_sha256']:
+                    continue
+
+                hours = dict(entry['hours'])
+                for row in self.loader.parse_completed_hours(content, file_name):
+                    row_hash = self._row_hash(row)
+                    if hours.get(str(row['hour'])) != row_hash:
+                        pending_rows.append(row)
+                        hours[str(row['hour'])] = row_hash
+                updated_entries[date.isoformat()] = {'csv_sha256': csv_sha256, 'hours': hours}
+
+        result = {'pushed_rows': 0, 'pushed_hours': [], 'changed_files': len(updated_entries), 'latency_minutes': None}
+        if pending_rows:
+            started_at = datetime.now()
+            self.loader.load_hours(pending_rows)
+            loaded_at = datetime.now(ZoneInfo('Asia/Tokyo')).replace(tzinfo=None)
+
+            # 時間帯の終了からBigQuery投入完了までの経過時間（公開までの時間を含む上限値）
+            latencies = [
+                (loaded_at - datetime.strptime(row['date'], '%Y-%m-%d') - timedelta(hours=row['hour'] + 1))
+                .total_seconds() / 60
+                for row in pending_rows
+            ]
+            result.update({
+                'pushed_rows': len(pending_rows),
+                'pushed_hours': [f"{row['date']} {row['hour']:02d}:00" for row in pending_rows],
+                'latency_minutes': round(min(latencies), 1),
+            })
+            self._write_log(started_at, result)
+
+        # 投入に成功してから状態を更新する（失敗時は次回に再投入）
+        if updated_entries:
+            self.state.update(updated_entries)
+            self._write_state()
+        return result
+
+    def _write_log(self, started_at, result):
+        """随時投入のログ記録（POWER_BQ_LOAD・additional_info.mode='intraday'）"""
+        completed_at = datetime.now()
+        self.loader._write_log({
+            "execution_id": str(uuid.uuid4()),
+            "date": completed_at.strftime('%Y-%m-%d'),
+            "process_type": "POWER_BQ_LOAD",
+            "status": "SUCCESS",
+            "error_message": None,
+            "started_at": started_at.isoformat(),
+            "completed_at": completed_at.isoformat(),
+            "duration_seconds": (completed_at - started_at).total_seconds(),
+            "records_processed": result['pushed_rows'],
+            "file_size_mb": None,
+            "additional_info": json.dumps({
+                "mode": "intraday",
+                "hours": result['pushed_hours'],
+                "latency_minutes": result['latency_minutes'],
+            })
+        })
+
+    def run(self, interval_seconds=DEFAULT_INTERVAL_SECONDS, max_polls=None):
+        """
+        一定間隔で取得・投入を繰り返す（Ctrl+Cまたはmax_polls回で終了）
+
+        Args:
+            interval_seconds (int): 取得間隔（秒）
+            max_polls (int): 取得回数の上限（Noneの場合は無制限）
+
+        Returns:
+            dict: {'polls', 'failed_polls', 'pushed_rows'}
+        """
+        print(f"当日データの随時取得開始: {interval_seconds}秒間隔"
+              + (f", {max_polls}回" if max_polls else ""))
+        summary = {'polls': 0, 'failed_polls': 0, 'pushed_rows': 0}
+        try:
+            while max_polls is None or summary['polls'] < max_polls:
+                started = time.monotonic()
+                summary['polls'] += 1
+                try:
+                    result = self.poll_once()
+                    summary['pushed_rows'] += result['pushed_rows']
+                    if result['pushed_rows']:
+                        print(f"[{summary['polls']}] 投入: {', '.join(result['pushed_hours'])} "
+                              f"(確定から{result['latency_minutes']}分)")
+                    else:
+                        print(f"[{summary['polls']}] 新しく確定した時間帯はありません")
+                except Exception as e:
+                    # 一時的なエラーでは止めず、次回の取得で再試行する
+                    summary['failed_polls'] += 1
+                    print(f"[{summary['polls']}] 随時取得エラー（次回再試行）: {e}")
+
+                if max_polls is not None and summary['polls'] >= max_polls:
+                    break
+                time.sleep(max(0.0, interval_seconds - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("随時取得を中断しました")
+
+        print(f"随時取得終了: {summary['polls']}回, 投入 {summary['pushed_rows']}行, 失敗 {summary['failed_polls']}回")
+        return summary
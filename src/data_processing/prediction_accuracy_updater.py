@@ -3,6 +3,8 @@ prediction_accuracyテーブル更新モジュール
 
 予測値と実績値を紐付けて精度分析用テーブルを更新する。
 過去7日分を削除→再投入する方式で効率的に更新。
+チャレンジャーモデルの予測（prediction_results.model_id）はモデルIDごとに投入し、
+更新後に直近の精度でモデルを順位付けする。
 
 実行方法:
     python -m src.data_processing.prediction_accuracy_updater
@@ -94,6 +96,7 @@ class PredictionAccuracyUpdater:
                 execution_id,
                 prediction_run_date,
                 prediction_run_datetime,
+                model_id,
                 prediction_date,
                 prediction_hour,
                 predicted_power,
@@ -107,6 +110,7 @@ class PredictionAccuracyUpdater:
                 execution_id,
                 CAST(created_at AS DATE) AS prediction_run_date,
                 created_at AS prediction_run_datetime,
+                COALESCE(model_id, 'champion') AS model_id,
                 prediction_date,
                 prediction_hour,
                 predicted_power_kwh AS predicted_power
@@ -128,6 +132,7 @@ class PredictionAccuracyUpdater:
               pred.execution_id,
               pred.prediction_run_date,
               pred.prediction_run_datetime,
+              pred.model_id,
               pred.prediction_date,
               pred.prediction_hour,
               pred.predicted_power,
@@ -153,6 +158,67 @@ class PredictionAccuracyUpdater:
             print(error_msg)
             raise Exception(error_msg)
 
+    def rank_models(self, days=14):
+        """
+        直近の予測精度でモデル（チャンピオン・チャレンジャー）を順位付け
+
+        同じ予測実行日のモデル同士を比べるため、全モデルが予測した実行日だけを対象にする。
+
+        Args:
+            days (int): 対象とする予測実行日の日数
+
+        Returns:
+            list: MAPE昇順のモデル別精度
+                  [{'model_id', 'mape', 'mae', 'records', 'run_days'}, ...]
+
+        Raises:
+            Exception: BigQueryエラー時
+        """
+        try:
+            rank_query = f"""
+            WITH accuracy AS (
+              SELECT *
+              FROM `{self.project_id}.{self.dataset_id}.{self.table_id}`
+              WHERE prediction_run_date >= DATE_SUB(CURRENT_DATE('Asia/Tokyo'), INTERVAL {days} DAY)
+            ),
+            common_runs AS (
+              SELECT prediction_run_date
+              FROM accuracy
+              GROUP BY prediction_run_date
+              HAVING COUNT(DISTINCT model_id) = (SELECT COUNT(DISTINCT model_id) FROM accuracy)
+            )
+            SELECT
+              model_id,
+              AVG(error_percentage) AS mape,
+              AVG(error_absolute) AS mae,
+              COUNT(*) AS records,
+              COUNT(DISTINCT prediction_run_date) AS run_days
+            FROM accuracy
+            WHERE prediction_run_date IN (SELECT prediction_run_date FROM common_runs)
+            GROUP BY model_id
+            ORDER BY mape
+            """
+
+            rows = self.bq_client.query(rank_query).result()
+            ranking = [
+                {
+                    'model_id': row['model_id'],
+                    'mape': round(row['mape'], 3) if row['mape'] is not None else None,
+                    'mae': round(row['mae'], 1) if row['mae'] is not None else None,
+                    'records': row['records'],
+                    'run_days': row['run_days'],
+                }
+                for row in rows
+            ]
+
+            print(f"モデル順位付け完了: {len(ranking)}モデル")
+            return ranking
+
+        except Exception as e:
+            error_msg = f"モデル順位付けSQL実行失敗: {e}"
+            print(error_msg)
+            raise Exception(error_msg)
+
     def _write_log(self, log_data):
         """
         ログをローカルファイルとBigQueryに記録
@@ -217,6 +283,12 @@ class PredictionAccuracyUpdater:
             # 2. 過去14日分のデータを再投入
             inserted_rows = self.insert_prediction_accuracy()
 
+            # 3. モデル別の精度で順位付け（失敗しても更新自体は成功扱い）
+            try:
+                model_ranking = self.rank_models()
+            except Exception:
+                model_ranking = None
+
             print(f"prediction_accuracy更新完了（過去14日分）: 削除{deleted_rows}行, 挿入{inserted_rows}行")
 
             # 成功ログ記録
@@ -236,7 +308,8 @@ class PredictionAccuracyUpdater:
                 "file_size_mb": None,
                 "additional_info": json.dumps({
                     "deleted_rows": deleted_rows,
-                    "inserted_rows": inserted_rows
+                    "inserted_rows": inserted_rows,
+                    "model_ranking": model_ranking
                 })
             }
             self._write_log(log_data)
@@ -245,7 +318,8 @@ class PredictionAccuracyUpdater:
                 'status': 'success',
                 'message': f'prediction_accuracy更新成功',
                 'deleted_rows': deleted_rows,
-                'inserted_rows': inserted_rows
+                'inserted_rows': inserted_rows,
+                'model_ranking': model_ranking
             }
 
         except Exception as e:
@@ -274,7 +348,8 @@ class PredictionAccuracyUpdater:
                 'status': 'failed',
                 'message': f'更新失敗: {str(e)}',
                 'deleted_rows': 0,
-                'inserted_rows': 0
+                'inserted_rows': 0,
+                'model_ranking': None
             }
 
 
@@ -290,6 +365,12 @@ def print_update_results(results):
     print(f"メッセージ: {results['message']}")
     print(f"削除レコード数: {results['deleted_rows']}")
     print(f"挿入レコード数: {results['inserted_rows']}")
+
+    if results.get('model_ranking'):
+        print(f"\nモデル別精度（直近14日・MAPE昇順）:")
+        for rank, model in enumerate(results['model_ranking'], 1):
+            mape = f"{model['mape']:.2f}%" if model['mape'] is not None else '-'
+            print(f"  {rank}. {model['model_id']:<20} MAPE {mape:>7}  ({model['records']}件, {model['run_days']}日)")
     print('='*60)
 
 
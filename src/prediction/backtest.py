@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+段階的予測の複数起点バックテスト
+
+過去の予測実行日（起点）ごとに「起点前日までのデータで学習 → 14日間の段階的予測」を再現し、
+実績値と比較してdays_ahead（予測実行日からの日数）×時間帯別のMAPEを集計する。
+起点はプロセスプールで並列処理し、結果はParquetレポートに保存する。
+
+リーク防止:
+    - 学習データは起点より前（前日23時まで）のml_featuresのみ
+    - 予測期間の実績値・lag特徴量は使わない（lagは段階的予測値で補完）
+    - 予測期間の気象データはml_features内の値を使用（本番は予報値のため、気象予報誤差は含まない）
+
+予測方式（--strategy）:
+    recursive: 段階的予測（日次予測と同じ）
+    direct   : 直接多ホライズン予測（src.prediction.direct_inference）
+    both     : 両方を同じ起点で実行して比較
+
+実行方法:
+    python -m src.prediction.backtest --from 2024-07-01 --to 2025-06-30
+    python -m src.prediction.backtest --from 2025-01-01 --to 2025-03-31 --workers 8 --step-days 7
+    python -m src.prediction.backtest --from 2025-01-01 --to 2025-03-31 --strategy both
+
+出力:
+    {ENERGY_ENV_PATH}/data/backtest/backtest_{from}_{to}.parquet
+        strategy, days_ahead, hour, mape, count  # 予測方式×days_ahead×時間帯別MAPE
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BACKTEST_STRATEGIES = ('recursive', 'direct')
+
+# ワーカープロセス内で共有するml_features全期間（initializerで設定）
+_WORKER_FRAME = None
+_WORKER_OPTIONS = None
+
+
+def load_backtest_frame(client, date_from, date_to, horizon_days=14, use_training_cache=True):
+    """
+    バックテスト用にml_features全期間（最終起点の予測期間末日まで）を取得
+
+    Args:
+        client: BigQueryクライアント
+        date_from (date): 最初の起点
+        date_to (date): 最後の起点
+        horizon_days (int): 予測日数
+        use_training_cache (bool): 学習データのローカルキャッシュを使うか
+
+    Returns:
+        DataFrame: ml_features（datetimeインデックス）
+    """
+    from src.prediction.feature_frame import to_feature_frame
+    from src.prediction.training_data_cache import TrainingDataCache, fetch_ml_features
+
+    until_date = date_to + timedelta(days=horizon_days - 1)
+    if use_training_cache:
+        frame, _ = TrainingDataCache().load(client, until_date)
+    else:
+        frame, _ = fetch_ml_features(client, until_date)
+
+    frame = to_feature_frame(frame)
+
+    first_train_day = frame.index.min().normalize()
+    if pd.Timestamp(date_from) <= first_train_day:
+        raise ValueError(f"最初の起点 {date_from} より前の学習データがありません（データ開始: {first_train_day.date()}）")
+
+    # 最後の起点の予測期間（末日の23時まで）がそろっているか
+    last_hour = frame.index.max()
+    last_full_day = last_hour.normalize() - pd.Timedelta(days=0 if last_hour.hour == 23 else 1)
+    if pd.Timestamp(until_date) > last_full_day:
+        last_origin = (last_full_day - pd.Timedelta(days=horizon_days - 1)).date()
+        raise ValueError(
+            f"最後の起点 {date_to} の予測期間（{horizon_days}日間・{until_date}まで）のml_featuresがありません"
+            f"（データ終了: {last_hour}）。--to は {last_origin} 以前を指定してください"
+        )
+
+    return frame
+
+
+def _init_worker(frame, options):
+    """ワーカープロセス初期化（ml_featuresを1回だけ受け取る）"""
+    global _WORKER_FRAME, _WORKER_OPTIONS
+    _WORKER_FRAME = frame
+    _WORKER_OPTIONS = options
+
+
+def backtest_origin(origin, frame=None, options=None):
+    """
+    1起点分の学習・段階的予測を実行し、実績値と突き合わせる
+
+    Args:
+        origin (Timestamp): 起点（予測実行日）
+        frame (DataFrame): ml_features（datetimeインデックス）。Noneの場合はワーカー共有データ
+        options (dict): {'horizon_days', 'train_window_days', 'n_jobs', 'xgb_params', 'strategies'}
+
+    Returns:
+        DataFrame: strategy, origin, target_datetime, days_ahead, hour, predicted_power, actual_power
+    """
+    import xgboost as xgb
+    from src.prediction.direct_inference import predict_direct, train_direct_models
+    from src.prediction.iterative_inference import FEATURES, predict_batched
+    from src.prediction.prediction_iterative_with_export import XGB_PARAMS, prepare_business_days
+
+    frame = _WORKER_FRAME if frame is None else frame
+    options = _WORKER_OPTIONS if options is None else options
+    horizon_days = options['horizon_days']
+    origin = pd.Timestamp(origin)
+    horizon_end = origin + pd.Timedelta(days=horizon_days)
+
+    # 起点時点で利用可能なデータのみで学習（前日23時まで）
+    train = frame[frame.index < origin]
+    if options.get('train_window_days'):
+        train = train[train.index >= origin - pd.Timedelta(days=options['train_window_days'])]
+
+    xgb_params = options.get('xgb_params', XGB_PARAMS)
+
+    # 予測期間: 気象・カレンダーのみ（実績値・lagは除外）
+    horizon = frame[(frame.index >= origin) & (frame.index < horizon_end)]
+    future_features = horizon.drop(columns=['actual_power', 'lag_1_day', 'lag_7_day', 'lag_1_business_day'])
+
+    results = []
+    for strategy in options.get('strategies', ('recursive',)):
+        if strategy == 'direct':
+            # ワーカー内では区間モデルを逐次学習（プロセスの入れ子を避ける）
+            models = train_direct_models(train, xgb_params, workers=1, n_jobs=options.get('n_jobs'))
+            predictions = predict_direct(models, origin, horizon_days, future_features, train)
+        else:
+            model = xgb.XGBRegressor(**xgb_params, n_jobs=options.get('n_jobs'))
+            model.fit(train[FEATURES], train['actual_power'])
+
+            calendar_data = future_features[['is_weekend', 'is_holiday']].groupby(future_features.index.date).first()
+            business_days_train, business_days_future = prepare_business_days(train, calendar_data, origin.date())
+            predictions = predict_batched(
+                model, origin, horizon_days, future_features, train,
+                business_days_train, business_days_future
+            )
+
+        result = pd.DataFrame({
+            'target_datetime': pd.DatetimeIndex(list(predictions.keys())),
+            'predicted_power': np.fromiter(predictions.values(), dtype=float),
+        })
+        result['strategy'] = strategy
+        result['origin'] = origin
+        result['days_ahead'] = (result['target_datetime'].dt.normalize() - origin).dt.days
+        result['hour'] = result['target_datetime'].dt.hour
+        result['actual_power'] = horizon['actual_power'].reindex(result['target_datetime']).to_numpy()
+        results.append(result)
+
+    return pd.concat(results, ignore_index=True)[
+        ['strategy', 'origin', 'target_datetime', 'days_ahead', 'hour', 'predicted_power', 'actual_power']
+    ]
+
+
+def _quiet_backtest_origin(origin):
+    """日次の進捗表示を抑制してbacktest_originを実行（ワーカー用）"""
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        return backtest_origin(origin)
+
+
+def summarize_backtest(results):
+    """
+    予測方式×days_ahead×時間帯別のMAPEを集計
+
+    Args:
+        results (DataFrame): backtest_origin() の結果を結合したもの
+
+    Returns:
+        DataFrame: strategy, days_ahead, hour, mape, count
+    """
+    valid = results.dropna(subset=['actual_power'])
+    valid = valid[valid['actual_power'] != 0]
+    ape = (valid['predicted_power'] - valid['actual_power']).abs() / valid['actual_power'] * 100
+
+    report = (
+        ape.groupby([valid['strategy'], valid['days_ahead'], valid['hour']])
+        .agg(mape='mean', count='size')
+        .reset_index()
+    )
+    report['strategy'] = report['strategy'].astype('category')
+    report['days_ahead'] = report['days_ahead'].astype('int8')
+    report['hour'] = report['hour'].astype('int8')
+    report['mape'] = report['mape'].astype('float32')
+    report['count'] = report['count'].astype('int32')
+    return report
+
+
+def run_backtest(client, date_from, date_to, step_days=1, horizon_days=14, workers=None,
+                 train_window_days=None, output_path=None, use_training_cache=True,
+                 strategies=('recursive',)):
+    """
+    複数起点バックテストを実行してレポートを保存
+
+    Args:
+        client: BigQueryクライアント
+        date_from (date): 最初の起点
+        date_to (date): 最後の起点
+        step_days (int): 起点の間隔（日）
+        horizon_days (int): 予測日数
+        workers (int): 並列プロセス数（Noneの場合はCPUコア数）
+        train_window_days (int): 学習データの日数上限（Noneの場合は全期間・本番と同じ）
+        output_path (str): レポート出力先（Noneの場合はdata/backtest配下）
+        use_training_cache (bool): 学習データのローカルキャッシュを使うか
+        strategies (tuple): 予測方式（BACKTEST_STRATEGIESの組み合わせ）
+
+    Returns:
+        tuple: (report DataFrame, 出力パス)
+    """
+    invalid = set(strategies) - set(BACKTEST_STRATEGIES)
+    if invalid:
+        raise ValueError(f"予測方式は {BACKTEST_STRATEGIES} から指定してください: {sorted(invalid)}")
+
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    origins = pd.date_range(date_from, date_to, freq=f'{step_days}D')
+
+    print(f"バックテスト開始: 起点 {len(origins)}件 ({date_from} ～ {date_to}, {step_days}日間隔), "
+          f"予測方式: {', '.join(strategies)}, 並列数: {workers}")
+
+    frame = load_backtest_frame(client, date_from, date_to, horizon_days, use_training_cache)
+    print(f"ml_features取得完了: {len(frame):,}件 ({frame.index.min()} ～ {frame.index.max()})")
+
+    # 日次予測と同じパラメータ（チューニング済みファイルがあれば優先）
+    from src.prediction.prediction_iterative_with_export import load_xgb_params
+    xgb_params, xgb_params_source = load_xgb_params()
+    print(f"XGBoostパラメータ: {xgb_params_source}")
+
+    # ワーカー数×XGBoostスレッド数がコア数を超えないようにする
+    options = {
+        'xgb_params': xgb_params,
+        'strategies': tuple(strategies),
+        'horizon_days': horizon_days,
+        'train_window_days': train_window_days,
+        'n_jobs': max(1, (os.cpu_count() or 1) // workers),
+    }
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(frame, options)) as executor:
+        for i, result in enumerate(executor.map(_quiet_backtest_origin, origins), start=1):
+            results.append(result)
+            if i % 10 == 0 or i == len(origins):
+                print(f"  {i}/{len(origins)} 起点完了 ({time.perf_counter() - started:.1f}秒)")
+
+    report = summarize_backtest(pd.concat(results, ignore_index=True))
+
+    if output_path is None:
+        energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+        output_dir = Path(energy_env_path) / 'data' / 'backtest'
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"backtest_{date_from:%Y%m%d}_{date_to:%Y%m%d}.parquet"
+    report.to_parquet(output_path, index=False)
+
+    duration = time.perf_counter() - started
+    print("=" * 60)
+    print("days_ahead別MAPE:")
+    keys = [report['days_ahead'], report['strategy']]
+    weighted = (report['mape'] * report['count']).groupby(keys, observed=True).sum()
+    by_day = (weighted / report['count'].groupby(keys, observed=True).sum()).unstack('strategy')
+    print("  " + " " * 8 + "".join(f"{strategy:>12}" for strategy in by_day.columns))
+    for days_ahead, row in by_day.iterrows():
+        print(f"  {days_ahead:2d}日先: " + "".join(f"{mape:11.2f}%" for mape in row))
+    print(f"レポート保存: {output_path}")
+    print(f"処理時間: {duration:.1f}秒 ({len(origins) / duration * 60:.1f}起点/分)")
+    print("=" * 60)
+
+    return report, output_path
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='段階的予測の複数起点バックテスト')
+    parser.add_argument('--from', dest='date_from', type=str, required=True,
+                       help='最初の起点 YYYY-MM-DD')
+    parser.add_argument('--to', dest='date_to', type=str, required=True,
+                       help='最後の起点 YYYY-MM-DD')
+    parser.add_argument('--step-days', type=int, default=1, help='起点の間隔（日） (デフォルト: 1)')
+    parser.add_argument('--horizon-days', type=int, default=14, help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--workers', type=int, help='並列プロセス数 (デフォルト: CPUコア数)')
+    parser.add_argument('--train-window-days', type=int, help='学習データの日数上限 (デフォルト: 全期間)')
+    parser.add_argument('--output', type=str, help='レポート出力先Parquetファイル')
+    parser.add_argument('--no-training-cache', action='store_true',
+                       help='学習データのローカルキャッシュを使わず全期間をBigQueryから取得')
+    parser.add_argument('--strategy', choices=BACKTEST_STRATEGIES + ('both',), default='recursive',
+                       help='予測方式: recursive=段階的予測, direct=直接予測, both=両方を比較（デフォルト: recursive）')
+    args = parser.parse_args()
+
+    try:
+        date_from = datetime.strptime(args.date_from, '%Y-%m-%d').date()
+        date_to = datetime.strptime(args.date_to, '%Y-%m-%d').date()
+    except ValueError:
+        print("日付形式が正しくありません。YYYY-MM-DD形式で指定してください。")
+        sys.exit(1)
+    if date_from > date_to:
+        print("--from は --to 以前の日付を指定してください。")
+        sys.exit(1)
+
+    from google.cloud import bigquery
+    client = bigquery.Client(project='energy-env')
+
+    try:
+        run_backtest(
+            client, date_from, date_to,
+            step_days=args.step_days,
+            horizon_days=args.horizon_days,
+            workers=args.workers,
+            train_window_days=args.train_window_days,
+            output_path=args.output,
+            use_training_cache=not args.no_training_cache,
+            strategies=BACKTEST_STRATEGIES if args.strategy == 'both' else (args.strategy,),
+        )
+    except ValueError as e:
+        print(f"バックテストエラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+チャンピオン/チャレンジャー予測
+
+本番モデル（チャンピオン）と同じ学習データ・予測期間の特徴量から、ハイパーパラメータ・特徴量・
+学習期間を変えた候補モデル（チャレンジャー）を学習し、同じ段階的予測でまとめて予測する。
+予測結果はprediction_resultsにmodel_idごとに保存し、PredictionAccuracyUpdater.rank_models()で順位付けする。
+
+    - BigQueryの読み込み・特徴量作成は本番予測の1回分だけ（チャレンジャーごとに再実行しない）
+    - チャレンジャーはスレッドプールで並行して学習する（XGBoostの学習中はGILを解放するため、
+      チャンピオンの学習・予測とも並行に進む）
+    - 予測は1日ごとに全チャレンジャーを順に予測する（ラグ特徴量はモデルごとに別々に伝播）
+    - チャレンジャーはモデルキャッシュを使わず毎回学習する（キャッシュの保持数をチャンピオンに残す）
+
+チャレンジャー定義（JSONファイルでも指定可能）:
+    {"モデルID": {"xgb_params": {XGBRegressorパラメータの上書き},
+                 "features": [特徴量名（iterative_inference.FEATURESの部分集合）],
+                 "train_days": 学習に使う直近日数}, ...}
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# 本番モデルのモデルID（prediction_results.model_idがNULLの行も本番モデル）
+CHAMPION_MODEL_ID = 'champion'
+
+# チャレンジャー定義で指定できる項目
+CHALLENGER_KEYS = ('xgb_params', 'features', 'train_days')
+
+# 標準のチャレンジャー
+DEFAULT_CHALLENGERS = {
+    'deeper_slower': {'xgb_params': {'max_depth': 10, 'learning_rate': 0.03, 'n_estimators': 400}},
+    'no_business_lag': {'features': [
+        'hour', 'is_weekend', 'is_holiday', 'month', 'hour_sin', 'hour_cos',
+        'lag_1_day', 'lag_7_day', 'temperature_2m', 'relative_humidity_2m', 'precipitation',
+    ]},
+    'recent_3y': {'train_days': 365 * 3},
+}
+
+
+def load_challengers(path=None):
+    """
+    チャレンジャー定義を取得
+
+    Args:
+        path (str): チャレンジャー定義JSONファイル（Noneの場合は標準のチャレンジャー）
+
+    Returns:
+        dict: {モデルID: {'xgb_params', 'features', 'train_days'}}
+    """
+    from src.prediction.iterative_inference import FEATURES
+
+    if path is None:
+        return {model_id: dict(spec) for model_id, spec in DEFAULT_CHALLENGERS.items()}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        challengers = json.load(f)
+
+    for model_id, spec in challengers.items():
+        if model_id == CHAMPION_MODEL_ID:
+            raise ValueError(f"モデルID '{CHAMPION_MODEL_ID}' は本番モデル用のため使えません")
+        unknown = set(spec) - set(CHALLENGER_KEYS)
+        if unknown:
+            raise ValueError(f"{model_id}: 指定できる項目は {CHALLENGER_KEYS} です: {sorted(unknown)}")
+        unknown_features = set(spec.get('features', [])) - set(FEATURES)
+        if unknown_features:
+            raise ValueError(f"{model_id}: 特徴量は {FEATURES} から指定してください: {sorted(unknown_features)}")
+    return challengers
+
+
+def challenger_features(spec):
+    """チャレンジャーの特徴量名リスト（FEATURESの並び順）"""
+    from src.prediction.iterative_inference import FEATURES
+
+    selected = spec.get('features')
+    return [feature for feature in FEATURES if selected is None or feature in selected]
+
+
+def train_challenger(ml_features_train, spec, xgb_params, n_jobs=None):
+    """
+    1チャレンジャー分のモデルを学習
+
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス・チャンピオンと共通）
+        spec (dict): チャレンジャー定義
+        xgb_params (dict): チャンピオンのXGBRegressorパラメータ（spec['xgb_params']で上書き）
+        n_jobs (int): XGBoostスレッド数
+
+    Returns:
+        tuple: (XGBRegressor, 学習統計dict {'train_rows', 'features', 'seconds'})
+    """
+    import xgboost as xgb
+
+    features = challenger_features(spec)
+    train = ml_features_train[ml_features_train['actual_power'].notna()]
+    if spec.get('train_days'):
+        train = train[train.index > train.index.max() - pd.Timedelta(days=spec['train_days'])]
+
+    started = time.perf_counter()
+    model = xgb.XGBRegressor(**{**xgb_params, **spec.get('xgb_params', {})}, n_jobs=n_jobs)
+    model.fit(train[features], train['actual_power'])
+    return model, {
+        'train_rows': len(train),
+        'features': len(features),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def start_challenger_training(ml_features_train, challengers, xgb_params, workers=None, n_jobs=None):
+    """
+    チャレンジャーの学習をスレッドプールで開始（完了を待たずに戻る）
+
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        challengers (dict): load_challengers() の戻り値
+        xgb_params (dict): チャンピオンのXGBRegressorパラメータ
+        workers (int): 並行して学習するモデル数（Noneの場合はチャレンジャー数）
+        n_jobs (int): 1モデルあたりのXGBoostスレッド数（Noneの場合はCPUコア数÷（並行数＋チャンピオン））
+
+    Returns:
+        dict: {モデルID: Future（train_challenger() の戻り値）}
+    """
+    workers = workers or len(challengers)
+    n_jobs = n_jobs or max(1, (os.cpu_count() or 1) // (workers + 1))
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='challenger')
+    futures = {
+        model_id: executor.submit(train_challenger, ml_features_train, spec, xgb_params, n_jobs)
+        for model_id, spec in challengers.items()
+    }
+    # 投入済みの学習は続行し、スレッドは学習完了後に終了する
+    executor.shutdown(wait=False)
+    return futures
+
+
+def predict_challengers(models, challengers, start_date, days, future_features, ml_features_train,
+                        business_days_train, business_days_future):
+    """
+    全チャレンジャーを1日ずつまとめて段階的予測
+
+    Args:
+        models (dict): {モデルID: XGBRegressor}
+        challengers (dict): load_challengers() の戻り値
+        start_date, days, future_features, ml_features_train, business_days_train, business_days_future:
+            iterative_inference.predict_batched() と同じ
+
+    Returns:
+        dict: {モデルID: 予測結果辞書 {datetime: predicted_value}}
+    """
+    from src.prediction.iterative_inference import build_day_features, build_lag_resolver
+
+    resolvers = {
+        model_id: build_lag_resolver(start_date, days, ml_features_train, business_days_train, business_days_future)
+        for model_id in models
+    }
+    features = {model_id: challenger_features(challengers[model_id]) for model_id in models}
+    predictors = {model_id: model.get_booster().inplace_predict for model_id, model in models.items()}
+
+    for day in range(days):
+        for model_id, resolver in resolvers.items():
+            X_day = build_day_features(day, resolver, future_features, features[model_id])
+            resolver.set_prediction(resolver.day_positions(day), predictors[model_id](X_day))
+
+    return {model_id: resolver.predictions() for model_id, resolver in resolvers.items()}
@@ -0,0 +1,171 @@
+"""
+XGBoostモデルのNumPy推論バックエンド
+
+学習済みXGBRegressorの全決定木を、ノード単位の平坦なNumPy配列
+（分岐特徴量・閾値・子ノード・葉の値）に変換し、
+バッチの全行×全木をまとめて深さ方向に辿って予測する。
+DMatrixの作成やXGBoost予測器の呼び出しがないため、24行程度の小さなバッチ
+（batchモードの1日分）で速い。数百行以上のバッチではinplace_predictの方が速い
+（scripts/benchmark_compiled_trees.py で確認できる）。
+
+欠損値の分岐方向（default_left）は、特徴量行列を「欠損→-inf」「欠損→+inf」の2通りに
+展開しておき、ノードの分岐特徴量番号をどちらかの列に振り分けることで比較1回に畳み込む。
+
+対応範囲:
+    - gbtree（数値特徴量の分岐のみ・カテゴリ分岐は非対応）
+    - 恒等リンクの回帰目的関数（reg:squarederror など）
+"""
+
+import json
+
+import numpy as np
+
+INFERENCE_BACKENDS = ('xgboost', 'numpy')
+
+# 予測値 = base_score + 葉の値の合計 となる目的関数
+IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror')
+
+
+class CompiledTreeEnsemble:
+    """平坦化した決定木アンサンブル"""
+
+    def __init__(self, split_column, threshold, children, value, roots, max_depth, base_score, num_feature):
+        self.split_column = split_column
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_score = base_score
+        self.num_feature = num_feature
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        学習済みモデルから変換
+
+        Args:
+            model (XGBRegressor | Booster): 学習済みモデル
+
+        Returns:
+            CompiledTreeEnsemble: 変換済みアンサンブル
+        """
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        learner = json.loads(booster.save_raw('json'))['learner']
+
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"gbtree以外のモデルは変換できません: {learner['gradient_booster']['name']}")
+        if learner['objective']['name'] not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"恒等リンク以外の目的関数は変換できません: {learner['objective']['name']}")
+
+        trees = learner['gradient_booster']['model']['trees']
+        # early stopping済みモデルはpredict()と同じく最良イテレーションまでの木を使う
+        best_iteration = getattr(model, 'best_iteration', None) if hasattr(model, 'get_booster') else None
+        if best_iteration is not None:
+            trees = trees[:best_iteration + 1]
+
+        num_feature = int(learner['learner_model_param']['num_feature'])
+        split_column, threshold, children, value, roots = [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("カテゴリ分岐を含むモデルは変換できません")
+
+            tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+            tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+            n_nodes = len(tree_left)
+            nodes = np.arange(n_nodes)
+            is_leaf = tree_left < 0
+
+            # 子ノード [左, 右]（葉は自分自身を指し、深さ方向のループで葉に到達した行はそのまま留まる）
+            children.append(np.stack([
+                np.where(is_leaf, nodes, tree_left), np.where(is_leaf, nodes, tree_right)
+            ], axis=1) + offset)
+            # 欠損時に右へ進むノードは「欠損→+inf」側の列を参照する
+            default_left = np.asarray(tree['default_left'], dtype=bool)
+            split_column.append(np.asarray(tree['split_indices'], dtype=np.int64) + num_feature * ~default_left)
+            # 葉は常に左（自分自身）へ進むよう閾値を+infにする
+            threshold.append(np.where(is_leaf, np.inf, np.asarray(tree['split_conditions'], dtype=np.float32)))
+            # 葉ノードのsplit_conditionsは葉の値
+            value.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float32), 0.0))
+            roots.append(offset)
+
+            max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+            offset += n_nodes
+
+        return cls(
+            split_column=np.concatenate(split_column).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            children=np.concatenate(children).ravel().astype(np.intp),
+            value=np.concatenate(value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            base_score=_parse_base_score(learner['learner_model_param']['base_score']),
+            num_feature=num_feature,
+        )
+
+    def predict(self, X):
+        """
+        バッチ予測
+
+        Args:
+            X (ndarray): 特徴量行列（行数 × 特徴量数・学習時と同じ列順）
+
+        Returns:
+            ndarray: 予測値（float32）
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[1] != self.num_feature:
+            raise ValueError(f"特徴量数が一致しません: {X.shape[1]} != {self.num_feature}")
+
+        # [欠損→-inf（左へ進む） | 欠損→+inf（右へ進む）]
+        missing = np.isnan(X)
+        X_expanded = np.concatenate([np.where(missing, -np.inf, X), np.where(missing, np.inf, X)], axis=1)
+
+        # 行ごとの先頭位置（展開後の行列を1次元で参照する）
+        row_offsets = np.arange(len(X), dtype=np.intp)[:, np.newaxis] * X_expanded.shape[1]
+        X_flat = X_expanded.ravel()
+
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X_flat.take(self.split_column.take(node) + row_offsets)
+            # 「値 < 閾値」なら左（children[2*node]）、それ以外は右（children[2*node+1]）
+            node = self.children.take(2 * node + (x >= self.threshold.take(node)))
+
+        return (self.value.take(node).sum(axis=1, dtype=np.float32) + self.base_score).astype(np.float32)
+
+
+def _tree_depth(left, right):
+    """決定木の最大深さ（根から葉までの分岐回数）"""
+    depth = 0
+    frontier = np.array([0])
+    while True:
+        frontier = frontier[left[frontier] >= 0]
+        if len(frontier) == 0:
+            return depth
+        frontier = np.concatenate([left[frontier], right[frontier]])
+        depth += 1
+
+
+def _parse_base_score(base_score):
+    """base_score文字列を数値に変換（'5E-1' / '[5E-1]' 形式の両方に対応）"""
+    return np.float32(float(base_score.strip('[]').split(',')[0]))
+
+
+def make_predictor(model, backend='xgboost'):
+    """
+    特徴量行列 → 予測値 の推論関数を作成
+
+    Args:
+        model (XGBRegressor): 学習済みモデル
+        backend (str): 'xgboost'（Booster.inplace_predict）または 'numpy'（CompiledTreeEnsemble）
+
+    Returns:
+        callable: predictor(X) -> ndarray
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"推論バックエンドは {INFERENCE_BACKENDS} のいずれかを指定してください: {backend}")
+    if backend == 'numpy':
+        return CompiledTreeEnsemble.from_model(model).predict
+    return model.get_booster().inplace_predict
@@ -0,0 +1,199 @@
+"""
+直接多ホライズン予測（direct strategy）
+
+段階的予測（recursive）は予測値をlag特徴量として次の日の予測に再利用するため、
+14日分を1日ずつ順番に予測する必要があり、誤差も蓄積する。
+直接予測では予測実行日（起点）時点で確定している実績値だけをlag特徴量に使い、
+予測日数（days_ahead）の区間ごとに別モデルを学習する。予測値を再利用しないため、
+予測期間の全時間を区間モデルごとに1回のinplace_predictで一括予測できる。
+
+起点時点で確定しているlag特徴量（起点の前日23時までの実績値）:
+    - lag_origin_day          : 起点前日の同時刻
+    - lag_origin_week         : 予測対象と同じ曜日・同時刻の直近実績（7日前、起点以降なら14日前）
+    - lag_origin_business_day : 起点より前の直近営業日の同時刻（20日以内）
+
+学習データは、学習期間の各日を起点とみなして（起点, days_ahead, 時間）の組を作成する。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.prediction.lag_resolver import BUSINESS_DAY_LOOKBACK, HOURS_PER_DAY
+
+# days_aheadの区間（両端を含む）ごとに1モデル
+DIRECT_HORIZON_BUCKETS = ((0, 0), (1, 1), (2, 3), (4, 6), (7, 13))
+
+# 予測対象時刻の気象・カレンダー特徴量（段階的予測の12特徴量からlagを除いたもの）
+BASE_FEATURES = [
+    'hour',
+    'is_weekend',
+    'is_holiday',
+    'month',
+    'hour_sin',
+    'hour_cos',
+    'temperature_2m',
+    'relative_humidity_2m',
+    'precipitation',
+]
+
+DIRECT_FEATURES = BASE_FEATURES + [
+    'days_ahead',
+    'lag_origin_day',
+    'lag_origin_week',
+    'lag_origin_business_day',
+]
+
+
+def _hourly_frame(ml_features_train, future_features=None):
+    """学習データ（＋予測期間の特徴量）を0時始まりの連続した時間単位フレームに整形"""
+    columns = ['actual_power'] + BASE_FEATURES
+    frames = [ml_features_train[columns]]
+    if future_features is not None:
+        frames.append(future_features[BASE_FEATURES])
+    hourly = pd.concat(frames)
+    hourly = hourly[~hourly.index.duplicated(keep='first')]
+
+    index = pd.date_range(hourly.index.min().normalize(),
+                          hourly.index.max().normalize() + pd.Timedelta(hours=HOURS_PER_DAY - 1), freq='h')
+    return hourly.reindex(index)
+
+
+def _last_business_day_before(hourly):
+    """各日について、その日より前の直近営業日の日番号（BUSINESS_DAY_LOOKBACK日以内・なければ-1）"""
+    daily = hourly[['is_weekend', 'is_holiday']].iloc[::HOURS_PER_DAY]
+    known = daily.notna().all(axis=1).to_numpy()
+    non_business = (daily.fillna(True).astype(bool).any(axis=1)).to_numpy()
+    business = known & ~non_business
+
+    day_numbers = np.arange(len(daily))
+    latest = np.maximum.accumulate(np.where(business, day_numbers, -1))
+    before = np.concatenate([[-1], latest[:-1]])
+    before[(day_numbers - before) > BUSINESS_DAY_LOOKBACK] = -1
+    return before
+
+
+def build_direct_samples(hourly, origin_days, days_ahead):
+    """
+    （起点, days_ahead, 時間）の組ごとに直接予測の特徴量を作成
+
+    Args:
+        hourly (DataFrame): _hourly_frame() の戻り値
+        origin_days (array): 起点の日番号（hourlyの先頭日=0）
+        days_ahead (iterable): 予測日数（0=起点当日）
+
+    Returns:
+        tuple: (特徴量DataFrame（DIRECT_FEATURES）, 目的変数ndarray, 予測対象時刻DatetimeIndex)
+    """
+    actual = hourly['actual_power'].to_numpy(dtype=float)
+    business_before = _last_business_day_before(hourly)
+
+    origin, ahead, hour = np.meshgrid(
+        np.asarray(origin_days), np.asarray(list(days_ahead)), np.arange(HOURS_PER_DAY), indexing='ij'
+    )
+    origin, ahead, hour = origin.ravel(), ahead.ravel(), hour.ravel()
+    target = (origin + ahead) * HOURS_PER_DAY + hour
+    keep = (origin >= 1) & (target < len(actual))
+    origin, ahead, hour, target = origin[keep], ahead[keep], hour[keep], target[keep]
+
+    def lookup(positions):
+        values = np.full(len(positions), np.nan)
+        valid = positions >= 0
+        values[valid] = actual[positions[valid]]
+        return values
+
+    weeks_back = ahead // 7 + 1
+    business_day = business_before[origin]
+
+    X = hourly[BASE_FEATURES].iloc[target].astype('float32').reset_index(drop=True)
+    X['days_ahead'] = ahead.astype('float32')
+    X['lag_origin_day'] = lookup((origin - 1) * HOURS_PER_DAY + hour)
+    X['lag_origin_week'] = lookup(target - weeks_back * 7 * HOURS_PER_DAY)
+    X['lag_origin_business_day'] = lookup(np.where(business_day >= 0, business_day * HOURS_PER_DAY + hour, -1))
+
+    return X, actual[target], hourly.index[target]
+
+
+def _train_bucket(task):
+    """1区間分の学習データを作成してモデルを学習（プロセスプール用）"""
+    import xgboost as xgb
+
+    hourly, bucket, xgb_params, n_jobs = task
+    lo, hi = bucket
+    # 目的変数（実績値）が確定している起点のみ
+    last_day = len(hourly) // HOURS_PER_DAY
+    X, y, _ = build_direct_samples(hourly, np.arange(1, last_day), range(lo, hi + 1))
+    labeled = ~np.isnan(y)
+
+    model = xgb.XGBRegressor(**xgb_params, n_jobs=n_jobs)
+    model.fit(X[labeled], y[labeled])
+    return bucket, model
+
+
+def train_direct_models(ml_features_train, xgb_params, buckets=DIRECT_HORIZON_BUCKETS, workers=None, n_jobs=None):
+    """
+    区間ごとの直接予測モデルを学習
+
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        xgb_params (dict): XGBRegressorパラメータ
+        buckets (tuple): days_aheadの区間
+        workers (int): 並列プロセス数（1の場合は逐次学習・Noneの場合は区間数とCPUコア数の小さい方）
+        n_jobs (int): 1モデルあたりのXGBoostスレッド数（Noneの場合はCPUコア数÷並列数）
+
+    Returns:
+        dict: {(lo, hi): XGBRegressor}
+    """
+    import os
+
+    hourly = _hourly_frame(ml_features_train)
+    cpu_count = os.cpu_count() or 1
+    workers = workers or min(len(buckets), cpu_count)
+    n_jobs = n_jobs or max(1, cpu_count // workers)
+    tasks = [(hourly, bucket, xgb_params, n_jobs) for bucket in buckets]
+
+    if workers == 1:
+        return dict(_train_bucket(task) for task in tasks)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(_train_bucket, tasks))
+
+
+def predict_direct(models, start_date, days, future_features, ml_features_train):
+    """
+    直接予測（予測期間の全時間を区間モデルごとに一括予測）
+
+    Args:
+        models (dict): train_direct_models() の戻り値
+        start_date (Timestamp): 予測開始日（0時）
+        days (int): 予測日数
+        future_features (DataFrame): 予測期間の特徴量（datetimeインデックス）
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+
+    Returns:
+        dict: {datetime: predicted_value}
+    """
+    start_date = pd.Timestamp(start_date)
+    covered = max(hi for _, hi in models) + 1
+    if days > covered:
+        raise ValueError(f"直接予測モデルは{covered}日先までです: {days}日")
+
+    # 段階的予測と同じく、特徴量のない時刻をNaNのまま予測しない
+    hours = pd.date_range(start_date, periods=days * 24, freq='h')
+    missing = hours.difference(future_features.index)
+    if len(missing) > 0:
+        raise ValueError(f"予測対象日時 {missing[0]} が future_features に見つかりません")
+
+    hourly = _hourly_frame(ml_features_train, future_features)
+    origin_day = (start_date - hourly.index[0]).days
+    X, _, targets = build_direct_samples(hourly, [origin_day], range(days))
+
+    predicted = np.empty(len(X))
+    for (lo, hi), model in models.items():
+        rows = ((X['days_ahead'] >= lo) & (X['days_ahead'] <= hi)).to_numpy()
+        if rows.any():
+            predicted[rows] = model.get_booster().inplace_predict(X[rows])
+
+    print(f"直接予測完了: {len(predicted)}時間（区間モデル {len(models)}個）")
+    return dict(zip(targets, predicted.tolist()))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+特徴量DataFrameの型付きローダー
+
+BigQuery・Parquetキャッシュから取得したml_features / 予測期間の気象・カレンダーデータを、
+予測処理で使う「datetimeインデックス＋コンパクトな型」のDataFrameに変換する。
+
+    - datetimeインデックスは date（日単位）＋ hour（時間単位）の数値演算で作成
+      （文字列の連結・パースを行わない）
+    - 連続値はfloat32、時間・月・天気コードはint8、週末・祝日フラグはbool、曜日はcategory
+      （欠損を含む整数列はfloat32、欠損を含むフラグ列はpandasのnullable boolean）
+
+XGBoostは内部でfloat32に変換して学習・予測するため、float32への変換で予測値は変わらない。
+
+実行方法（全期間の学習データでメモリ使用量を比較）:
+    python -m src.prediction.feature_frame
+    python -m src.prediction.feature_frame --until 2025-06-30
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+FLOAT_COLUMNS = [
+    'actual_power',
+    'supply_capacity',
+    'temperature_2m',
+    'relative_humidity_2m',
+    'precipitation',
+    'hour_sin',
+    'hour_cos',
+    'lag_1_day',
+    'lag_7_day',
+    'lag_1_business_day',
+]
+INT8_COLUMNS = ['hour', 'month', 'weather_code']
+BOOL_COLUMNS = ['is_weekend', 'is_holiday']
+CATEGORY_COLUMNS = ['day_of_week']
+
+
+def build_datetime_index(dates, hours):
+    """
+    date列・hour列からdatetimeインデックスを作成（日単位＋時間単位の加算）
+
+    Args:
+        dates: 日付（date型・datetime64・'YYYY-MM-DD'文字列のいずれか）
+        hours: 時間（0-23）
+
+    Returns:
+        DatetimeIndex: 'datetime'という名前のインデックス
+    """
+    # 日付の変換はユニークな日付ごとに1回（pandasのキャッシュ）で済み、時間は整数加算のみ
+    days = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    offsets = pd.Series(hours).to_numpy(dtype=np.int64).astype('timedelta64[h]')
+    return pd.DatetimeIndex(days + offsets, name='datetime')
+
+
+def downcast_features(df):
+    """
+    特徴量カラムをコンパクトな型に変換（存在するカラムのみ・元のDataFrameは変更しない）
+
+    Args:
+        df (DataFrame): 特徴量DataFrame
+
+    Returns:
+        DataFrame: 型変換後のDataFrame
+    """
+    df = df.copy()
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column]).to_numpy(dtype=np.float32, na_value=np.nan)
+    for column in INT8_COLUMNS:
+        if column in df:
+            values = pd.to_numeric(df[column])
+            df[column] = values.astype(np.float32 if values.isna().any() else np.int8)
+    for column in BOOL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('boolean' if df[column].isna().any() else bool)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def to_feature_frame(df):
+    """
+    date・hour列を持つDataFrameを、datetimeインデックス（時刻順）・コンパクト型に変換
+
+    Args:
+        df (DataFrame): date・hour列を持つ特徴量DataFrame
+
+    Returns:
+        DataFrame: datetimeインデックスのDataFrame（date列は除く）
+    """
+    index = build_datetime_index(df['date'], df['hour'])
+    frame = downcast_features(df.drop(columns='date'))
+    frame.index = index
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    return frame
+
+
+def memory_usage_mb(df):
+    """DataFrameのメモリ使用量（MB・object列の中身とインデックスを含む）"""
+    return df.memory_usage(deep=True, index=True).sum() / 1024 ** 2
+
+
+def _legacy_feature_frame(df):
+    """従来方式（文字列連結でdatetime作成・型変換なし）"""
+    df = df.copy()
+    df['datetime'] = pd.to_datetime(
+        df['date'].astype(str) + ' ' +
+        df['hour'].astype(str).str.zfill(2) + ':00:00'
+    )
+    return df.set_index('datetime')
+
+
+def main():
+    """メイン関数（全期間の学習データで従来方式と型付きローダーを比較）"""
+    parser = argparse.ArgumentParser(description='特徴量DataFrameのメモリ使用量比較')
+    parser.add_argument('--until', type=str, help='学習データ最終日 (YYYY-MM-DD形式、デフォルト: 昨日)')
+    args = parser.parse_args()
+
+    if args.until:
+        try:
+            until_date = datetime.strptime(args.until, '%Y-%m-%d').date()
+        except ValueError:
+            print("日付形式が正しくありません。YYYY-MM-DD形式で指定してください。")
+            sys.exit(1)
+    else:
+        until_date = datetime.now().date() - timedelta(days=1)
+
+    from google.cloud import bigquery
+    from src.prediction.training_data_cache import TrainingDataCache
+
+    client = bigquery.Client(project='energy-env')
+    raw, _ = TrainingDataCache().load(client, until_date)
+    print(f"ml_features取得完了: {len(raw):,}件")
+
+    started = time.perf_counter()
+    legacy = _legacy_feature_frame(raw)
+    legacy_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    typed = to_feature_frame(raw)
+    typed_sec = time.perf_counter() - started
+
+    if not legacy.index.equals(typed.index):
+        raise AssertionError("datetimeインデックスが従来方式と一致しません")
+
+    print("=" * 60)
+    print(f"{'':<12} {'メモリ[MB]':>12} {'作成時間[秒]':>14}")
+    print(f"{'従来方式':<12} {memory_usage_mb(legacy):>12.1f} {legacy_sec:>14.3f}")
+    print(f"{'型付き':<12} {memory_usage_mb(typed):>12.1f} {typed_sec:>14.3f}")
+    print("=" * 60)
+    print(typed.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
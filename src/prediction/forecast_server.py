@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+常駐型の予測HTTPサーバー（ローカル用）
+
+日次予測（prediction_iterative_with_export）と同じ学習済みモデル・学習データ末尾・予測期間の
+気象データをメモリ上に保持し、予測リクエストにBigQuery接続・再学習なしで応答する。
+モデルキャッシュディレクトリ（data/models）を監視し、同じ設定（パラメータ・学習エンジン・特徴量）で
+学習データの新しいモデルが保存されたら自動で差し替える（学習データの最終日が進んでいれば入力データも読み直す）。
+
+エンドポイント:
+    GET  /health                 状態（予測実行日・モデルキー・読み込み日時）
+    GET  /forecast?days=14       段階的予測（batchモード）
+    POST /forecast               気象シナリオ予測（what-if）
+         {"days": 14, "scenarios": {"temp_plus_2": {"temperature_2m": 2.0}}}
+    POST /reload                 入力データ・モデルを読み直し
+
+実行方法:
+    python -m src.prediction.forecast_server
+    python -m src.prediction.forecast_server --port 8080 --run-date 2025-10-25 --watch-interval 30
+    python -m src.prediction.forecast_server --training-engine hist  # 日次予測を --training-engine hist で実行する場合
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from urllib.parse import parse_qs, urlparse
+
+logger = getLogger('energy_env.forecast_server')
+
+
+class ForecastState:
+    """予測に必要なメモリ上のデータ一式（差し替え時は新しいインスタンスに置き換える）"""
+
+    def __init__(self, run_date, horizon_days, model, fingerprint, ml_features_tail,
+                 future_features, business_days_train, business_days_future, inference_backend='xgboost'):
+        from src.prediction.compiled_trees import make_predictor
+
+        self.run_date = run_date
+        self.horizon_days = horizon_days
+        self.model = model
+        self.fingerprint = fingerprint
+        self.model_key = fingerprint['key']
+        self.inference_backend = inference_backend
+        self.predictor = make_predictor(model, inference_backend)
+        self.ml_features_tail = ml_features_tail
+        self.future_features = future_features
+        self.business_days_train = business_days_train
+        self.business_days_future = business_days_future
+        self.loaded_at = datetime.now()
+
+    def with_model(self, model, fingerprint):
+        """モデルだけ差し替えた新しい状態を作成"""
+        return ForecastState(
+            self.run_date, self.horizon_days, model, fingerprint, self.ml_features_tail,
+            self.future_features, self.business_days_train, self.business_days_future, self.inference_backend
+        )
+
+
+def load_state(client, run_date, horizon_days, inference_backend='xgboost', engine_config=None):
+    """
+    BigQuery（学習データはローカルキャッシュ）から入力を取得し、モデルを学習またはキャッシュから読み込む
+
+    Args:
+        client: BigQueryクライアント
+        run_date (date): 予測実行日
+        horizon_days (int): 予測日数
+        inference_backend (str): 推論バックエンド（compiled_trees.INFERENCE_BACKENDS）
+        engine_config (dict): 学習エンジン設定（training_engine.load_engine_config()・日次予測と同じ設定で
+                              モデルキャッシュを照合する。Noneの場合はsklearn）
+
+    Returns:
+        ForecastState: 予測用データ一式
+    """
+    import pandas as pd
+    from src.prediction.iterative_inference import FEATURES
+    from src.prediction.lag_resolver import BUSINESS_DAY_LOOKBACK
+    from src.prediction.prediction_iterative_with_export import (
+        load_forecast_inputs, load_xgb_params, prepare_business_days, train_or_load_model
+    )
+
+    ml_features_train, calendar_data, future_features, _ = load_forecast_inputs(client, run_date, horizon_days)
+    xgb_params, _ = load_xgb_params()
+    model, _, fingerprint = train_or_load_model(ml_features_train, FEATURES, xgb_params=xgb_params,
+                                                engine_config=engine_config)
+    business_days_train, business_days_future = prepare_business_days(ml_features_train, calendar_data, run_date)
+
+    # ラグ参照に必要な直近分（予測開始前BUSINESS_DAY_LOOKBACK日）だけ保持
+    tail_start = pd.Timestamp(run_date) - pd.Timedelta(days=BUSINESS_DAY_LOOKBACK)
+    ml_features_tail = ml_features_train[ml_features_train.index >= tail_start][['actual_power']].copy()
+
+    return ForecastState(
+        run_date, horizon_days, model, fingerprint, ml_features_tail,
+        future_features, business_days_train, business_days_future, inference_backend
+    )
+
+
+class ForecastServer(ThreadingHTTPServer):
+    """予測状態を保持するHTTPサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, address, client, run_date, horizon_days, watch_interval=30, inference_backend='xgboost',
+                 engine_config=None):
+        from src.prediction.training_engine import load_engine_config
+
+        super().__init__(address, ForecastRequestHandler)
+        self.client = client
+        self.inference_backend = inference_backend
+        self.engine_config = engine_config or load_engine_config()
+        self.fixed_run_date = run_date
+        self.horizon_days = horizon_days
+        self.watch_interval = watch_interval
+        self.reload_lock = threading.Lock()
+        self.state = None
+        self.reload()
+
+    def reload(self, run_date=None):
+        """入力データ・モデルを読み直して状態を差し替え"""
+        with self.reload_lock:
+            run_date = run_date or self.fixed_run_date or datetime.now().date()
+            started = time.perf_counter()
+            self.state = load_state(self.client, run_date, self.horizon_days, self.inference_backend,
+                                    self.engine_config)
+            print(f"予測状態読み込み完了: 予測実行日 {run_date}, モデル {self.state.model_key} "
+                  f"({time.perf_counter() - started:.1f}秒)")
+            return self.state
+
+    def newer_cached_model(self, model_cache):
+        """
+        現在のモデルと同じ設定（パラメータ・学習エンジン・特徴量）で、より新しい学習データのモデルを探す
+
+        過去日の再実行等で後から保存された古い学習データのモデルや、設定の違うモデルは対象外。
+        予測実行日を固定している場合は、予測実行日より前の学習データのモデルに限る。
+
+        Returns:
+            tuple: (メタデータのパス, 指紋dict) | (None, None)
+        """
+        def normalize(value):
+            return json.dumps(value, sort_keys=True, default=str)
+
+        current = self.state.fingerprint
+        # メタデータの存在＝保存完了（直接予測の区間モデル・キャッシュ以外のファイルは対象外）
+        for meta_path in model_cache.meta_files(include_horizon_models=False):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                fingerprint = json.load(f)['fingerprint']
+            if (fingerprint['key'] == current['key']
+                    or normalize(fingerprint['model_params']) != normalize(current['model_params'])
+                    or fingerprint['features'] != current['features']
+                    or datetime.fromisoformat(fingerprint['max_datetime'])
+                    <= datetime.fromisoformat(current['max_datetime'])):
+                continue
+            trained_until = datetime.fromisoformat(fingerprint['max_datetime']).date()
+            if self.fixed_run_date is not None and trained_until >= self.fixed_run_date:
+                continue
+            return meta_path, fingerprint
+        return None, None
+
+    def watch_model_cache(self, stop_event):
+        """モデルキャッシュを監視し、新しいモデルが保存されたら差し替え（バックグラウンドスレッド）"""
+        import xgboost as xgb
+        from src.prediction.model_cache import ModelCache
+
+        model_cache = ModelCache()
+        while not stop_event.wait(self.watch_interval):
+            try:
+                meta_path, fingerprint = self.newer_cached_model(model_cache)
+                if meta_path is None:
+                    continue
+
+                # 学習データの最終日が進んでいれば、翌日を予測実行日として入力ごと読み直す
+                trained_until = datetime.fromisoformat(fingerprint['max_datetime']).date()
+                if self.fixed_run_date is None and trained_until + timedelta(days=1) > self.state.run_date:
+                    self.reload(trained_until + timedelta(days=1))
+                    continue
+
+                model = xgb.XGBRegressor()
+                model.load_model(meta_path.with_suffix('.ubj'))
+                self.state = self.state.with_model(model, fingerprint)
+                print(f"モデル差し替え: {fingerprint['key']}")
+            except Exception as e:
+                logger.error(f"モデル監視エラー: {e}")
+
+
+class ForecastRequestHandler(BaseHTTPRequestHandler):
+    """予測リクエストハンドラー"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _days(self, state, requested):
+        days = int(requested or state.horizon_days)
+        if not 1 <= days <= state.horizon_days:
+            raise ValueError(f"daysは1～{state.horizon_days}で指定してください: {days}")
+        return days
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        state = self.server.state
+        try:
+            if url.path == '/health':
+                self._send_json(200, {
+                    'status': 'ok',
+                    'run_date': state.run_date,
+                    'horizon_days': state.horizon_days,
+                    'model_key': state.model_key,
+                    'inference_backend': state.inference_backend,
+                    'loaded_at': state.loaded_at.isoformat(),
+                })
+            elif url.path == '/forecast':
+                days = self._days(state, parse_qs(url.query).get('days', [None])[0])
+                self._send_json(200, forecast(state, days))
+            else:
+                self._send_json(404, {'error': f"not found: {url.path}"})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            logger.error(f"予測エラー: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == '/forecast':
+                request = self._read_json()
+                state = self.server.state
+                days = self._days(state, request.get('days'))
+                scenarios = request.get('scenarios')
+                if scenarios:
+                    self._send_json(200, forecast_scenarios(state, days, scenarios))
+                else:
+                    self._send_json(200, forecast(state, days))
+            elif url.path == '/reload':
+                state = self.server.reload()
+                self._send_json(200, {'status': 'reloaded', 'run_date': state.run_date, 'model_key': state.model_key})
+            else:
+                self._send_json(404, {'error': f"not found: {url.path}"})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            logger.error(f"予測エラー: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def forecast(state, days):
+    """保持中のモデル・データで段階的予測（batchモード）"""
+    import contextlib
+    import io
+    import pandas as pd
+    from src.prediction.iterative_inference import predict_batched
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictions = predict_batched(
+            state.model, pd.Timestamp(state.run_date), days, state.future_features, state.ml_features_tail,
+            state.business_days_train, state.business_days_future, predictor=state.predictor
+        )
+    return {
+        'run_date': state.run_date,
+        'model_key': state.model_key,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'predictions': [
+            {'datetime': target.isoformat(), 'predicted_power_kwh': round(float(value), 2)}
+            for target, value in predictions.items()
+        ],
+    }
+
+
+def forecast_scenarios(state, days, scenarios):
+    """保持中のモデル・データで気象シナリオ予測（what-if）"""
+    import contextlib
+    import io
+    import pandas as pd
+    from src.prediction.iterative_inference import predict_scenarios
+    from src.prediction.weather_scenarios import WEATHER_FEATURES, build_weather_tensor, summarize_scenario_bands
+
+    unknown = {feature for deltas in scenarios.values() for feature in deltas} - set(WEATHER_FEATURES)
+    if unknown:
+        raise ValueError(f"シナリオで指定できる特徴量は {WEATHER_FEATURES} です: {sorted(unknown)}")
+
+    started = time.perf_counter()
+    start_date = pd.Timestamp(state.run_date)
+    weather_tensor = build_weather_tensor(state.future_features, start_date, days, scenarios)
+    with contextlib.redirect_stdout(io.StringIO()):
+        values, index = predict_scenarios(
+            state.model, start_date, days, state.future_features, state.ml_features_tail,
+            state.business_days_train, state.business_days_future, weather_tensor, WEATHER_FEATURES,
+            predictor=state.predictor
+        )
+    bands = summarize_scenario_bands(values, index, list(scenarios))
+
+    return {
+        'run_date': state.run_date,
+        'model_key': state.model_key,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'datetimes': [target.isoformat() for target in index],
+        'scenarios': {name: [round(float(v), 2) for v in row] for name, row in zip(scenarios, values)},
+        'bands': bands.drop(columns=['prediction_date', 'prediction_hour']).to_dict(orient='list'),
+    }
+
+
+def main():
+    """メイン関数"""
+    from src.prediction.compiled_trees import INFERENCE_BACKENDS
+    from src.prediction.training_engine import TRAINING_ENGINES, load_engine_config
+
+    parser = argparse.ArgumentParser(description='常駐型の予測HTTPサーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けアドレス (デフォルト: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='待ち受けポート (デフォルト: 8080)')
+    parser.add_argument('--run-date', type=str,
+                        help='予測実行日 YYYY-MM-DD（固定・省略時は今日、新しいモデル保存時に自動更新）')
+    parser.add_argument('--horizon-days', type=int, default=14, help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--watch-interval', type=int, default=30,
+                        help='モデルキャッシュの監視間隔（秒） (デフォルト: 30)')
+    parser.add_argument('--inference-backend', choices=INFERENCE_BACKENDS, default='xgboost',
+                        help='推論バックエンド: xgboost=inplace_predict, numpy=決定木の平坦化配列で評価（デフォルト: xgboost）')
+    parser.add_argument('--training-engine', choices=TRAINING_ENGINES, default='sklearn',
+                        help='日次予測と同じ学習エンジン（モデルキャッシュの照合・差し替え対象の判定に使う・デフォルト: sklearn）')
+    parser.add_argument('--nthread', type=int,
+                        help='キャッシュミス時の学習スレッド数（デフォルト: XGBoostのデフォルト・histはCPUコア数）')
+    args = parser.parse_args()
+
+    run_date = datetime.strptime(args.run_date, '%Y-%m-%d').date() if args.run_date else None
+
+    from google.cloud import bigquery
+    client = bigquery.Client(project='energy-env')
+
+    server = ForecastServer((args.host, args.port), client, run_date, args.horizon_days, args.watch_interval,
+                            args.inference_backend, load_engine_config(args.training_engine, nthread=args.nthread))
+    stop_event = threading.Event()
+    watcher = threading.Thread(target=server.watch_model_cache, args=(stop_event,), daemon=True)
+    watcher.start()
+
+    print(f"予測サーバー起動: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("予測サーバー停止")
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
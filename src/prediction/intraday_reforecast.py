@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+日中の差分再予測
+
+14日間予測は毎朝07:00に1回作成するが、TEPCOの当日実績は日中に1時間ごとに公表される。
+全体を再実行（再学習・全336時間の再予測）する代わりに、朝の予測結果と学習済みモデルキャッシュを再利用し、
+新しく公表された実績値でラグ特徴量が変わる時刻だけを再予測する。
+
+再予測の範囲:
+    ラグ特徴量（lag_1_day / lag_7_day / lag_1_business_day）はすべて「同時刻」の過去の値を参照するため、
+    当日h時の実績値が影響するのは翌日以降のh時の予測だけ（予測値を介した伝播もh時の列内に閉じる）。
+    朝の予測値をLagResolverのバッファに戻し、当日の実績値で置き換えたうえで、
+    実績が入った時刻の列だけを翌日以降について1日ずつ再予測する。
+
+前提:
+    - モデルは朝の予測と同じ学習データ（前日まで）・学習エンジン設定の指紋でモデルキャッシュから読み込む
+      （朝の予測を --training-engine hist で実行した場合は同じ指定が必要）
+    - 気象予報は朝以降に更新されていても、再予測対象外の時刻には反映しない
+    - 当日（予測開始日）の予測値は当日の実績値に依存しないため朝の予測のまま
+
+実行方法:
+    python -m src.prediction.intraday_reforecast
+    python -m src.prediction.intraday_reforecast --run-date 2025-10-25 --inference-backend numpy
+    python -m src.prediction.intraday_reforecast --training-engine hist
+
+出力:
+    {ENERGY_ENV_PATH}/data/predictions/intraday/reforecast_{run_date}_{HHMMSS}.parquet
+        prediction_resultsと同じスキーマ（execution_idは再予測ごとに新規発行）
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def get_predictions_dir():
+    """予測結果Parquetの保存先（prediction_iterative_with_exportが出力）"""
+    energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+    return Path(energy_env_path) / 'data' / 'predictions'
+
+
+def load_morning_predictions(run_date, predictions_dir=None):
+    """
+    予測実行日の最新の予測結果（朝の14日間予測）をローカルParquetから取得
+
+    Args:
+        run_date (date): 予測実行日
+        predictions_dir (str): 予測結果Parquetのディレクトリ（Noneの場合はget_predictions_dir()）
+
+    Returns:
+        tuple: (予測値Series（datetimeインデックス）, 予測結果dict {'execution_id', 'path'})
+    """
+    import pyarrow.parquet as pq
+    from src.prediction.challengers import CHAMPION_MODEL_ID
+
+    predictions_dir = Path(predictions_dir) if predictions_dir else get_predictions_dir()
+    # ファイル名のタイムスタンプ降順（新しい順）に、予測実行日が一致する最初のファイルを使う
+    for path in sorted(predictions_dir.glob('predictions_*.parquet'), reverse=True):
+        run_dates = pq.read_table(path, columns=['prediction_run_date'])['prediction_run_date']
+        if len(run_dates) == 0 or run_dates[0].as_py() != run_date:
+            continue
+
+        table = pq.read_table(path).to_pandas()
+        if 'model_id' in table:
+            # チャレンジャーの予測は除き、本番モデルの予測だけを基準にする
+            table = table[table['model_id'] == CHAMPION_MODEL_ID]
+        index = pd.to_datetime(table['prediction_date']) + pd.to_timedelta(table['prediction_hour'], unit='h')
+        morning = pd.Series(table['predicted_power_kwh'].to_numpy(), index=pd.DatetimeIndex(index, name='datetime'))
+        return morning.sort_index(), {'execution_id': table['execution_id'].iloc[0], 'path': str(path)}
+
+    raise FileNotFoundError(f"予測実行日 {run_date} の予測結果が {predictions_dir} に見つかりません")
+
+
+def fetch_observed_actuals(client, run_date):
+    """
+    予測実行日の公表済み実績値をenergy_data_hourlyから取得
+
+    Args:
+        client: BigQueryクライアント
+        run_date (date): 予測実行日
+
+    Returns:
+        Series: 実績値（datetimeインデックス・公表済みの時刻のみ）
+    """
+    from src.prediction.feature_frame import build_datetime_index
+    from src.utils.bq_reader import read_query_dataframe
+
+    query = f"""
+    SELECT
+        date,
+        hour,
+        actual_power
+    FROM `energy-env.prod_energy_data.energy_data_hourly`
+    WHERE date = '{run_date:%Y-%m-%d}'
+        AND actual_power IS NOT NULL
+    ORDER BY hour
+    """
+    observed = read_query_dataframe(client, query)
+    return pd.Series(
+        observed['actual_power'].to_numpy(dtype=np.float64),
+        index=build_datetime_index(observed['date'], observed['hour'])
+    )
+
+
+def reforecast(resolver, morning, observed, future_features, predictor, features=None):
+    """
+    朝の予測値と当日実績値から、実績が入った時刻の列だけを翌日以降について再予測
+
+    Args:
+        resolver (LagResolver): 予測期間全体のラグ特徴量リゾルバー（学習データの実績値のみ格納済み）
+        morning (Series): 朝の予測値（datetimeインデックス・予測期間全体）
+        observed (Series): 予測期間内の公表済み実績値（datetimeインデックス）
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        predictor (callable): 特徴量行列 → 予測値 の推論関数
+        features (list): 特徴量名リスト（Noneの場合はiterative_inference.FEATURES）
+
+    Returns:
+        tuple: (予測結果辞書 {datetime: predicted_value}, 再予測した時刻数)
+    """
+    from src.prediction.iterative_inference import FEATURES, build_position_features
+    from src.prediction.lag_resolver import HOURS_PER_DAY
+
+    features = features or FEATURES
+
+    # 朝の予測値をバッファに戻し、公表済みの時刻だけ実績値で置き換える
+    resolver.set_prediction(resolver.positions(morning.index), morning.to_numpy(dtype=np.float64))
+    observed_pos = resolver.positions(observed.index)
+    resolver.set_prediction(observed_pos, observed.to_numpy(dtype=np.float64))
+
+    # 実績が入った時刻の列（時・最初の日）
+    dirty_hours = np.unique((observed_pos - resolver.start_pos) % HOURS_PER_DAY)
+    first_day = int((observed_pos.min() - resolver.start_pos) // HOURS_PER_DAY)
+
+    recomputed = 0
+    for day in range(first_day + 1, resolver.days):
+        positions = resolver.day_positions(day)[dirty_hours]
+        X = build_position_features(positions, resolver, future_features, features)
+        resolver.set_prediction(positions, predictor(X))
+        recomputed += len(positions)
+
+    # 実績値で置き換えた時刻は、予測結果としては朝の予測値のまま出力する
+    predictions = resolver.predictions()
+    for target_datetime in observed.index:
+        predictions[target_datetime] = morning[target_datetime]
+    return predictions, recomputed
+
+
+def save_reforecast(predictions, execution_id, run_date):
+    """
+    再予測結果をprediction_resultsと同じスキーマのParquetでローカル保存
+
+    朝の予測結果（data/predictions/predictions_*.parquet）とは別ディレクトリに保存し、
+    次回の再予測の基準（朝の予測）として読まれないようにする。
+
+    Returns:
+        str: 保存したファイルパス
+    """
+    import pyarrow.parquet as pq
+    from src.prediction.prediction_iterative_with_export import build_prediction_table
+
+    output_dir = get_predictions_dir() / 'intraday'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"reforecast_{run_date:%Y%m%d}_{datetime.now():%H%M%S}.parquet"
+    pq.write_table(build_prediction_table(predictions, execution_id, run_date), output_path)
+    return str(output_path)
+
+
+def run_reforecast(run_date=None, horizon_days=14, client=None, inference_backend='xgboost', save=True,
+                   training_engine='sklearn', nthread=None):
+    """
+    朝の予測結果・モデルキャッシュを再利用して日中の差分再予測を実行
+
+    Args:
+        run_date (date | str): 予測実行日（Noneの場合は今日）
+        horizon_days (int): 予測日数（朝の予測と同じ）
+        client: BigQueryクライアント（Noneの場合は新規作成）
+        inference_backend (str): 推論バックエンド（compiled_trees.INFERENCE_BACKENDS）
+        save (bool): 再予測結果をParquetに保存するか
+        training_engine (str): 朝の予測と同じ学習エンジン（training_engine.TRAINING_ENGINES・モデルキャッシュの照合に使う）
+        nthread (int): キャッシュミス時の学習スレッド数
+
+    Returns:
+        dict: 実行結果 {'execution_id', 'base_execution_id', 'predictions', 'observed_hours',
+                        'recomputed_hours', 'model_cache', 'output_path', 'timings'}
+    """
+    from src.prediction.compiled_trees import make_predictor
+    from src.prediction.iterative_inference import FEATURES, build_lag_resolver
+    from src.prediction.prediction_iterative_with_export import (
+        load_forecast_inputs, load_xgb_params, prepare_business_days, train_or_load_model
+    )
+    from src.prediction.training_engine import load_engine_config
+
+    engine_config = load_engine_config(training_engine, nthread=nthread)
+
+    if run_date is None:
+        run_date = datetime.now().date()
+    elif isinstance(run_date, str):
+        run_date = datetime.strptime(run_date, '%Y-%m-%d').date()
+
+    if client is None:
+        from google.cloud import bigquery
+        client = bigquery.Client(project='energy-env')
+
+    timings = {}
+    started = time.perf_counter()
+    morning, base = load_morning_predictions(run_date)
+    expected_hours = horizon_days * 24
+    if len(morning) != expected_hours:
+        raise ValueError(f"朝の予測結果の時間数が予測期間と一致しません: {len(morning)} != {expected_hours}")
+    print(f"朝の予測結果読み込み完了: {base['path']}")
+
+    ml_features_train, calendar_data, future_features, _ = load_forecast_inputs(client, run_date, horizon_days)
+    observed = fetch_observed_actuals(client, run_date)
+    timings['load'] = time.perf_counter() - started
+    print(f"当日実績値: {len(observed)}時間分")
+
+    started = time.perf_counter()
+    xgb_params, _ = load_xgb_params()
+    model, model_cache_status, _ = train_or_load_model(ml_features_train, FEATURES, xgb_params=xgb_params,
+                                                       engine_config=engine_config)
+    if model_cache_status != 'HIT':
+        print(f"警告: 朝の予測と同じモデルがキャッシュにありません（再学習しました: {model_cache_status}）")
+    predictor = make_predictor(model, inference_backend)
+    timings['model'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    start_date = pd.Timestamp(run_date)
+    if observed.empty:
+        predictions, recomputed = morning.to_dict(), 0
+    else:
+        business_days_train, business_days_future = prepare_business_days(ml_features_train, calendar_data, run_date)
+        resolver = build_lag_resolver(start_date, horizon_days, ml_features_train,
+                                      business_days_train, business_days_future)
+        predictions, recomputed = reforecast(resolver, morning, observed, future_features, predictor)
+    timings['predict'] = time.perf_counter() - started
+
+    execution_id = str(uuid.uuid4())
+    output_path = save_reforecast(predictions, execution_id, run_date) if save else None
+
+    print("=" * 60)
+    print(f"差分再予測完了: 再予測 {recomputed}/{expected_hours}時間 "
+          f"(読み込み {timings['load']:.2f}秒, モデル {timings['model']:.2f}秒, 予測 {timings['predict']:.3f}秒)")
+    if output_path:
+        print(f"保存ファイル: {output_path}")
+
+    return {
+        'execution_id': execution_id,
+        'base_execution_id': base['execution_id'],
+        'predictions': predictions,
+        'observed_hours': len(observed),
+        'recomputed_hours': recomputed,
+        'model_cache': model_cache_status,
+        'output_path': output_path,
+        'timings': timings,
+    }
+
+
+def main():
+    """メイン関数"""
+    from src.prediction.compiled_trees import INFERENCE_BACKENDS
+    from src.prediction.training_engine import TRAINING_ENGINES
+
+    parser = argparse.ArgumentParser(description='日中の差分再予測（朝の予測結果＋当日実績値）')
+    parser.add_argument('--run-date', type=str, help='予測実行日 (YYYY-MM-DD形式・デフォルト: 今日)')
+    parser.add_argument('--horizon-days', type=int, default=14, help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--inference-backend', choices=INFERENCE_BACKENDS, default='xgboost',
+                        help='推論バックエンド（デフォルト: xgboost）')
+    parser.add_argument('--training-engine', choices=TRAINING_ENGINES, default='sklearn',
+                        help='朝の予測と同じ学習エンジン（モデルキャッシュの照合に使う・デフォルト: sklearn）')
+    parser.add_argument('--nthread', type=int, help='キャッシュミス時の学習スレッド数')
+    args = parser.parse_args()
+
+    try:
+        run_reforecast(run_date=args.run_date, horizon_days=args.horizon_days,
+                       inference_backend=args.inference_backend,
+                       training_engine=args.training_engine, nthread=args.nthread)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"差分再予測エラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+段階的予測（14日間）の推論モジュール
+
+予測値をラグ特徴量として次の予測に再利用する段階的予測を実行する。
+2つの推論モードを提供:
+    - hourly: 1時間ずつ特徴量を準備して予測（従来方式・336回predict）
+    - batch : 1日24時間分の特徴量行列を一括構築して1回のinplace_predictで予測
+
+lag_1_day / lag_7_day / lag_1_business_day はいずれも1日以上前を参照するため、
+同じ日の24時間は互いに依存しない。よって日単位の一括予測でも結果は従来方式と一致する。
+
+ラグ特徴量はどちらのモードもLagResolver（実績値＋予測値の時間単位バッファ）から
+配列の位置参照で取得する。
+
+気象シナリオ予測（predict_scenarios）はbatchモードを全シナリオに拡張したもので、
+1日ごとにシナリオ数×24時間分をまとめて1回のinplace_predictで予測する。
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.prediction.lag_resolver import LagResolver
+
+# Phase 9で使用した12特徴量
+FEATURES = [
+    'hour',                   # 時間（0-23）
+    'is_weekend',             # 週末フラグ
+    'is_holiday',             # 祝日フラグ
+    'month',                  # 月（1-12）
+    'hour_sin',               # 時間周期性（sin）
+    'hour_cos',               # 時間周期性（cos）
+    'lag_1_day',              # 1日前同時刻（重要！）
+    'lag_7_day',              # 7日前同時刻
+    'lag_1_business_day',     # 1営業日前同時刻（重要度84.3%！）
+    'temperature_2m',         # 気温
+    'relative_humidity_2m',   # 湿度
+    'precipitation'           # 降水量
+]
+
+INFERENCE_MODES = ('batch', 'hourly')
+
+LAG_FEATURES = ('lag_1_day', 'lag_7_day', 'lag_1_business_day')
+
+
+def build_lag_resolver(start_date, days, ml_features_train, business_days_train, business_days_future,
+                       scenarios=None):
+    """
+    学習データ・営業日情報からLagResolverを構築
+
+    Args:
+        start_date (Timestamp): 予測開始日（0時）
+        days (int): 予測日数
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        business_days_train (DataFrame): 学習データのうち営業日の実績値
+        business_days_future (Index): 予測期間の営業日（date）
+        scenarios (int): シナリオ数（気象シナリオ予測用）
+
+    Returns:
+        LagResolver: ラグ特徴量リゾルバー
+    """
+    return LagResolver(
+        ml_features_train['actual_power'], business_days_train.index,
+        business_days_future, start_date, days, scenarios
+    )
+
+
+def prepare_features(target_datetime, resolver, future_features, features=FEATURES):
+    """
+    予測対象時刻の特徴量を準備（BQ対応版・hourlyモード用）
+
+    Args:
+        target_datetime: 予測対象日時
+        resolver (LagResolver): ラグ特徴量リゾルバー（予測済みの値を保持）
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        features (list): 特徴量名リスト
+
+    Returns:
+        list: 特徴量の値リスト
+    """
+    # future_featuresから該当時刻のデータを取得
+    if target_datetime not in future_features.index:
+        raise ValueError(f"予測対象日時 {target_datetime} が future_features に見つかりません")
+
+    # 基本特徴量を取得（気象・カレンダー・循環特徴量）
+    row = future_features.loc[target_datetime]
+    lags = resolver.lags(resolver.position(target_datetime))
+
+    feature_values = []
+    for feature in features:
+        if feature in LAG_FEATURES:
+            # ラグ特徴量はバッファから取得（予測値優先・予測期間前は実績値）
+            feature_values.append(float(lags[feature]))
+        else:
+            # その他の特徴量はfuture_featuresから取得
+            feature_values.append(row[feature])
+
+    return feature_values
+
+
+def predict_hourly(model, start_date, days, future_features, ml_features_train,
+                   business_days_train, business_days_future, features=FEATURES):
+    """
+    1時間ずつ段階的予測を実行（従来方式）
+
+    Args:
+        model: 学習済みXGBRegressor
+        start_date (Timestamp): 予測開始日（0時）
+        days (int): 予測日数
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        business_days_train (DataFrame): 学習データのうち営業日の実績値
+        business_days_future (Index): 予測期間の営業日（date）
+        features (list): 特徴量名リスト
+
+    Returns:
+        dict: 予測結果辞書 {datetime: predicted_value}
+    """
+    resolver = build_lag_resolver(start_date, days, ml_features_train, business_days_train, business_days_future)
+    current_date = start_date
+
+    for day in range(days):
+        print(f"\nDay {day+1}: {current_date.strftime('%Y-%m-%d')}")
+
+        for hour in range(24):
+            target_datetime = current_date + timedelta(hours=hour)
+
+            feature_values = prepare_features(target_datetime, resolver, future_features, features)
+
+            # DataFrameに変換（XGBoostに入力）
+            X_pred = pd.DataFrame([feature_values], columns=features)
+            resolver.set_prediction(resolver.position(target_datetime), model.predict(X_pred)[0])
+
+        current_date += timedelta(days=1)
+
+    return resolver.predictions()
+
+
+def build_day_features(day, resolver, future_features, features=FEATURES):
+    """
+    1日24時間分の特徴量行列を一括構築（batchモード用）
+
+    Args:
+        day (int): 予測期間の何日目か（0始まり）
+        resolver (LagResolver): ラグ特徴量リゾルバー（前日までの予測値を保持）
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        features (list): 特徴量名リスト
+
+    Returns:
+        ndarray: 特徴量行列（24 × 特徴量数, float32）
+    """
+    return build_position_features(resolver.day_positions(day), resolver, future_features, features)
+
+
+def build_position_features(positions, resolver, future_features, features=FEATURES):
+    """
+    指定したバッファ位置（予測対象時刻）の特徴量行列を構築
+
+    Args:
+        positions (ndarray): 予測対象のバッファ位置
+        resolver (LagResolver): ラグ特徴量リゾルバー（参照先の値を保持）
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        features (list): 特徴量名リスト
+
+    Returns:
+        ndarray: 特徴量行列（位置数 × 特徴量数, float32）
+    """
+    hours = resolver.datetimes(positions)
+
+    missing = hours.difference(future_features.index)
+    if len(missing) > 0:
+        raise ValueError(f"予測対象日時 {missing[0]} が future_features に見つかりません")
+
+    base = future_features.loc[hours]
+    lags = resolver.lags(positions)
+
+    X = np.empty((len(hours), len(features)), dtype=np.float32)
+    for j, feature in enumerate(features):
+        if feature in LAG_FEATURES:
+            X[:, j] = lags[feature]
+        else:
+            X[:, j] = base[feature].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    return X
+
+
+def predict_batched(model, start_date, days, future_features, ml_features_train,
+                    business_days_train, business_days_future, features=FEATURES, predictor=None):
+    """
+    1日単位で24時間分を一括予測（batchモード）
+
+    日ごとに特徴量行列を構築し、Booster.inplace_predict() を1回だけ呼ぶ。
+    1行DataFrame・DMatrixの生成が日数分（14回）に減る。
+
+    Args:
+        predict_hourly() と同じ引数に加えて
+        predictor (callable): 特徴量行列 → 予測値 の推論関数（compiled_trees.make_predictor()）。
+                              Noneの場合はBooster.inplace_predict
+
+    Returns:
+        dict: 予測結果辞書 {datetime: predicted_value}
+    """
+    predictor = predictor or model.get_booster().inplace_predict
+    resolver = build_lag_resolver(start_date, days, ml_features_train, business_days_train, business_days_future)
+    current_date = start_date
+
+    for day in range(days):
+        print(f"\nDay {day+1}: {current_date.strftime('%Y-%m-%d')}")
+
+        X_day = build_day_features(day, resolver, future_features, features)
+        resolver.set_prediction(resolver.day_positions(day), predictor(X_day))
+
+        current_date += timedelta(days=1)
+
+    return resolver.predictions()
+
+
+def predict_scenarios(model, start_date, days, future_features, ml_features_train,
+                      business_days_train, business_days_future, weather_tensor, weather_features,
+                      features=FEATURES, predictor=None):
+    """
+    気象シナリオごとの段階的予測を全シナリオ同時に実行
+
+    ラグ特徴量（予測値）はシナリオごとに別々に伝播させ、1日ごとに
+    シナリオ数×24時間分の特徴量行列で1回だけinplace_predictを呼ぶ。
+
+    Args:
+        predict_hourly() と同じ引数に加えて
+        weather_tensor (ndarray): 気象シナリオ（シナリオ数 × 予測時間数 × 気象特徴量数）
+        weather_features (list): weather_tensorの最終次元に対応する特徴量名
+        predictor (callable): 推論関数（predict_batched()と同じ）
+
+    Returns:
+        tuple: (予測値ndarray（シナリオ数 × 予測時間数）, 予測対象時刻DatetimeIndex)
+    """
+    n_scenarios = weather_tensor.shape[0]
+    if weather_tensor.shape[1] != days * 24:
+        raise ValueError(f"気象シナリオの時間数が予測期間と一致しません: {weather_tensor.shape[1]} != {days * 24}")
+
+    predictor = predictor or model.get_booster().inplace_predict
+    resolver = build_lag_resolver(start_date, days, ml_features_train, business_days_train,
+                                  business_days_future, n_scenarios)
+    weather_columns = {feature: k for k, feature in enumerate(weather_features)}
+    current_date = start_date
+
+    for day in range(days):
+        print(f"\nDay {day+1}: {current_date.strftime('%Y-%m-%d')} ({n_scenarios}シナリオ)")
+
+        hours = pd.date_range(current_date, periods=24, freq='h')
+        base = future_features.loc[hours]
+        positions = resolver.day_positions(day)
+        lags = resolver.lags(positions)
+        hour_slice = slice(day * 24, (day + 1) * 24)
+
+        X = np.empty((n_scenarios, 24, len(features)), dtype=np.float32)
+        for j, feature in enumerate(features):
+            if feature in LAG_FEATURES:
+                X[:, :, j] = lags[feature]
+            elif feature in weather_columns:
+                X[:, :, j] = weather_tensor[:, hour_slice, weather_columns[feature]]
+            else:
+                X[:, :, j] = base[feature].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        predicted = predictor(X.reshape(n_scenarios * 24, len(features)))
+        resolver.set_prediction(positions, predicted.reshape(n_scenarios, 24))
+
+        current_date += timedelta(days=1)
+
+    index = pd.date_range(start_date, periods=days * 24, freq='h')
+    return resolver.forecast_values(), index
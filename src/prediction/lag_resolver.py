@@ -0,0 +1,138 @@
+"""
+段階的予測用ラグ特徴量リゾルバー
+
+学習データの実績値と予測値を1本の連続した時間単位NumPyバッファに格納し、
+ラグ特徴量（lag_1_day / lag_7_day / lag_1_business_day）を配列の位置参照で取得する。
+
+バッファの位置は「予測開始日の20日前0時」からの経過時間（時間単位）で表す:
+    [実績値（予測開始前20日分） | 予測値（予測期間）]
+
+1営業日前の参照先は、予測開始時点で確定している情報
+（学習データの営業日実績・予測期間の営業日カレンダー）だけで決まるため、
+初期化時にオフセット表として事前計算しておく。
+
+気象シナリオ予測では、バッファをシナリオ数×時間の2次元にして全シナリオを同時に保持する
+（参照位置はシナリオ間で共通のため、位置計算・オフセット表は1次元の場合と同じ）。
+"""
+
+import numpy as np
+import pandas as pd
+
+# lag_1_business_dayの探索範囲（日数・長期休暇対応）
+BUSINESS_DAY_LOOKBACK = 20
+
+HOURS_PER_DAY = 24
+
+
+class LagResolver:
+    """実績値＋予測値の時間単位バッファによるラグ特徴量リゾルバー"""
+
+    def __init__(self, actual_power, business_hours, business_days_future, start_date, days, scenarios=None):
+        """
+        初期化
+
+        Args:
+            actual_power (Series): 学習データの実績値（datetimeインデックス）
+            business_hours (DatetimeIndex): 学習データのうち営業日として参照可能な時刻
+            business_days_future (Index): 予測期間の営業日（date）
+            start_date (Timestamp): 予測開始日（0時）
+            days (int): 予測日数
+            scenarios (int): シナリオ数（指定時はバッファをシナリオ数×時間の2次元にする）
+        """
+        self.start_date = pd.Timestamp(start_date)
+        self.days = days
+        self.origin = self.start_date - pd.Timedelta(days=BUSINESS_DAY_LOOKBACK)
+        self.start_pos = BUSINESS_DAY_LOOKBACK * HOURS_PER_DAY
+        size = self.start_pos + days * HOURS_PER_DAY
+
+        # 実績値＋予測値バッファ（値がない時刻はNaN）
+        self.values = np.full(size if scenarios is None else (scenarios, size), np.nan)
+
+        # 予測開始前の実績値を格納（予測期間の値は予測値で埋める）
+        history = actual_power[(actual_power.index >= self.origin) & (actual_power.index < self.start_date)]
+        history_pos = self._positions(history.index)
+        self.values[..., history_pos] = history.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # 1営業日前の参照可能フラグ
+        #   予測開始前: 学習データの営業日実績がある時刻
+        #   予測期間  : 営業日カレンダー上の営業日（参照時点で予測済み）
+        business_ok = np.zeros(size, dtype=bool)
+        business_ok[self._positions(business_hours[
+            (business_hours >= self.origin) & (business_hours < self.start_date)
+        ])] = True
+        for day in range(days):
+            if (self.start_date + pd.Timedelta(days=day)).date() in business_days_future:
+                day_pos = self.start_pos + day * HOURS_PER_DAY
+                business_ok[day_pos:day_pos + HOURS_PER_DAY] = True
+
+        # 予測対象時刻ごとの1営業日前オフセット表（参照先の位置・該当なしは-1）
+        target_pos = np.arange(self.start_pos, size)
+        self.business_source = np.full(len(target_pos), -1, dtype=np.int64)
+        for days_back in range(1, BUSINESS_DAY_LOOKBACK + 1):
+            candidate = target_pos - days_back * HOURS_PER_DAY
+            hit = (self.business_source < 0) & business_ok[candidate]
+            self.business_source[hit] = candidate[hit]
+
+    def _positions(self, index):
+        """DatetimeIndexをバッファ位置に変換"""
+        return ((index - self.origin) // pd.Timedelta(hours=1)).to_numpy(dtype=np.int64)
+
+    def positions(self, index):
+        """予測対象時刻（DatetimeIndex）のバッファ位置を取得"""
+        pos = self._positions(pd.DatetimeIndex(index))
+        if len(pos) > 0 and not (self.start_pos <= pos.min() and pos.max() < self.values.shape[-1]):
+            raise ValueError(f"予測期間外の時刻が含まれています: {index.min()} ～ {index.max()}")
+        return pos
+
+    def datetimes(self, pos):
+        """バッファ位置（配列）を時刻に変換"""
+        return pd.DatetimeIndex(self.origin + pd.to_timedelta(np.asarray(pos), unit='h'))
+
+    def position(self, target_datetime):
+        """予測対象時刻のバッファ位置を取得"""
+        pos = (pd.Timestamp(target_datetime) - self.origin) // pd.Timedelta(hours=1)
+        if not self.start_pos <= pos < self.values.shape[-1]:
+            raise ValueError(f"予測対象日時 {target_datetime} が予測期間外です")
+        return pos
+
+    def lags(self, pos):
+        """
+        指定位置（単一または配列）のラグ特徴量を取得
+
+        Args:
+            pos (int | ndarray): 予測対象のバッファ位置
+
+        Returns:
+            dict: {'lag_1_day': ..., 'lag_7_day': ..., 'lag_1_business_day': ...}
+                  （シナリオ指定時は各値の先頭次元がシナリオ）
+        """
+        source = self.business_source[np.asarray(pos) - self.start_pos]
+        business = np.where(source >= 0, self.values[..., np.maximum(source, 0)], np.nan)
+        return {
+            'lag_1_day': self.values[..., pos - HOURS_PER_DAY],
+            'lag_7_day': self.values[..., pos - 7 * HOURS_PER_DAY],
+            'lag_1_business_day': business,
+        }
+
+    def day_positions(self, day):
+        """予測期間day日目（0始まり）の24時間分のバッファ位置"""
+        day_pos = self.start_pos + day * HOURS_PER_DAY
+        return np.arange(day_pos, day_pos + HOURS_PER_DAY)
+
+    def set_prediction(self, pos, value):
+        """予測値をバッファに書き込み（単一または配列・シナリオ指定時はシナリオ×位置）"""
+        self.values[..., pos] = value
+
+    def predictions(self):
+        """
+        予測期間の予測値を辞書で取得
+
+        Returns:
+            dict: 予測結果辞書 {datetime: predicted_value}
+        """
+        index = pd.date_range(self.start_date, periods=self.days * HOURS_PER_DAY, freq='h')
+        return dict(zip(index, self.values[self.start_pos:]))
+
+    def forecast_values(self):
+        """予測期間の予測値配列（シナリオ指定時はシナリオ数×時間）"""
+        return self.values[..., self.start_pos:]
@@ -0,0 +1,199 @@
+"""
+学習済みXGBoostモデルのキャッシュ
+
+学習データの指紋（最終日時・行数・内容ハッシュ）とモデル設定をキーに、
+学習済みモデルをXGBoostのUBJ形式で保存する。
+同じ日の再実行など学習データが変わっていない場合は、再学習せずに読み込む。
+
+保存先:
+    {ENERGY_ENV_PATH}/data/models/xgb_{キー}.ubj   # モデル本体
+    {ENERGY_ENV_PATH}/data/models/xgb_{キー}.json  # 指紋・保存日時
+    （直接予測の区間モデルはキーが {キー}_d{開始日}-{終了日}）
+
+同じディレクトリのキャッシュ以外のファイル（xgb_params.json等）は、ファイル名が
+上記の形式に一致しないため、読み込み・削除の対象にならない。
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import xgboost as xgb
+
+# キャッシュが保存するファイル名（拡張子なし）: xgb_{16桁のキー}[_d{開始日}-{終了日}]
+CACHE_FILE_PATTERN = re.compile(r'^xgb_[0-9a-f]{16}(_d\d+-\d+)?$')
+
+
+def compute_training_fingerprint(X_train, y_train, model_params):
+    """
+    学習データ・モデル設定の指紋を計算
+
+    Args:
+        X_train (DataFrame): 学習用特徴量（datetimeインデックス）
+        y_train (Series): 学習用目的変数
+        model_params (dict): XGBRegressorのパラメータ
+
+    Returns:
+        dict: 指紋 {'max_datetime', 'row_count', 'content_hash', 'features', 'model_params', 'key'}
+    """
+    frame = X_train.copy()
+    frame['__target__'] = y_train
+    content_hash = hashlib.sha256(
+        pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes()
+    ).hexdigest()
+
+    fingerprint = {
+        'max_datetime': str(X_train.index.max()),
+        'row_count': len(X_train),
+        'content_hash': content_hash,
+        'features': list(X_train.columns),
+        'model_params': model_params,
+    }
+    # キャッシュキー（指紋全体のハッシュ）
+    fingerprint['key'] = hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:16]
+    return fingerprint
+
+
+class ModelCache:
+    """学習済みモデルキャッシュクラス"""
+
+    def __init__(self, cache_dir=None, max_entries=7):
+        """
+        初期化
+
+        Args:
+            cache_dir (str): キャッシュディレクトリ
+                           Noneの場合は環境変数ENERGY_ENV_PATHから取得
+            max_entries (int): 保持するモデル数の上限（再帰予測・直接予測の区間ごと。古いものから削除）
+        """
+        if cache_dir is None:
+            energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+            cache_dir = Path(energy_env_path) / 'data' / 'models'
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+    def _paths(self, key):
+        """モデル本体・メタデータのパスを取得"""
+        return self.cache_dir / f"xgb_{key}.ubj", self.cache_dir / f"xgb_{key}.json"
+
+    def meta_files(self, include_horizon_models=True):
+        """
+        キャッシュが保存したメタデータファイル（新しい順）
+
+        Args:
+            include_horizon_models (bool): 直接予測の区間モデルを含めるか
+
+        Returns:
+            list: メタデータファイルのPathリスト
+        """
+        files = []
+        for path in self.cache_dir.glob('xgb_*.json'):
+            match = CACHE_FILE_PATTERN.match(path.stem)
+            if match and (include_horizon_models or match.group(1) is None):
+                files.append(path)
+        return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def load(self, fingerprint):
+        """
+        指紋に一致する学習済みモデルを読み込み
+
+        Args:
+            fingerprint (dict): compute_training_fingerprint() の戻り値
+
+        Returns:
+            XGBRegressor | None: キャッシュヒット時はモデル、ミス時はNone
+        """
+        model_path, meta_path = self._paths(fingerprint['key'])
+        if not model_path.exists() or not meta_path.exists():
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # キー衝突・破損対策として内容ハッシュも照合
+            if meta['fingerprint']['content_hash'] != fingerprint['content_hash']:
+                return None
+
+            model = xgb.XGBRegressor()
+            model.load_model(model_path)
+            return model
+        except Exception as e:
+            print(f"モデルキャッシュ読み込み失敗（再学習します）: {e}")
+            return None
+
+    def load_previous(self, fingerprint):
+        """
+        同じモデル設定・特徴量で、より前の学習データで学習した最新のモデルを読み込み（差分学習の起点）
+
+        Args:
+            fingerprint (dict): compute_training_fingerprint() の戻り値（今回の学習データ）
+
+        Returns:
+            tuple: (XGBRegressor, 保存済みの指紋dict) | (None, None)
+        """
+        def normalize(value):
+            return json.dumps(value, sort_keys=True, default=str)
+
+        for meta_path in self.meta_files(include_horizon_models=False):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)['fingerprint']
+                if (normalize(previous['model_params']) != normalize(fingerprint['model_params'])
+                        or previous['features'] != fingerprint['features']
+                        or pd.Timestamp(previous['max_datetime']) >= pd.Timestamp(fingerprint['max_datetime'])):
+                    continue
+
+                model = xgb.XGBRegressor()
+                model.load_model(meta_path.with_suffix('.ubj'))
+                return model, previous
+            except Exception as e:
+                print(f"前回モデル読み込み失敗（スキップ）: {meta_path.name}: {e}")
+        return None, None
+
+    def save(self, model, fingerprint):
+        """
+        学習済みモデルを保存
+
+        Args:
+            model (XGBRegressor): 学習済みモデル
+            fingerprint (dict): compute_training_fingerprint() の戻り値
+
+        Returns:
+            Path: モデルファイルパス
+        """
+        model_path, meta_path = self._paths(fingerprint['key'])
+        model.save_model(model_path)
+
+        # メタデータはモデル保存後に書き込む（メタデータの存在＝保存完了）
+        meta = {
+            'fingerprint': fingerprint,
+            'saved_at': datetime.now().isoformat(),
+        }
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+        self._prune()
+        return model_path
+
+    def _prune(self):
+        """
+        上限を超えた古いモデルを削除
+
+        再帰予測のモデルと直接予測の区間ごとのモデルは別々に数え、それぞれmax_entries個まで保持する
+        （直接予測1回分の区間モデルで再帰予測のモデルが押し出されないようにする）。
+        """
+        kept = {}
+        for meta_path in self.meta_files():
+            bucket = CACHE_FILE_PATTERN.match(meta_path.stem).group(1)
+            kept[bucket] = kept.get(bucket, 0) + 1
+            if kept[bucket] > self.max_entries:
+                meta_path.with_suffix('.ubj').unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+学習データキャッシュからのストリーミング学習（out-of-core）
+
+ml_features学習データキャッシュ（月単位Parquet）を行グループ単位で読み、XGBoostのDataIterで
+学習用行列に順に投入する。XGBoost用の行列を学習データ全期間のpandas DataFrameから作らない。
+
+日次予測では --training-engine out_of_core（training_engine.train_model）から呼ばれ、学習したモデルは
+他のエンジンと同じくモデルキャッシュ（学習データの指紋・学習エンジン設定がキー）に保存・削除・再利用される。
+
+行列の種類（matrix）:
+    quantile: QuantileDMatrix（ビン化した行列をメモリ上に保持・1値1バイト程度）
+    external: ExtMemQuantileDMatrix（ビン化した行列をディスクのキャッシュに置き、学習時にページ単位で読む）
+
+制約:
+    - 特徴量はキャッシュ済みのml_featuresカラムのみ（バッチ境界をまたぐ派生特徴量は作らない）
+    - batch_rowsで抑えられるのはParquet・pandas・float32変換のバッチ1つ分のメモリのみ。
+      量子化済み行列（1値1バイト程度・externalではディスクのページ）と、XGBoostが学習中に行ごとに持つ
+      勾配・予測値のバッファは行数に比例するため、ピークRSSは学習期間とともに伸びる
+      （合成データの計測ではexternal 268→316→380 MB / 従来方式 269→312→402 MB（5/20/40年分）で、
+      差は学習データのDataFrameとそのXGBoost用コピーの分にとどまる）
+    - 日次予測はラグ特徴量・指紋の計算に学習データのDataFrameを読み込むため、
+      日次予測でのメモリ削減は学習用の行列の分のみ
+
+実行方法（学習時間・ピークRSSの確認用。モデルは保存しない）:
+    python -m src.prediction.out_of_core
+    python -m src.prediction.out_of_core --until 2025-06-30 --matrix external --batch-rows 32768
+
+    日次予測で使う場合:
+    python -m src.prediction.prediction_iterative_with_export --training-engine out_of_core
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+
+OUT_OF_CORE_MATRICES = ('quantile', 'external')
+
+
+class FeatureBatchIter(xgb.DataIter):
+    """学習データキャッシュのバッチを特徴量行列としてXGBoostに渡すイテレーター"""
+
+    def __init__(self, training_cache, features, until_date=None, batch_rows=8192, cache_prefix=None):
+        """
+        初期化
+
+        Args:
+            training_cache (TrainingDataCache): 学習データキャッシュ
+            features (list): 特徴量名リスト
+            until_date (date): 学習データ最終日（この日を含む）
+            batch_rows (int): 1バッチの目安行数
+            cache_prefix (str): 外部メモリのキャッシュ保存先（ExtMemQuantileDMatrixの場合のみ）
+        """
+        self.training_cache = training_cache
+        self.features = list(features)
+        self.until_date = until_date
+        self.batch_rows = batch_rows
+        self.batches = None
+        self.stats = {'batches': 0, 'rows': 0, 'max_batch_rows': 0}
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        """先頭のバッチに戻す（XGBoostは行列作成時に複数回走査する）"""
+        self.batches = None
+
+    def next(self, input_data):
+        """次のバッチを渡す（終端ではFalse）"""
+        from src.prediction.feature_frame import to_feature_frame
+
+        if self.batches is None:
+            self.batches = self.training_cache.iter_batches(
+                self.until_date, columns=['hour', 'actual_power', *self.features], batch_rows=self.batch_rows
+            )
+            self.stats = {'batches': 0, 'rows': 0, 'max_batch_rows': 0}
+
+        for batch in self.batches:
+            frame = to_feature_frame(batch)
+            frame = frame[frame['actual_power'].notna()]
+            if frame.empty:
+                continue
+            input_data(
+                data=frame[self.features].to_numpy(dtype=np.float32, na_value=np.nan),
+                label=frame['actual_power'].to_numpy(dtype=np.float32),
+                feature_names=self.features,
+            )
+            self.stats['batches'] += 1
+            self.stats['rows'] += len(frame)
+            self.stats['max_batch_rows'] = max(self.stats['max_batch_rows'], len(frame))
+            return True
+        return False
+
+
+def peak_rss_mb():
+    """このプロセスのピークRSS（MB）"""
+    # Linuxはexec後にリセットされるVmHWMを使う（ru_maxrssはfork元のピークを引き継ぐ）
+    status_path = Path('/proc/self/status')
+    if status_path.exists():
+        for line in status_path.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト・macOSはバイト単位
+    return usage / 1024 ** 2 if sys.platform == 'darwin' else usage / 1024
+
+
+def train_out_of_core(xgb_params, features=None, until_date=None, matrix='quantile',
+                      training_cache=None, batch_rows=8192, max_bin=256, nthread=None):
+    """
+    学習データキャッシュをストリーミングしてモデルを学習
+
+    Args:
+        xgb_params (dict): XGBRegressorパラメータ（n_estimatorsの本数だけ学習）
+        features (list): 特徴量名リスト（Noneの場合はiterative_inference.FEATURES）
+        until_date (date): 学習データ最終日（Noneの場合はキャッシュ全件）
+        matrix (str): OUT_OF_CORE_MATRICESのいずれか
+        training_cache (TrainingDataCache): 学習データキャッシュ（Noneの場合は既定の保存先）
+        batch_rows (int): 1バッチの目安行数
+        max_bin (int): ヒストグラムのビン数
+        nthread (int): 学習スレッド数（Noneの場合はCPUコア数）
+
+    Returns:
+        tuple: (XGBRegressor, 学習統計dict {'matrix', 'timings', 'boost_rounds', 'rows', 'batches', ...})
+    """
+    from src.prediction.iterative_inference import FEATURES
+    from src.prediction.training_data_cache import TrainingDataCache
+    from src.prediction.tuning import to_booster_params
+
+    if matrix not in OUT_OF_CORE_MATRICES:
+        raise ValueError(f"行列の種類は {OUT_OF_CORE_MATRICES} のいずれかを指定してください: {matrix}")
+
+    features = features or FEATURES
+    training_cache = training_cache or TrainingDataCache()
+    if not training_cache.partition_paths():
+        raise FileNotFoundError(f"学習データキャッシュが空です: {training_cache.cache_dir}")
+
+    nthread = nthread or os.cpu_count() or 1
+    booster_params = {**to_booster_params(xgb_params, nthread), 'max_bin': max_bin}
+    timings = {}
+
+    # 外部メモリのページは学習データキャッシュの隣の一時ディレクトリに置き、学習後に削除する
+    page_dir = Path(tempfile.mkdtemp(prefix='xgb_extmem_', dir=training_cache.cache_dir.parent)) \
+        if matrix == 'external' else None
+    try:
+        started = time.perf_counter()
+        if matrix == 'external':
+            batch_iter = FeatureBatchIter(training_cache, features, until_date, batch_rows,
+                                          cache_prefix=str(page_dir / 'ml_features'))
+            dtrain = xgb.ExtMemQuantileDMatrix(batch_iter, max_bin=max_bin, nthread=nthread)
+        else:
+            batch_iter = FeatureBatchIter(training_cache, features, until_date, batch_rows)
+            dtrain = xgb.QuantileDMatrix(batch_iter, max_bin=max_bin, nthread=nthread)
+        timings['matrix'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        booster = xgb.train(booster_params, dtrain, num_boost_round=xgb_params['n_estimators'])
+        timings['boost'] = time.perf_counter() - started
+        del dtrain
+    finally:
+        if page_dir is not None:
+            shutil.rmtree(page_dir, ignore_errors=True)
+
+    # 予測・モデルキャッシュ側と同じくXGBRegressorとして扱う
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+
+    return model, {
+        'matrix': matrix,
+        'timings': {phase: round(seconds, 3) for phase, seconds in timings.items()},
+        'boost_rounds': booster.num_boosted_rounds(),
+        **batch_iter.stats,
+        'nthread': nthread,
+    }
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='学習データキャッシュからのストリーミング学習')
+    parser.add_argument('--until', type=str, help='学習データ最終日 (YYYY-MM-DD形式、デフォルト: 昨日)')
+    parser.add_argument('--matrix', choices=OUT_OF_CORE_MATRICES, default='quantile',
+                        help='行列の種類: quantile=量子化行列をメモリに保持, external=ディスクの外部メモリ（デフォルト: quantile）')
+    parser.add_argument('--batch-rows', type=int, default=8192, help='1バッチの目安行数 (デフォルト: 8192)')
+    parser.add_argument('--nthread', type=int, help='学習スレッド数（デフォルト: CPUコア数）')
+    args = parser.parse_args()
+
+    if args.until:
+        try:
+            until_date = datetime.strptime(args.until, '%Y-%m-%d').date()
+        except ValueError:
+            print("日付形式が正しくありません。YYYY-MM-DD形式で指定してください。")
+            sys.exit(1)
+    else:
+        until_date = datetime.now().date() - timedelta(days=1)
+
+    from src.prediction.prediction_iterative_with_export import load_xgb_params
+
+    xgb_params, xgb_params_source = load_xgb_params()
+    print(f"ストリーミング学習開始: {until_date}まで (行列: {args.matrix}, パラメータ: {xgb_params_source})")
+
+    try:
+        _, stats = train_out_of_core(xgb_params, until_date=until_date, matrix=args.matrix,
+                                     batch_rows=args.batch_rows, nthread=args.nthread)
+    except FileNotFoundError as e:
+        print(f"ストリーミング学習エラー: {e}")
+        print("先に日次予測（学習データキャッシュの作成）を実行してください。")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"学習データ: {stats['rows']:,}件 ({stats['batches']}バッチ, 最大 {stats['max_batch_rows']:,}件/バッチ)")
+    print(f"木の本数: {stats['boost_rounds']}, 行列作成 {stats['timings']['matrix']:.2f}秒, "
+          f"ブースティング {stats['timings']['boost']:.2f}秒")
+    print(f"ピークRSS: {peak_rss_mb():.0f} MB")
+    print("モデルは保存しません（日次予測では --training-engine out_of_core でモデルキャッシュに保存されます）")
+
+
+if __name__ == "__main__":
+    main()
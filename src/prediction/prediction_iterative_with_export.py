@@ -1,36 +1,31 @@
-# %%
 # ================================================================
-# 日次予測実行スクリプト（Phase 11）
-# 目的: 今日から14日間の電力使用量を予測
-# データソース: BigQuery（昨日までの学習データ・今日からの気象データ）
-# 出力: CSV形式の予測結果 + BigQueryステータスログ
+# 日次予測実行モジュール（Phase 11）
+# 目的: 実行日から14日間の電力使用量を予測
+# データソース: BigQuery（実行日前日までの学習データ・実行日からの気象データ）
+# 出力: Parquet形式の予測結果（同じファイルをBigQuery予測結果テーブルへロード・CSVは任意）+ BigQueryステータスログ
 # 検証: 別モジュール（14日に1回実行）
+#
+# 実行方法:
+#     python -m src.prediction.prediction_iterative_with_export
+#     python -m src.prediction.prediction_iterative_with_export --run-date 2025-10-25 --horizon-days 14
+#
+# 他モジュールからの利用:
+#     from src.prediction.prediction_iterative_with_export import run_forecast
+#     result = run_forecast(run_date='2025-10-25', horizon_days=14)
+#
+# import時には何も実行しない（BigQuery接続・学習・エクスポートはrun_forecast()内で実行）。
+# pandas / xgboost / BigQueryクライアントは起動時間短縮のため使用時に遅延importする。
 # ================================================================
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import mean_absolute_percentage_error, mean_absolute_error, r2_score
-import xgboost as xgb
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-import warnings
+import argparse
+import json
 import os
-from pathlib import Path
-from logging import getLogger, FileHandler, StreamHandler, Formatter, INFO, LogRecord
 import sys
-from google.cloud import bigquery
 import uuid
-import json
-warnings.filterwarnings('ignore')
-
-# 日本語フォント設定
-plt.rcParams['font.family'] = 'Meiryo'
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 10
+from datetime import datetime, timedelta
+from logging import getLogger, FileHandler, StreamHandler, Formatter, INFO, LogRecord
+from pathlib import Path
 
-# %%
 # ================================================================
 # ロガー定義・ログ設定
 # ================================================================
@@ -95,10 +90,6 @@ def setup_prediction_logging():
 
     return log_file
 
-# ログ設定実行
-log_file_path = setup_prediction_logging()
-
-# %%
 # ================================================================
 # 統合ログ保存関数（ファイル + BQ）
 # ================================================================
@@ -154,79 +145,58 @@ def log_and_save_to_bq(client, process_status, log_level='INFO'):
         logger.info(f"BQ保存成功: execution_id={process_status.get('execution_id')}")
         return True
 
-# %%
 # ================================================================
-# 予測実行開始（実行ID生成）
+# 1. BigQueryデータ読み込み
 # ================================================================
 
-# 実行ID生成（ステータスログ用）
-execution_id = str(uuid.uuid4())
-prediction_start_time = datetime.now()
-
-logger.info("段階的予測実験開始")
-logger.info("=" * 60)
-logger.info(f"実行ID: {execution_id}")
-logger.info(f"ログファイル: {log_file_path}")
-print("段階的予測テスト開始")
-print("=" * 60)
-print(f"実行ID: {execution_id}")
-
-# %%
-# ================================================================
-# 1. BigQueryクライアント初期化・データ読み込み
-# ================================================================
+def load_forecast_inputs(client, run_date, horizon_days, use_training_cache=True):
+    """
+    学習データ・カレンダー・予測期間の気象データをBigQueryから取得
 
-# 環境変数からベースパスを取得
-energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+    Args:
+        client: BigQueryクライアント
+        run_date (date): 予測実行日（予測開始日）
+        horizon_days (int): 予測日数
+        use_training_cache (bool): 学習データのローカルキャッシュを使うか（差分取得）
 
-# BigQueryクライアント初期化
-logger.info("BigQueryクライアント初期化")
-client = bigquery.Client(project='energy-env')
-print("BigQueryクライアント初期化完了")
+    Returns:
+        tuple: (ml_features_train, calendar_data, future_features, training_data_stats)
+    """
+    import numpy as np
+    import pandas as pd
+    from src.prediction.feature_frame import memory_usage_mb, to_feature_frame
+    from src.prediction.training_data_cache import TrainingDataCache, fetch_ml_features
+    from src.utils.bq_reader import read_query_dataframe
 
-try:
     # ml_featuresテーブルから学習データ取得（実行日の前日まで）
     logger.info("ml_featuresテーブルから学習データ取得開始")
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    yesterday = run_date - timedelta(days=1)
     logger.info(f"学習データ期間: ～{yesterday}")
-    query_ml_features = f"""
-    SELECT
-        date,
-        hour,
-        actual_power,
-        supply_capacity,
-        temperature_2m,
-        relative_humidity_2m,
-        precipitation,
-        weather_code,
-        day_of_week,
-        is_weekend,
-        is_holiday,
-        month,
-        hour_sin,
-        hour_cos,
-        lag_1_day,
-        lag_7_day,
-        lag_1_business_day
-    FROM `energy-env.prod_energy_data.ml_features`
-    WHERE date <= '{yesterday}'
-    ORDER BY date, hour
-    """
-    ml_features_train = client.query(query_ml_features).to_dataframe()
-    logger.info(f"学習データ取得完了: {len(ml_features_train):,}件")
-    print(f"学習データ取得完了: {len(ml_features_train):,}件")
-
-    # datetime列作成
-    ml_features_train['datetime'] = pd.to_datetime(
-        ml_features_train['date'].astype(str) + ' ' +
-        ml_features_train['hour'].astype(str).str.zfill(2) + ':00:00'
-    )
-    ml_features_train = ml_features_train.set_index('datetime')
+    if use_training_cache:
+        # ローカルキャッシュ＋差分取得（直近7日分＋新規日のみBigQueryから取得）
+        ml_features_train, training_data_stats = TrainingDataCache().load(client, yesterday)
+    else:
+        ml_features_train, bytes_processed = fetch_ml_features(client, yesterday)
+        training_data_stats = {
+            'mode': 'DISABLED',
+            'fetched_rows': len(ml_features_train),
+            'bytes_processed': bytes_processed,
+            'watermark': None,
+        }
+    logger.info(f"学習データ取得完了: {len(ml_features_train):,}件 "
+                f"(キャッシュ: {training_data_stats['mode']}, BQ取得: {training_data_stats['fetched_rows']:,}件, "
+                f"処理バイト数: {training_data_stats['bytes_processed']})")
+    print(f"学習データ取得完了: {len(ml_features_train):,}件 (キャッシュ: {training_data_stats['mode']})")
 
-    # 予測期間設定（今日から14日間）
-    today = datetime.now().strftime('%Y-%m-%d')
-    end_date_str = (datetime.now() + timedelta(days=13)).strftime('%Y-%m-%d')
-    logger.info(f"予測期間: {today} ～ {end_date_str}")
+    # datetimeインデックス作成・型変換（float32 / int8 / bool）
+    memory_before = memory_usage_mb(ml_features_train)
+    ml_features_train = to_feature_frame(ml_features_train)
+    logger.info(f"学習データメモリ: {memory_before:.1f} MB → {memory_usage_mb(ml_features_train):.1f} MB")
+
+    # 予測期間設定（実行日からhorizon_days日間）
+    start_date_str = run_date.strftime('%Y-%m-%d')
+    end_date_str = (run_date + timedelta(days=horizon_days - 1)).strftime('%Y-%m-%d')
+    logger.info(f"予測期間: {start_date_str} ～ {end_date_str}")
 
     # calendar_dataテーブル取得（営業日判定用・予測期間のみ）
     logger.info("calendar_dataテーブル取得開始")
@@ -237,16 +207,16 @@ try:
         is_weekend,
         is_holiday
     FROM `energy-env.prod_energy_data.calendar_data`
-    WHERE date BETWEEN '{today}' AND '{end_date_str}'
+    WHERE date BETWEEN '{start_date_str}' AND '{end_date_str}'
     ORDER BY date
     """
-    calendar_data = client.query(query_calendar).to_dataframe()
+    calendar_data = read_query_dataframe(client, query_calendar)
     calendar_data['date'] = pd.to_datetime(calendar_data['date']).dt.date
     calendar_data = calendar_data.set_index('date')
     logger.info(f"カレンダーデータ取得完了: {len(calendar_data):,}件")
     print(f"カレンダーデータ取得完了: {len(calendar_data):,}件")
 
-    # 予測期間の気象・カレンダーデータ取得（未来データ生成用・今日から14日間）
+    # 予測期間の気象・カレンダーデータ取得（未来データ生成用）
     logger.info("予測期間の気象・カレンダーデータ取得開始")
     query_future_data = f"""
     SELECT
@@ -263,402 +233,853 @@ try:
     FROM (
         SELECT *
         FROM `energy-env.prod_energy_data.weather_data`
-        WHERE date BETWEEN '{today}' AND '{end_date_str}'
+        WHERE date BETWEEN '{start_date_str}' AND '{end_date_str}'
             AND prefecture = '千葉県'
     ) w
     LEFT JOIN `energy-env.prod_energy_data.calendar_data` c
         ON w.date = c.date
     ORDER BY w.date, w.hour
     """
-    future_features = client.query(query_future_data).to_dataframe()
+    future_features = read_query_dataframe(client, query_future_data)
 
     # hour列を数値型に変換（BQから文字列で取得されるため）
     future_features['hour'] = pd.to_numeric(future_features['hour'])
 
-    future_features['datetime'] = pd.to_datetime(
-        future_features['date'].astype(str) + ' ' +
-        future_features['hour'].astype(str).str.zfill(2) + ':00:00'
-    )
-    future_features = future_features.set_index('datetime')
-
     # 循環特徴量追加（hour_sin, hour_cos）
     future_features['hour_sin'] = np.sin(2 * np.pi * future_features['hour'] / 24)
     future_features['hour_cos'] = np.cos(2 * np.pi * future_features['hour'] / 24)
 
+    # datetimeインデックス作成・型変換
+    future_features = to_feature_frame(future_features)
+
     logger.info(f"予測期間の気象・カレンダーデータ取得完了: {len(future_features):,}件")
     print(f"予測期間の気象・カレンダーデータ取得完了: {len(future_features):,}件")
 
-    print(f"データ準備完了")
-
-except Exception as e:
-    # BigQueryエラー（接続・クエリ実行エラー）をログに記録
-    logger.error(f"BigQueryエラー: {e}")
-    logger.error(f"エラー詳細: {type(e).__name__}")
-    print(f"\nBigQueryエラーが発生しました: {e}")
-    print(f"ログファイルを確認してください: {log_file_path}")
-    # エラーを再送出してプログラム停止
-    raise
+    return ml_features_train, calendar_data, future_features, training_data_stats
 
-# %%
 # ================================================================
-# 2. Phase 9特徴量定義（12特徴量）
+# 2. XGBoostモデル学習（キャッシュ対応）
 # ================================================================
 
-# Phase 9で使用した12特徴量を定義
-features = [
-    'hour',                   # 時間（0-23）
-    'is_weekend',             # 週末フラグ
-    'is_holiday',             # 祝日フラグ  
-    'month',                  # 月（1-12）
-    'hour_sin',               # 時間周期性（sin）
-    'hour_cos',               # 時間周期性（cos）
-    'lag_1_day',              # 1日前同時刻（重要！）
-    'lag_7_day',              # 7日前同時刻
-    'lag_1_business_day',     # 1営業日前同時刻（重要度84.3%！）
-    'temperature_2m',         # 気温
-    'relative_humidity_2m',   # 湿度
-    'precipitation'           # 降水量
-]
-
-print(f"\n使用特徴量: {len(features)}個")
-for i, feature in enumerate(features, 1):
-    print(f"  {i:2d}. {feature}")
-
-# %%
-# ================================================================
-# 3. XGBoostモデル学習
-# ================================================================
+# 予測方式（recursive: 段階的予測, direct: 区間モデルによる直接予測）
+FORECAST_STRATEGIES = ('recursive', 'direct')
 
-# 学習データ準備
-X_train = ml_features_train[features]
-y_train = ml_features_train['actual_power']
-
-print(f"\nXGBoostモデル学習開始")
-print(f"学習データ: {len(X_train):,}件（欠損値込み）")
-print(f"学習期間: {ml_features_train.index.min()} ～ {ml_features_train.index.max()}")
-
-# XGBoostモデル（Phase 9設定）
-xgb_model = xgb.XGBRegressor(
-    n_estimators=200,
-    max_depth=8,
-    learning_rate=0.05,
-    random_state=42,
-    verbosity=0
-)
-
-# モデル学習
-logger.info("XGBoostモデル学習開始")
-xgb_model.fit(X_train, y_train)
-logger.info("XGBoostモデル学習完了")
-print("XGBoostモデル学習完了")
-
-# %%
-# ================================================================
-# 4. 営業日データ準備 + 特徴量準備関数
-# ================================================================
+# XGBoostモデル設定（Phase 9設定）
+XGB_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 8,
+    'learning_rate': 0.05,
+    'random_state': 42,
+    'verbosity': 0
+}
 
-# 営業日のみに絞ったDataFrameを事前作成
-# 過去20日分のみ（lag_1_business_dayの探索範囲）
-# タイムゾーンnaiveなdatetimeに変換（pandasのDatetimeIndexと比較するため）
-lookback_start = pd.to_datetime((datetime.now() - timedelta(days=20)))
-business_days_train = ml_features_train[
-    (ml_features_train.index >= lookback_start) &
-    (~ml_features_train['is_holiday']) &
-    (~ml_features_train['is_weekend'])
-][['actual_power']]  # 実績値のみ
-
-business_days_future = calendar_data[
-    (~calendar_data['is_holiday']) & (~calendar_data['is_weekend'])
-].index  # 日付のみ（Index化）
-
-def prepare_features(target_datetime, predictions):
+def get_tuned_params_path():
     """
-    予測対象時刻の特徴量を準備（BQ対応版）
+    チューニング済みパラメータファイルのパス（src.prediction.tuningが出力）
+
+    モデルキャッシュ（data/models）の削除対象にならないよう、別ディレクトリに置く。
+    """
+    energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+    return Path(energy_env_path) / 'data' / 'tuning' / 'xgb_params.json'
+
+
+def load_xgb_params(params_path=None):
+    """
+    XGBoostパラメータを取得（チューニング済みファイルがあれば優先）
 
     Args:
-        target_datetime: 予測対象日時
-        predictions: 過去の予測値辞書
+        params_path (str): パラメータファイル（Noneの場合はget_tuned_params_path()）
 
     Returns:
-        list: 12特徴量の値リスト
+        tuple: (XGBRegressorパラメータdict, 取得元 'TUNED'|'DEFAULT')
     """
-    # future_featuresから該当時刻のデータを取得
-    if target_datetime not in future_features.index:
-        raise ValueError(f"予測対象日時 {target_datetime} が future_features に見つかりません")
-
-    # 基本特徴量を取得（気象・カレンダー・循環特徴量）
-    row = future_features.loc[target_datetime]
-
-    # 12特徴量を順番に設定
-    feature_values = []
-    for feature in features:
-        if feature == 'lag_1_day':
-            # 1日前の予測値
-            lag_datetime = target_datetime - timedelta(days=1)
-            if lag_datetime in predictions:
-                feature_values.append(predictions[lag_datetime])
-            else:
-                # 予測値がない場合（予測期間前）はml_features_trainから取得
-                if lag_datetime in ml_features_train.index:
-                    feature_values.append(ml_features_train.loc[lag_datetime, 'actual_power'])
-                else:
-                    feature_values.append(np.nan)
-
-        elif feature == 'lag_7_day':
-            # 7日前の予測値
-            lag_datetime = target_datetime - timedelta(days=7)
-            if lag_datetime in predictions:
-                feature_values.append(predictions[lag_datetime])
-            else:
-                # 予測値がない場合はml_features_trainから取得
-                if lag_datetime in ml_features_train.index:
-                    feature_values.append(ml_features_train.loc[lag_datetime, 'actual_power'])
-                else:
-                    feature_values.append(np.nan)
-
-        elif feature == 'lag_1_business_day':
-            # 1営業日前の予測値（最大20日前まで探索・長期休暇対応）
-            found = False
-            for days_back in range(1, 21):
-                lag_datetime = target_datetime - timedelta(days=days_back)
-                lag_date = lag_datetime.date()
-
-                # 予測値優先（未来の営業日）
-                if lag_datetime in predictions and lag_date in business_days_future:
-                    feature_values.append(predictions[lag_datetime])
-                    found = True
-                    break
-                # 学習データから取得（過去の営業日）
-                elif lag_datetime in business_days_train.index:
-                    feature_values.append(business_days_train.loc[lag_datetime, 'actual_power'])
-                    found = True
-                    break
-
-            if not found:
-                feature_values.append(np.nan)
+    params_path = Path(params_path) if params_path else get_tuned_params_path()
+    if not params_path.exists():
+        return dict(XGB_PARAMS), 'DEFAULT'
 
-        else:
-            # その他の特徴量はfuture_featuresから取得
-            feature_values.append(row[feature])
+    try:
+        with open(params_path, 'r', encoding='utf-8') as f:
+            tuned = json.load(f)
+        return {**XGB_PARAMS, **tuned['params']}, 'TUNED'
+    except Exception as e:
+        logger.error(f"チューニング済みパラメータ読み込みエラー（デフォルト設定を使用）: {e}")
+        return dict(XGB_PARAMS), 'DEFAULT'
 
-    return feature_values
 
-# %%
-# ================================================================
-# 5. 段階的予測実行（今日から14日間）
-# ================================================================
+def train_or_load_model(ml_features_train, features, use_model_cache=True, xgb_params=None,
+                        engine_config=None, warm_start_config=None):
+    """
+    学習データの指紋でモデルキャッシュを検索し、ミス時は学習して保存
 
-# 予測期間設定（今日から14日間）
-start_date = pd.to_datetime(today)
-end_date = pd.to_datetime(end_date_str)
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        features (list): 特徴量名リスト
+        use_model_cache (bool): Falseの場合は必ず再学習する
+        xgb_params (dict): XGBRegressorパラメータ（Noneの場合はXGB_PARAMS）
+        engine_config (dict): 学習エンジン設定（training_engine.load_engine_config()・Noneの場合はsklearn）
+        warm_start_config (dict): 差分学習設定（training_engine.load_warm_start_config()）。
+                                  指定時はキャッシュミスでも前回モデルからの差分学習を試みる
+                                  （use_model_cache=Falseの場合は常に全期間で学習）
 
-# 予測結果格納辞書
-predictions = {}
-daily_results = []
+    Returns:
+        tuple: (xgb_model, model_cache_status, training_fingerprint)
+            training_fingerprintには学習時のみ 'training_stats'（フェーズ別処理時間など）を追加し、
+            差分学習設定の指定時は 'warm_start'（判定結果）も追加
+    """
+    from src.prediction.model_cache import ModelCache, compute_training_fingerprint
+    from src.prediction.training_engine import (
+        load_engine_config, plan_warm_start, train_model, warm_start_model
+    )
 
-logger.info("段階的予測実行開始")
-logger.info(f"予測期間: {start_date.date()} ～ {end_date.date()}")
-logger.info(f"予測回数: {14 * 24}回（14日×24時間）")
+    xgb_params = xgb_params or XGB_PARAMS
+    engine_config = engine_config or load_engine_config()
 
-print(f"\n段階的予測実行開始")
-print(f"予測期間: {start_date.date()} ～ {end_date.date()}")
-print(f"予測回数: {14 * 24}回（14日×24時間）")
+    # 学習データ準備
+    X_train = ml_features_train[features]
+    y_train = ml_features_train['actual_power']
 
-# 14日間の段階的予測
-current_date = start_date
+    print(f"\nXGBoostモデル学習開始")
+    print(f"学習データ: {len(X_train):,}件（欠損値込み）")
+    print(f"学習期間: {ml_features_train.index.min()} ～ {ml_features_train.index.max()}")
 
-for day in range(14):
-    print(f"\nDay {day+1}: {current_date.strftime('%Y-%m-%d')}")
+    # 学習データの指紋でモデルキャッシュを検索（同日再実行時は再学習しない）
+    # sklearnエンジンは従来と同じキー（histエンジンは設定もキーに含める）
+    fingerprint_params = xgb_params if engine_config['engine'] == 'sklearn' else {
+        **xgb_params, 'training_engine': {k: v for k, v in engine_config.items() if k != 'nthread'}
+    }
+    model_cache = ModelCache()
+    training_fingerprint = compute_training_fingerprint(X_train, y_train, fingerprint_params)
+    xgb_model = model_cache.load(training_fingerprint) if use_model_cache else None
+    model_cache_status = 'HIT' if xgb_model is not None else 'MISS'
+    logger.info(f"モデルキャッシュ: {model_cache_status} (key={training_fingerprint['key']})")
+    print(f"モデルキャッシュ: {model_cache_status} (key={training_fingerprint['key']})")
+
+    plan = None
+    if xgb_model is None and warm_start_config and use_model_cache:
+        # 前回モデルから差分学習するか、全期間で学習し直すかを判定
+        previous_model, previous_fingerprint = model_cache.load_previous(training_fingerprint)
+        plan = plan_warm_start(previous_model, previous_fingerprint, X_train, y_train, warm_start_config)
+        drift = f", 新着期間MAPE {plan['drift_mape']:.2f}%" if plan['drift_mape'] is not None else ''
+        logger.info(f"差分学習判定: {plan['mode']} ({plan['reason']}{drift})")
+        print(f"差分学習判定: {plan['mode']} ({plan['reason']}{drift})")
+
+    if xgb_model is None and plan and plan['mode'] == 'warm_start':
+        # 前回モデルを起点に直近期間で木を追加
+        logger.info(f"XGBoostモデル差分学習開始 (起点: key={previous_fingerprint['key']})")
+        xgb_model, training_stats = warm_start_model(
+            previous_model, X_train, y_train, xgb_params, warm_start_config, engine_config
+        )
+        lineage = {
+            'mode': 'warm_start',
+            'base_key': previous_fingerprint['key'],
+            'full_max_datetime': (previous_fingerprint.get('lineage') or {}).get(
+                'full_max_datetime', previous_fingerprint['max_datetime']),
+        }
+    elif xgb_model is None:
+        # モデル学習
+        logger.info(f"XGBoostモデル学習開始 (学習エンジン: {engine_config['engine']})")
+        xgb_model, training_stats = train_model(X_train, y_train, xgb_params, engine_config)
+        lineage = {'mode': 'full', 'full_max_datetime': training_fingerprint['max_datetime']}
+
+    if model_cache_status == 'MISS':
+        if plan:
+            training_stats['timings'].update(plan['timings'])
+        phases = ', '.join(f"{phase} {seconds:.2f}秒" for phase, seconds in training_stats['timings'].items())
+        logger.info(f"XGBoostモデル学習完了: 木の本数 {training_stats['boost_rounds']}, {phases}")
+        print(f"XGBoostモデル学習完了 ({training_stats['engine']}: 木の本数 {training_stats['boost_rounds']}, {phases})")
+        if 'valid_mape' in training_stats:
+            logger.info(f"検証期間MAPE: {training_stats['valid_mape']:.2f}% ({training_stats['valid_rows']:,}件)")
+
+        # 学習済みモデルをキャッシュに保存（系譜は次回の差分学習判定に使う）
+        try:
+            model_path = model_cache.save(xgb_model, {**training_fingerprint, 'lineage': lineage})
+            logger.info(f"学習済みモデル保存完了: {model_path}")
+        except Exception as e:
+            logger.error(f"学習済みモデル保存エラー: {e}")
+        training_fingerprint = {**training_fingerprint, 'training_stats': training_stats}
+        if plan:
+            training_fingerprint['warm_start'] = {k: v for k, v in plan.items() if k != 'timings'}
+    else:
+        logger.info("学習済みモデルをキャッシュから読み込み完了")
+        print("学習済みモデルをキャッシュから読み込み完了")
 
-    # 1日24時間の予測
-    for hour in range(24):
-        target_datetime = current_date + timedelta(hours=hour)
+    return xgb_model, model_cache_status, training_fingerprint
 
-        # 特徴量準備
-        feature_values = prepare_features(target_datetime, predictions)
+def train_or_load_direct_models(ml_features_train, features, use_model_cache=True, xgb_params=None):
+    """
+    直接予測の区間モデルをキャッシュから読み込み、不足分をプロセスプールで学習して保存
+
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        features (list): 特徴量名リスト（学習データの指紋計算用）
+        use_model_cache (bool): Falseの場合は必ず再学習する
+        xgb_params (dict): XGBRegressorパラメータ（Noneの場合はXGB_PARAMS）
 
-        # DataFrameに変換（XGBoostに入力）
-        X_pred = pd.DataFrame([feature_values], columns=features)
+    Returns:
+        tuple: (区間モデルdict, model_cache_status, training_fingerprint)
+    """
+    from src.prediction.direct_inference import DIRECT_HORIZON_BUCKETS, train_direct_models
+    from src.prediction.model_cache import ModelCache, compute_training_fingerprint
 
-        # 予測実行
-        pred_value = xgb_model.predict(X_pred)[0]
-        predictions[target_datetime] = pred_value
+    xgb_params = xgb_params or XGB_PARAMS
 
-    current_date += timedelta(days=1)
+    print(f"\n直接予測モデル学習開始（区間: {len(DIRECT_HORIZON_BUCKETS)}個）")
 
-logger.info("段階的予測完了")
-print(f"\n段階的予測完了")
+    # 指紋は段階的予測と同じ学習データ＋方式・区間で計算（区間ごとに別キー）
+    model_cache = ModelCache()
+    training_fingerprint = compute_training_fingerprint(
+        ml_features_train[features], ml_features_train['actual_power'],
+        {**xgb_params, 'strategy': 'direct', 'buckets': DIRECT_HORIZON_BUCKETS}
+    )
+    bucket_fingerprints = {
+        bucket: {**training_fingerprint, 'key': f"{training_fingerprint['key']}_d{bucket[0]}-{bucket[1]}"}
+        for bucket in DIRECT_HORIZON_BUCKETS
+    }
 
-# 予測完了時刻・処理時間計算
-prediction_end_time = datetime.now()
-duration_seconds = (prediction_end_time - prediction_start_time).total_seconds()
+    models = {}
+    if use_model_cache:
+        for bucket, fingerprint in bucket_fingerprints.items():
+            model = model_cache.load(fingerprint)
+            if model is not None:
+                models[bucket] = model
+
+    missing = [bucket for bucket in DIRECT_HORIZON_BUCKETS if bucket not in models]
+    model_cache_status = 'HIT' if not missing else 'MISS'
+    logger.info(f"モデルキャッシュ: {model_cache_status} (key={training_fingerprint['key']}, 学習対象区間: {missing})")
+    print(f"モデルキャッシュ: {model_cache_status} (key={training_fingerprint['key']}, 学習対象区間: {len(missing)}個)")
+
+    if missing:
+        logger.info("直接予測モデル学習開始")
+        models.update(train_direct_models(ml_features_train, xgb_params, buckets=tuple(missing)))
+        logger.info("直接予測モデル学習完了")
+        print("直接予測モデル学習完了")
+
+        try:
+            for bucket in missing:
+                model_cache.save(models[bucket], bucket_fingerprints[bucket])
+            logger.info(f"直接予測モデル保存完了: {len(missing)}個")
+        except Exception as e:
+            logger.error(f"直接予測モデル保存エラー: {e}")
+
+    return models, model_cache_status, training_fingerprint
 
-# %%
 # ================================================================
-# 6. 予測結果CSV保存
+# 3. 営業日データ準備
 # ================================================================
 
-def save_prediction_results_to_csv(predictions, execution_id):
+def prepare_business_days(ml_features_train, calendar_data, run_date):
     """
-    予測結果をCSV形式で保存（BigQueryスキーマに準拠）
+    lag_1_business_day用の営業日データを準備
+
+    Args:
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        calendar_data (DataFrame): 予測期間のカレンダー（dateインデックス）
+        run_date (date): 予測実行日
+
+    Returns:
+        tuple: (business_days_train, business_days_future)
+    """
+    import pandas as pd
+    from src.prediction.lag_resolver import BUSINESS_DAY_LOOKBACK
+
+    # 営業日のみに絞ったDataFrameを事前作成
+    # 過去20日分のみ（lag_1_business_dayの探索範囲）
+    lookback_start = pd.Timestamp(run_date) - pd.Timedelta(days=BUSINESS_DAY_LOOKBACK)
+    business_days_train = ml_features_train[
+        (ml_features_train.index >= lookback_start) &
+        (~ml_features_train['is_holiday']) &
+        (~ml_features_train['is_weekend'])
+    ][['actual_power']]  # 実績値のみ
+
+    business_days_future = calendar_data[
+        (~calendar_data['is_holiday']) & (~calendar_data['is_weekend'])
+    ].index  # 日付のみ（Index化）
+
+    return business_days_train, business_days_future
+
+# ================================================================
+# 4. 予測結果エクスポート（Arrowテーブル → Parquet → BigQuery）
+# ================================================================
+
+# BigQueryロードの試行回数（同じジョブIDで再試行するため二重登録されない）
+EXPORT_LOAD_ATTEMPTS = 3
+
+def build_prediction_table(predictions, execution_id, run_date, created_at=None, model_id=None):
+    """
+    予測結果をprediction_resultsテーブルと同じスキーマのArrowテーブルに変換
 
     Args:
         predictions (dict): 予測結果辞書 {datetime: predicted_value}
         execution_id (str): 実行ID
+        run_date (date): 予測実行日
+        created_at (datetime): レコード作成日時（Noneの場合は現在時刻）
+        model_id (str): モデルID（Noneの場合は本番モデル challengers.CHAMPION_MODEL_ID）
+
+    Returns:
+        pyarrow.Table: execution_id, prediction_run_date, prediction_date,
+                       prediction_hour, predicted_power_kwh, model_id, created_at
+    """
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from src.prediction.challengers import CHAMPION_MODEL_ID
+
+    index = pd.DatetimeIndex(list(predictions.keys()))
+    values = np.round(np.fromiter(predictions.values(), dtype=np.float64, count=len(predictions)), 2)
+    created_at = pd.Timestamp(created_at or datetime.now()).floor('s')
+    n = len(index)
+
+    return pa.table({
+        'execution_id': pa.array([execution_id] * n, type=pa.string()),
+        'prediction_run_date': pa.array([run_date] * n, type=pa.date32()),
+        'prediction_date': pa.array(index.normalize().to_numpy(dtype='datetime64[D]'), type=pa.date32()),
+        'prediction_hour': pa.array(index.hour.to_numpy(dtype=np.int64), type=pa.int64()),
+        'predicted_power_kwh': pa.array(values, type=pa.float64()),
+        'model_id': pa.array([model_id or CHAMPION_MODEL_ID] * n, type=pa.string()),
+        'created_at': pa.array([created_at.to_pydatetime()] * n, type=pa.timestamp('us')),
+    })
+
+
+def save_prediction_results(table, timestamp, export_csv=False):
+    """
+    予測結果ArrowテーブルをローカルにParquet形式で保存（CSVは任意の派生出力）
+
+    Args:
+        table (pyarrow.Table): build_prediction_table() の戻り値
+        timestamp (str): ファイル名に使う実行タイムスタンプ（YYYYMMDD_HHMMSS）
+        export_csv (bool): 同じテーブルからCSVも出力するか
 
     Returns:
-        dict: 保存結果情報
+        dict: 保存結果情報 {'success', 'parquet_file', 'csv_file', 'prediction_count', 'date_range'}
     """
-    # 実行タイムスタンプ生成（日本時間）
-    now = datetime.now()
-    timestamp = now.strftime('%Y%m%d_%H%M%S')
-    run_date = now.strftime('%Y-%m-%d')
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
 
-    # ディレクトリ作成
+    energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
     base_path = Path(energy_env_path) / 'data' / 'predictions'
     base_path.mkdir(parents=True, exist_ok=True)
 
-    # 予測結果をDataFrameに変換（BigQueryスキーマに準拠）
-    prediction_data = []
-
-    for target_datetime, predicted_value in predictions.items():
-        prediction_data.append({
-            'execution_id': execution_id,
-            'prediction_run_date': run_date,
-            'prediction_date': target_datetime.strftime('%Y-%m-%d'),
-            'prediction_hour': target_datetime.hour,
-            'predicted_power_kwh': round(predicted_value, 2),
-            'created_at': now.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    # BigQueryへはこのファイルをそのままロードする
+    parquet_filepath = base_path / f"predictions_{timestamp}.parquet"
+    pq.write_table(table, parquet_filepath)
 
-    # 予測結果CSV保存
-    predictions_df = pd.DataFrame(prediction_data)
-    csv_filename = f"predictions_{timestamp}.csv"
-    csv_filepath = base_path / csv_filename
-    predictions_df.to_csv(csv_filepath, index=False, encoding='utf-8')
+    csv_filepath = None
+    if export_csv:
+        csv_filepath = base_path / f"predictions_{timestamp}.csv"
+        pa_csv.write_csv(table, csv_filepath)
 
-    # 保存結果返却
-    result = {
+    date_range = pc.min_max(table['prediction_date']).as_py()
+    return {
         'success': True,
-        'timestamp': timestamp,
-        'run_date': run_date,
-        'csv_file': str(csv_filepath),
-        'prediction_count': len(predictions),
-        'date_range': f"{min(predictions.keys()).date()} to {max(predictions.keys()).date()}"
+        'parquet_file': str(parquet_filepath),
+        'csv_file': str(csv_filepath) if csv_filepath else None,
+        'prediction_count': table.num_rows,
+        'date_range': f"{date_range['min']} to {date_range['max']}",
     }
 
-    return result
+# ================================================================
+# 5. 予測結果BigQuery保存
+# ================================================================
+
+def load_prediction_parquet_to_bq(client, parquet_path, execution_id, attempts=EXPORT_LOAD_ATTEMPTS):
+    """
+    ローカルのParquetファイルをBigQueryのprediction_resultsテーブルに追記
+
+    ジョブIDは実行IDから決まるため、再試行時に同じジョブが既に登録されていれば
+    新しいロードは行わず既存ジョブの完了を待つ（同じ予測結果が二重に追記されない）。
+
+    Args:
+        client: BigQueryクライアント
+        parquet_path (str): save_prediction_results() で保存したParquetファイル
+        execution_id (str): 実行ID
+        attempts (int): 試行回数
+
+    Returns:
+        tuple: (bq_insert_success, bq_error_message)
+    """
+    from google.api_core.exceptions import Conflict
+    from google.cloud import bigquery
+
+    table_ref = f"{client.project}.prod_energy_data.prediction_results"
+    job_id = f"prediction_results_{execution_id}"
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition="WRITE_APPEND",
+        # model_idカラム追加前のテーブルにもロードできるようにする
+        schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION],
+    )
+
+    bq_error_message = None
+    for attempt in range(1, attempts + 1):
+        try:
+            try:
+                with open(parquet_path, 'rb') as f:
+                    job = client.load_table_from_file(f, table_ref, job_id=job_id, job_config=job_config)
+            except Conflict:
+                # 前回の試行でジョブ登録済み（応答だけ失われた場合など）
+                logger.info(f"BigQueryロードジョブ登録済み: {job_id}")
+                job = client.get_job(job_id)
+            job.result()
+
+            logger.info(f"予測結果BigQuery保存完了: {job.output_rows}件 (job_id={job_id})")
+            print(f"予測結果BigQuery保存完了: {job.output_rows}件")
+            return True, None
+
+        except Exception as e:
+            bq_error_message = str(e)
+            logger.error(f"BigQuery保存エラー（{attempt}/{attempts}回目）: {bq_error_message}")
+            print(f"BigQuery保存エラー（{attempt}/{attempts}回目）: {bq_error_message}")
+            if getattr(e, 'code', None) is not None and 400 <= e.code < 500 and e.code != 409:
+                break  # スキーマ不一致などは再試行しても成功しない
+
+    print(f"注意: 予測結果はParquetファイルに保存済みです: {parquet_path}")
+    return False, bq_error_message
+
+def save_scenario_bands_to_bq(client, bands, execution_id, run_date):
+    """
+    気象シナリオ予測のパーセンタイル帯をBigQueryのprediction_scenario_bandsテーブルに追記
 
-# 予測結果保存実行
-logger.info("予測結果CSV保存開始")
-print(f"\n予測結果CSV保存開始")
-print("=" * 50)
+    Args:
+        client: BigQueryクライアント
+        bands (DataFrame): weather_scenarios.summarize_scenario_bands() の戻り値
+        execution_id (str): 実行ID（prediction_resultsと共通）
+        run_date (date): 予測実行日
 
-save_result = save_prediction_results_to_csv(predictions, execution_id)
+    Returns:
+        tuple: (bq_insert_success, bq_error_message)
+    """
+    import pandas as pd
+    from google.cloud import bigquery
+
+    table_ref = f"{client.project}.prod_energy_data.prediction_scenario_bands"
+
+    bq_bands_df = bands.copy()
+    bq_bands_df.insert(0, 'execution_id', execution_id)
+    bq_bands_df.insert(1, 'prediction_run_date', run_date)
+    bq_bands_df['created_at'] = pd.Timestamp.now()
+
+    try:
+        job = client.load_table_from_dataframe(
+            bq_bands_df,
+            table_ref,
+            job_config=bigquery.LoadJobConfig(
+                write_disposition="WRITE_APPEND"
+            )
+        )
+        job.result()
+
+        logger.info(f"気象シナリオ予測帯BigQuery保存完了: {len(bq_bands_df)}件")
+        print(f"気象シナリオ予測帯BigQuery保存完了: {len(bq_bands_df)}件")
+        return True, None
+
+    except Exception as e:
+        logger.error(f"気象シナリオ予測帯BigQuery保存エラー: {e}")
+        print(f"気象シナリオ予測帯BigQuery保存エラー: {e}")
+        return False, str(e)
+
+# ================================================================
+# 予測実行（エントリーポイント）
+# ================================================================
+
+def run_forecast(run_date=None, horizon_days=14, inference_mode='batch',
+                 use_model_cache=True, use_training_cache=True, export=True, client=None,
+                 strategy='recursive', weather_scenarios=None, inference_backend='xgboost',
+                 export_csv=False, training_engine='sklearn', nthread=None, warm_start=None,
+                 challengers=None):
+    """
+    学習（またはキャッシュ読み込み）→段階的予測→エクスポート→ステータス記録を実行
+
+    Args:
+        run_date (date | str): 予測実行日（予測開始日）。Noneの場合は今日
+        horizon_days (int): 予測日数（デフォルト: 14）
+        inference_mode (str): 'batch'（1日24時間一括予測）または 'hourly'（1時間ずつ予測）
+        use_model_cache (bool): 学習済みモデルキャッシュを使うか
+        use_training_cache (bool): 学習データのローカルキャッシュを使うか
+        export (bool): Parquet・BigQueryへの予測結果保存とステータス記録を行うか
+        client: BigQueryクライアント（Noneの場合は新規作成）
+        strategy (str): 'recursive'（段階的予測）または 'direct'（区間モデルによる直接予測）
+        weather_scenarios (dict): 気象シナリオ定義（weather_scenarios.load_weather_scenarios()）。
+                                  指定時は全シナリオを同時に段階的予測し、パーセンタイル帯を出力
+        inference_backend (str): batchモード・シナリオ予測の推論バックエンド
+                                 'xgboost'（inplace_predict）または 'numpy'（compiled_trees）
+        export_csv (bool): Parquetに加えて同じ予測結果をCSVでも出力するか
+        training_engine (str): 段階的予測モデルの学習エンジン
+                               'sklearn'（XGBRegressor.fit）または 'hist'（QuantileDMatrix＋early stopping）
+        nthread (int): 学習スレッド数（Noneの場合はXGBoostのデフォルト・histはCPUコア数）
+        warm_start (dict): 差分学習設定（training_engine.load_warm_start_config()）。
+                           指定時は前回モデルから直近期間で木を追加し、定期的・誤差悪化時は全期間で学習し直す
+        challengers (dict): チャレンジャー定義（challengers.load_challengers()）。
+                            指定時は同じ学習データ・特徴量からチャレンジャーを並行学習して予測し、
+                            prediction_resultsにmodel_idごとに保存する
+
+    Returns:
+        dict: 実行結果 {'execution_id', 'predictions', 'model', 'model_cache', 'bq_saved', ...}
+    """
+    import time
+
+    import pandas as pd
+    import pyarrow as pa
+    from google.cloud import bigquery
+    from src.prediction.challengers import predict_challengers, start_challenger_training
+    from src.prediction.compiled_trees import INFERENCE_BACKENDS, make_predictor
+    from src.prediction.direct_inference import predict_direct
+    from src.prediction.iterative_inference import (
+        FEATURES, INFERENCE_MODES, predict_batched, predict_hourly, predict_scenarios
+    )
+    from src.prediction.training_engine import load_engine_config
+    from src.prediction.weather_scenarios import (
+        WEATHER_FEATURES, build_weather_tensor, summarize_scenario_bands
+    )
+
+    if inference_mode not in INFERENCE_MODES:
+        raise ValueError(f"推論モードは {INFERENCE_MODES} のいずれかを指定してください: {inference_mode}")
+    if strategy not in FORECAST_STRATEGIES:
+        raise ValueError(f"予測方式は {FORECAST_STRATEGIES} のいずれかを指定してください: {strategy}")
+    if inference_backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"推論バックエンドは {INFERENCE_BACKENDS} のいずれかを指定してください: {inference_backend}")
+    if weather_scenarios and strategy != 'recursive':
+        raise ValueError("気象シナリオ予測は段階的予測（strategy='recursive'）でのみ利用できます")
+    if challengers and strategy != 'recursive':
+        raise ValueError("チャレンジャー予測は段階的予測（strategy='recursive'）でのみ利用できます")
+    engine_config = load_engine_config(training_engine, nthread=nthread)
+
+    if run_date is None:
+        run_date = datetime.now().date()
+    elif isinstance(run_date, str):
+        run_date = datetime.strptime(run_date, '%Y-%m-%d').date()
+    elif isinstance(run_date, datetime):
+        run_date = run_date.date()
+
+    # ログ設定・実行ID生成（ステータスログ用）
+    log_file_path = setup_prediction_logging()
+    execution_id = str(uuid.uuid4())
+    prediction_start_time = datetime.now()
+
+    logger.info("段階的予測実験開始")
+    logger.info("=" * 60)
+    logger.info(f"実行ID: {execution_id}")
+    logger.info(f"ログファイル: {log_file_path}")
+    print("段階的予測テスト開始")
+    print("=" * 60)
+    print(f"実行ID: {execution_id}")
+
+    # BigQueryクライアント初期化
+    if client is None:
+        logger.info("BigQueryクライアント初期化")
+        client = bigquery.Client(project='energy-env')
+        print("BigQueryクライアント初期化完了")
+
+    try:
+        ml_features_train, calendar_data, future_features, training_data_stats = load_forecast_inputs(
+            client, run_date, horizon_days, use_training_cache
+        )
+        print(f"データ準備完了")
+    except Exception as e:
+        # BigQueryエラー（接続・クエリ実行エラー）をログに記録
+        logger.error(f"BigQueryエラー: {e}")
+        logger.error(f"エラー詳細: {type(e).__name__}")
+        print(f"\nBigQueryエラーが発生しました: {e}")
+        print(f"ログファイルを確認してください: {log_file_path}")
+        # エラーを再送出してプログラム停止
+        raise
+
+    # Phase 9で使用した12特徴量（iterative_inferenceモジュールで定義）
+    features = FEATURES
+
+    print(f"\n使用特徴量: {len(features)}個")
+    for i, feature in enumerate(features, 1):
+        print(f"  {i:2d}. {feature}")
+
+    # XGBoostパラメータ（src.prediction.tuningの出力ファイルがあれば優先）
+    xgb_params, xgb_params_source = load_xgb_params()
+    logger.info(f"XGBoostパラメータ: {xgb_params_source} {xgb_params}")
+    print(f"XGBoostパラメータ: {xgb_params_source}")
+
+    # 予測期間設定（実行日からhorizon_days日間）
+    start_date = pd.Timestamp(run_date)
+    end_date = start_date + pd.Timedelta(days=horizon_days - 1)
+
+    if strategy == 'direct':
+        xgb_model, model_cache_status, training_fingerprint = train_or_load_direct_models(
+            ml_features_train, features, use_model_cache, xgb_params
+        )
+
+        logger.info("直接予測実行開始")
+        logger.info(f"予測期間: {start_date.date()} ～ {end_date.date()}")
+        print(f"\n直接予測実行開始")
+        print(f"予測期間: {start_date.date()} ～ {end_date.date()}")
+
+        # 直接予測（区間モデルごとに予測期間の全時間を一括予測）
+        predictions = predict_direct(xgb_model, start_date, horizon_days, future_features, ml_features_train)
+
+        logger.info("直接予測完了")
+    else:
+        challenger_futures = {}
+        if challengers:
+            # チャレンジャーの学習をチャンピオンの学習・予測と並行して開始
+            logger.info(f"チャレンジャー学習開始: {list(challengers)}")
+            print(f"\nチャレンジャー学習開始: {len(challengers)}モデル")
+            challenger_futures = start_challenger_training(ml_features_train, challengers, xgb_params)
+
+        xgb_model, model_cache_status, training_fingerprint = train_or_load_model(
+            ml_features_train, features, use_model_cache, xgb_params, engine_config, warm_start
+        )
+
+        business_days_train, business_days_future = prepare_business_days(ml_features_train, calendar_data, run_date)
+
+        logger.info("段階的予測実行開始")
+        logger.info(f"予測期間: {start_date.date()} ～ {end_date.date()}")
+        logger.info(f"推論モード: {inference_mode}")
+
+        print(f"\n段階的予測実行開始")
+        print(f"予測期間: {start_date.date()} ～ {end_date.date()}")
+        print(f"推論モード: {inference_mode}")
+
+        # 推論関数（numpy: 決定木を平坦化したNumPy配列で評価）
+        predictor = make_predictor(xgb_model, inference_backend)
+        logger.info(f"推論バックエンド: {inference_backend}")
+
+        # 段階的予測（batch: 1日1回の一括予測, hourly: 1時間1回の予測）
+        if inference_mode == 'batch':
+            predictions = predict_batched(
+                xgb_model, start_date, horizon_days, future_features, ml_features_train,
+                business_days_train, business_days_future, features, predictor
+            )
+        else:
+            predictions = predict_hourly(
+                xgb_model, start_date, horizon_days, future_features, ml_features_train,
+                business_days_train, business_days_future, features
+            )
+
+        logger.info("段階的予測完了")
+        print(f"\n段階的予測完了")
+
+    challenger_predictions, challenger_stats = {}, {}
+    if challengers:
+        challenger_models = {}
+        for model_id, future in challenger_futures.items():
+            challenger_models[model_id], challenger_stats[model_id] = future.result()
+        logger.info(f"チャレンジャー学習完了: {challenger_stats}")
+
+        started = time.perf_counter()
+        challenger_predictions = predict_challengers(
+            challenger_models, challengers, start_date, horizon_days, future_features, ml_features_train,
+            business_days_train, business_days_future
+        )
+        logger.info(f"チャレンジャー予測完了: {len(challenger_predictions)}モデル ({time.perf_counter() - started:.2f}秒)")
+        print(f"チャレンジャー予測完了: {len(challenger_predictions)}モデル")
+
+    scenario_bands = None
+    if weather_scenarios:
+        # 気象シナリオ予測（全シナリオのラグを同時に伝播・1日1回の一括予測）
+        logger.info(f"気象シナリオ予測開始: {list(weather_scenarios)}")
+        print(f"\n気象シナリオ予測開始: {len(weather_scenarios)}シナリオ")
+
+        weather_tensor = build_weather_tensor(future_features, start_date, horizon_days, weather_scenarios)
+        scenario_values, scenario_index = predict_scenarios(
+            xgb_model, start_date, horizon_days, future_features, ml_features_train,
+            business_days_train, business_days_future, weather_tensor, WEATHER_FEATURES, features, predictor
+        )
+        scenario_bands = summarize_scenario_bands(scenario_values, scenario_index, list(weather_scenarios))
+
+        logger.info("気象シナリオ予測完了")
+        print(f"気象シナリオ予測完了")
+
+    # 予測完了時刻・処理時間計算
+    prediction_end_time = datetime.now()
+    duration_seconds = (prediction_end_time - prediction_start_time).total_seconds()
+
+    result = {
+        'execution_id': execution_id,
+        'run_date': run_date,
+        'predictions': predictions,
+        'model': xgb_model,
+        'strategy': strategy,
+        'model_cache': model_cache_status,
+        'training_fingerprint': training_fingerprint,
+        'training_data_stats': training_data_stats,
+        'scenario_bands': scenario_bands,
+        'challenger_predictions': challenger_predictions,
+        'parquet_file': None,
+        'csv_saved': False,
+        'bq_saved': False,
+        'duration_seconds': duration_seconds,
+    }
+
+    if not export:
+        return result
+
+    # 予測結果をArrowテーブルに1回だけ変換し、Parquet保存 → 同じファイルをBigQueryへロード
+    logger.info("予測結果保存開始")
+    print(f"\n予測結果保存開始")
+    print("=" * 50)
+
+    prediction_table = build_prediction_table(predictions, execution_id, run_date)
+    if challenger_predictions:
+        # チャレンジャーの予測も同じ実行ID・同じファイルでmodel_idごとに保存
+        prediction_table = pa.concat_tables([prediction_table] + [
+            build_prediction_table(values, execution_id, run_date, model_id=model_id)
+            for model_id, values in challenger_predictions.items()
+        ])
+    save_result = save_prediction_results(
+        prediction_table, prediction_end_time.strftime('%Y%m%d_%H%M%S'), export_csv=export_csv
+    )
 
-if save_result['success']:
     logger.info("予測結果保存完了")
-    logger.info(f"実行タイムスタンプ: {save_result['timestamp']}")
     logger.info(f"予測件数: {save_result['prediction_count']}件")
-    logger.info(f"保存ファイル: {save_result['csv_file']}")
+    logger.info(f"保存ファイル: {save_result['parquet_file']}")
 
     print(f"予測結果保存完了")
-    print(f"実行タイムスタンプ: {save_result['timestamp']}")
-    print(f"保存ファイル: {save_result['csv_file']}")
+    print(f"保存ファイル: {save_result['parquet_file']}")
+    if save_result['csv_file']:
+        print(f"CSVファイル: {save_result['csv_file']}")
     print(f"データ概要:")
     print(f"  予測件数: {save_result['prediction_count']}件")
     print(f"  対象期間: {save_result['date_range']}")
-else:
-    logger.error("予測結果保存失敗")
-    print(f"保存失敗")
 
-# %%
-# ================================================================
-# 7. 予測結果BigQuery保存
-# ================================================================
+    # 予測結果BigQuery保存
+    logger.info("予測結果BigQuery保存開始")
+    print(f"\n予測結果BigQuery保存開始")
+    print("=" * 50)
 
-logger.info("予測結果BigQuery保存開始")
-print(f"\n予測結果BigQuery保存開始")
-print("=" * 50)
+    bq_insert_success, bq_error_message = load_prediction_parquet_to_bq(
+        client, save_result['parquet_file'], execution_id
+    )
 
-# BigQueryテーブル設定
-dataset_id = 'prod_energy_data'
-table_id = 'prediction_results'
-table_ref = f"{client.project}.{dataset_id}.{table_id}"
+    # 気象シナリオ予測帯BigQuery保存（同じ実行IDで紐付け）
+    scenario_bands_saved = None
+    if scenario_bands is not None:
+        scenario_bands_saved, _ = save_scenario_bands_to_bq(client, scenario_bands, execution_id, run_date)
 
-# 予測結果をBigQuery用に変換
-now = pd.Timestamp.now()  # サーバーローカル時間（JST）
-bq_prediction_data = []
-for target_datetime, predicted_value in predictions.items():
-    bq_prediction_data.append({
-        'execution_id': execution_id,
-        'prediction_run_date': now.date(),
-        'prediction_date': target_datetime.date(),
-        'prediction_hour': target_datetime.hour,
-        'predicted_power_kwh': round(predicted_value, 2),
-        'created_at': now
-    })
+    # プロセス実行ステータス記録
+    logger.info("プロセス実行ステータス記録開始")
 
-bq_predictions_df = pd.DataFrame(bq_prediction_data)
-bq_insert_success = False
-bq_error_message = None
-
-try:
-    # BigQueryへ挿入
-    job = client.load_table_from_dataframe(
-        bq_predictions_df,
-        table_ref,
-        job_config=bigquery.LoadJobConfig(
-            write_disposition="WRITE_APPEND"
-        )
-    )
-    job.result()  # Wait for the job to complete
+    # プロセス実行ステータス作成（BigQueryのprocess_execution_logテーブルスキーマに準拠）
+    process_status = {
+        'execution_id': execution_id,
+        'date': str(run_date),  # 予測実行日
+        'process_type': 'ML_PREDICTION',
+        'status': 'FAILED' if not bq_insert_success else 'SUCCESS',
+        'error_message': bq_error_message if not bq_insert_success else None,
+        'started_at': prediction_start_time,
+        'completed_at': prediction_end_time,
+        'duration_seconds': duration_seconds,
+        'records_processed': len(predictions),
+        'file_size_mb': None,
+        'additional_info': json.dumps({  # JSON文字列に変換
+            'prediction_period': f"{start_date.date()} to {end_date.date()}",
+            'prediction_count': len(predictions),
+            'parquet_file': save_result['parquet_file'],
+            'csv_saved': save_result['csv_file'] is not None,
+            'bq_saved': bq_insert_success,
+            'strategy': strategy,
+            'model_cache': model_cache_status,
+            'model_cache_key': training_fingerprint['key'],
+            'xgb_params_source': xgb_params_source,
+            'training_engine': engine_config['engine'],
+            'training_stats': training_fingerprint.get('training_stats'),
+            'warm_start': training_fingerprint.get('warm_start'),
+            'training_max_datetime': training_fingerprint['max_datetime'],
+            'training_row_count': training_fingerprint['row_count'],
+            'training_data_cache': training_data_stats,
+            'weather_scenarios': list(weather_scenarios) if weather_scenarios else None,
+            'challengers': challenger_stats or None,
+            'scenario_bands_saved': scenario_bands_saved
+        })
+    }
 
-    bq_insert_success = True
-    logger.info(f"予測結果BigQuery保存完了: {len(bq_predictions_df)}件")
-    print(f"予測結果BigQuery保存完了: {len(bq_predictions_df)}件")
+    # ローカルログ保存 + BigQueryインサート
+    try:
+        log_and_save_to_bq(client=client, process_status=process_status, log_level='INFO')
+        logger.info("プロセス実行ステータス記録完了（ローカル + BQ）")
+        print(f"\nプロセス実行ステータス記録完了（ローカル + BQ）")
+    except Exception as e:
+        logger.error(f"プロセス実行ステータス記録エラー: {e}")
+        print(f"プロセス実行ステータス記録エラー: {e}")
+
+    logger.info("日次予測処理完了")
+    print(f"\n日次予測処理完了")
+
+    result.update({
+        'parquet_file': save_result['parquet_file'],
+        'csv_saved': save_result['csv_file'] is not None,
+        'bq_saved': bq_insert_success,
+    })
+    return result
 
-except Exception as e:
-    bq_error_message = str(e)
-    logger.error(f"BigQuery保存エラー: {bq_error_message}")
-    print(f"BigQuery保存エラー: {bq_error_message}")
-    print(f"注意: 予測結果はCSVファイルに保存済みです")
 
-# %%
-# ================================================================
-# 8. プロセス実行ステータス記録
-# ================================================================
+def main():
+    """メイン関数"""
+    from src.prediction.compiled_trees import INFERENCE_BACKENDS
+    from src.prediction.iterative_inference import INFERENCE_MODES
+    from src.prediction.training_engine import TRAINING_ENGINES
+
+    parser = argparse.ArgumentParser(description='日次予測実行（14日間段階的予測）')
+    parser.add_argument('--run-date', type=str,
+                        help='予測実行日 (YYYY-MM-DD形式・デフォルト: 今日)')
+    parser.add_argument('--horizon-days', type=int, default=14,
+                        help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--inference-mode', choices=INFERENCE_MODES, default='batch',
+                        help='推論モード: batch=1日24時間一括予測, hourly=1時間ずつ予測（デフォルト: batch）')
+    parser.add_argument('--no-model-cache', action='store_true',
+                        help='学習済みモデルキャッシュを使わず必ず再学習する')
+    parser.add_argument('--no-training-cache', action='store_true',
+                        help='学習データのローカルキャッシュを使わずml_features全期間を取得する')
+    parser.add_argument('--inference-backend', choices=INFERENCE_BACKENDS, default='xgboost',
+                        help='推論バックエンド: xgboost=inplace_predict, numpy=決定木の平坦化配列で評価（デフォルト: xgboost）')
+    parser.add_argument('--strategy', choices=FORECAST_STRATEGIES, default='recursive',
+                        help='予測方式: recursive=段階的予測, direct=区間モデルによる直接予測（デフォルト: recursive）')
+    parser.add_argument('--weather-scenarios', nargs='?', const='', default=None, metavar='JSON',
+                        help='気象シナリオ予測を実行（JSON省略時は標準シナリオ: 気温±1/±2℃・猛暑・多湿）')
+    parser.add_argument('--training-engine', choices=TRAINING_ENGINES, default='sklearn',
+                        help='学習エンジン: sklearn=XGBRegressor.fit, hist=QuantileDMatrix＋直近期間でのearly stopping, '
+                             'out_of_core=学習データキャッシュからのストリーミング学習（デフォルト: sklearn）')
+    parser.add_argument('--nthread', type=int,
+                        help='学習スレッド数（デフォルト: XGBoostのデフォルト・histはCPUコア数）')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='前回モデルから直近期間で差分学習する（定期的・誤差悪化時は全期間で学習）')
+    parser.add_argument('--full-retrain-days', type=int,
+                        help='差分学習時に全期間で学習し直す間隔（日・デフォルト: 7）')
+    parser.add_argument('--drift-mape', type=float,
+                        help='差分学習時に全期間で学習し直す新着期間MAPEのしきい値（%%・デフォルト: 5.0）')
+    parser.add_argument('--challengers', nargs='?', const='', default=None, metavar='JSON',
+                        help='チャレンジャーモデルも学習・予測しmodel_idごとに保存（JSON省略時は標準のチャレンジャー）')
+    parser.add_argument('--export-csv', action='store_true',
+                        help='Parquetに加えて予測結果CSVも出力する')
+    args = parser.parse_args()
+
+    weather_scenarios = None
+    if args.weather_scenarios is not None:
+        from src.prediction.weather_scenarios import load_weather_scenarios
+        weather_scenarios = load_weather_scenarios(args.weather_scenarios or None)
+
+    challengers = None
+    if args.challengers is not None:
+        from src.prediction.challengers import load_challengers
+        challengers = load_challengers(args.challengers or None)
+
+    warm_start = None
+    if args.warm_start:
+        from src.prediction.training_engine import load_warm_start_config
+        warm_start = load_warm_start_config(full_retrain_days=args.full_retrain_days, drift_mape=args.drift_mape)
+
+    run_forecast(
+        run_date=args.run_date,
+        strategy=args.strategy,
+        inference_backend=args.inference_backend,
+        weather_scenarios=weather_scenarios,
+        horizon_days=args.horizon_days,
+        inference_mode=args.inference_mode,
+        use_model_cache=not args.no_model_cache,
+        use_training_cache=not args.no_training_cache,
+        export_csv=args.export_csv,
+        training_engine=args.training_engine,
+        nthread=args.nthread,
+        warm_start=warm_start,
+        challengers=challengers,
+    )
 
-logger.info("プロセス実行ステータス記録開始")
-
-# プロセス実行ステータス作成（BigQueryのprocess_execution_logテーブルスキーマに準拠）
-process_status = {
-    'execution_id': execution_id,
-    'date': str(prediction_start_time.date()),  # 予測実行日
-    'process_type': 'ML_PREDICTION',
-    'status': 'FAILED' if not bq_insert_success else 'SUCCESS',
-    'error_message': bq_error_message if not bq_insert_success else None,
-    'started_at': prediction_start_time,
-    'completed_at': prediction_end_time,
-    'duration_seconds': duration_seconds,
-    'records_processed': len(predictions),
-    'file_size_mb': None,
-    'additional_info': json.dumps({  # JSON文字列に変換
-        'prediction_period': f"{start_date.date()} to {end_date.date()}",
-        'prediction_count': len(predictions),
-        'csv_saved': save_result['success'],
-        'bq_saved': bq_insert_success
-    })
-}
 
-# ローカルログ保存 + BigQueryインサート
-try:
-    log_and_save_to_bq(client=client, process_status=process_status, log_level='INFO')
-    logger.info("プロセス実行ステータス記録完了（ローカル + BQ）")
-    print(f"\nプロセス実行ステータス記録完了（ローカル + BQ）")
-except Exception as e:
-    logger.error(f"プロセス実行ステータス記録エラー: {e}")
-    print(f"プロセス実行ステータス記録エラー: {e}")
-
-logger.info("日次予測処理完了")
-print(f"\n日次予測処理完了")
+if __name__ == "__main__":
+    main()
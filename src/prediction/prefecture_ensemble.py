@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+都県別気象フィードによる並列予測（比較・ブレンド）
+
+本番の日次予測は千葉県の気象データのみを使うが、関東の各都県（WeatherProcessor.VALID_PREFECTURES）の
+気象データで気象特徴量を差し替えたモデルを都県ごとに学習し、14日間の段階的予測をプロセスプールで並列実行する。
+各モデルは直近の検証期間のMAPE（lagは実績値ベース）で比較し、予測値は重み付きでブレンドする。
+
+共有データ:
+    学習データの特徴量行列・目的変数・都県別気象データはNumPyのメモリマップファイル（.npy）に1回だけ書き出し、
+    各ワーカーは mmap_mode='r' で開いて参照する（DataFrameのpickleコピーをワーカーごとに送らない）。
+
+都県名:
+    weather_dataテーブルの千葉県は日次ローダーが「千葉県」で保存しているため、chibaのみ「千葉県」で検索する。
+    その他の都県はWeatherProcessorのファイル名（tokyo / kanagawa ...）のprefecture値で検索する。
+
+気象データの充足率:
+    学習期間・予測期間それぞれの気象データ充足率がmin_coverage未満の都県は除外する。
+    日次パイプラインが予報を取得しているのは千葉県のみのため、他の都県は予報を投入していないと
+    予測期間の充足率が0%になり除外される（欠損した気象特徴量で予測・ブレンドしない）。
+
+ブレンド方式（--blend）:
+    inverse_mape: 検証MAPEの逆数で重み付け（デフォルト）
+    mean        : 単純平均
+    best        : 検証MAPEが最小の都県のみ
+
+実行方法:
+    python -m src.prediction.prefecture_ensemble
+    python -m src.prediction.prefecture_ensemble --run-date 2025-10-25 --prefectures chiba tokyo kanagawa --workers 3
+
+出力:
+    {ENERGY_ENV_PATH}/data/prefecture_forecast/prefecture_forecast_{run_date}.parquet
+        target_datetime, {都県}..., blended  # 都県別・ブレンド後の予測値
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BLEND_METHODS = ('inverse_mape', 'mean', 'best')
+
+# 都県ごとに差し替える気象特徴量
+PREFECTURE_WEATHER_FEATURES = ['temperature_2m', 'relative_humidity_2m', 'precipitation']
+
+# weather_dataテーブルのprefecture値（日次ローダーが日本語名で保存している都県）
+WEATHER_PREFECTURE_LABELS = {'chiba': '千葉県'}
+
+# 検証期間（学習データ末尾の日数）
+HOLDOUT_DAYS = 14
+
+
+def weather_label(prefecture):
+    """都県名（WeatherProcessor.VALID_PREFECTURES）→ weather_dataテーブルのprefecture値"""
+    return WEATHER_PREFECTURE_LABELS.get(prefecture, prefecture)
+
+
+def load_prefecture_weather(client, prefectures, date_from, date_to):
+    """
+    都県別の気象データをweather_dataテーブルから取得
+
+    Args:
+        client: BigQueryクライアント
+        prefectures (list): 都県名（WeatherProcessor.VALID_PREFECTURES）
+        date_from (date): 取得開始日
+        date_to (date): 取得終了日（この日を含む）
+
+    Returns:
+        DataFrame: prefecture列＋気象特徴量（datetimeインデックス）
+    """
+    from src.prediction.feature_frame import build_datetime_index
+    from src.utils.bq_reader import read_query_dataframe
+
+    labels = {weather_label(prefecture): prefecture for prefecture in prefectures}
+    label_list = ', '.join(f"'{label}'" for label in labels)
+    query = f"""
+    SELECT
+        prefecture,
+        date,
+        hour,
+        temperature_2m,
+        relative_humidity_2m,
+        precipitation
+    FROM `energy-env.prod_energy_data.weather_data`
+    WHERE date BETWEEN '{date_from:%Y-%m-%d}' AND '{date_to:%Y-%m-%d}'
+        AND prefecture IN ({label_list})
+    """
+    weather = read_query_dataframe(client, query)
+    weather.index = build_datetime_index(weather['date'], pd.to_numeric(weather['hour']))
+    weather['prefecture'] = weather['prefecture'].map(labels)
+    return weather[['prefecture'] + PREFECTURE_WEATHER_FEATURES]
+
+
+def write_shared_arrays(directory, ml_features_train, future_features, weather, prefectures, features):
+    """
+    学習データ・都県別気象データをメモリマップファイルに書き出し
+
+    Args:
+        directory (Path): 出力ディレクトリ
+        ml_features_train (DataFrame): 学習データ（datetimeインデックス）
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        weather (DataFrame): load_prefecture_weather() の戻り値
+        prefectures (list): 都県名（weather配列の先頭次元の順）
+        features (list): 特徴量名リスト
+
+    Returns:
+        dict: 都県ごとの気象データ充足率 {prefecture: {'train': 学習期間, 'forecast': 予測期間}}
+    """
+    from numpy.lib.format import open_memmap
+
+    n_train = len(ml_features_train)
+    timeline = ml_features_train.index.append(future_features.index)
+
+    train_features = open_memmap(directory / 'train_features.npy', mode='w+', dtype=np.float32,
+                                 shape=(n_train, len(features)))
+    train_features[:] = ml_features_train[features].to_numpy(dtype=np.float32, na_value=np.nan)
+    train_features.flush()
+
+    train_target = open_memmap(directory / 'train_target.npy', mode='w+', dtype=np.float32, shape=(n_train,))
+    train_target[:] = ml_features_train['actual_power'].to_numpy(dtype=np.float32, na_value=np.nan)
+    train_target.flush()
+
+    train_times = open_memmap(directory / 'train_times.npy', mode='w+', dtype='datetime64[ns]', shape=(n_train,))
+    train_times[:] = ml_features_train.index.to_numpy(dtype='datetime64[ns]')
+    train_times.flush()
+
+    # 都県 × 時刻（学習期間＋予測期間）× 気象特徴量
+    weather_array = open_memmap(directory / 'weather.npy', mode='w+', dtype=np.float32,
+                                shape=(len(prefectures), len(timeline), len(PREFECTURE_WEATHER_FEATURES)))
+    coverage = {}
+    for k, prefecture in enumerate(prefectures):
+        values = weather[weather['prefecture'] == prefecture][PREFECTURE_WEATHER_FEATURES]
+        values = values[~values.index.duplicated(keep='last')].reindex(timeline)
+        weather_array[k] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        available = values['temperature_2m'].notna()
+        coverage[prefecture] = {
+            'train': float(available.iloc[:n_train].mean()),
+            'forecast': float(available.iloc[n_train:].mean()),
+        }
+    weather_array.flush()
+
+    return coverage
+
+
+def forecast_prefecture(task):
+    """
+    1都県分の学習・検証・段階的予測（ワーカープロセス）
+
+    Args:
+        task (dict): {'index', 'prefecture', 'shared_dir', 'context', 'options'}
+            context: {'features', 'start_date', 'days', 'future_features', 'ml_features_tail',
+                      'business_days_train', 'business_days_future'}
+            options: {'xgb_params', 'n_jobs', 'holdout_days'}
+
+    Returns:
+        dict: {'prefecture', 'holdout_mape', 'predictions', 'seconds'}
+    """
+    import xgboost as xgb
+    from src.prediction.iterative_inference import predict_batched
+
+    started = time.perf_counter()
+    shared_dir = Path(task['shared_dir'])
+    context = task['context']
+    options = task['options']
+    features = context['features']
+    weather_columns = [features.index(feature) for feature in PREFECTURE_WEATHER_FEATURES]
+
+    train_features = np.load(shared_dir / 'train_features.npy', mmap_mode='r')
+    train_target = np.load(shared_dir / 'train_target.npy', mmap_mode='r')
+    weather = np.load(shared_dir / 'weather.npy', mmap_mode='r')[task['index']]
+    n_train = len(train_features)
+
+    # 気象特徴量のみ都県の値に差し替え（XGBoostに渡す行列はワーカー内で1回だけ作成）
+    X = np.array(train_features)
+    X[:, weather_columns] = weather[:n_train]
+    y = np.asarray(train_target)
+
+    holdout_mape = None
+    if options['holdout_days'] > 0:
+        train_times = np.load(shared_dir / 'train_times.npy', mmap_mode='r')
+        holdout_start = np.datetime64(context['start_date'] - pd.Timedelta(days=options['holdout_days']))
+        holdout = np.asarray(train_times >= holdout_start)
+        model = xgb.XGBRegressor(**options['xgb_params'], n_jobs=options['n_jobs'])
+        model.fit(X[~holdout], y[~holdout])
+        predicted = model.get_booster().inplace_predict(X[holdout])
+        actual = y[holdout]
+        valid = np.isfinite(actual) & (actual != 0)
+        holdout_mape = float(np.mean(np.abs(predicted[valid] - actual[valid]) / actual[valid]) * 100)
+
+    model = xgb.XGBRegressor(**options['xgb_params'], n_jobs=options['n_jobs'])
+    model.fit(X, y)
+
+    future_features = context['future_features'].copy()
+    future_features[PREFECTURE_WEATHER_FEATURES] = weather[n_train:]
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictions = predict_batched(
+            model, context['start_date'], context['days'], future_features, context['ml_features_tail'],
+            context['business_days_train'], context['business_days_future'], features
+        )
+
+    return {
+        'prefecture': task['prefecture'],
+        'holdout_mape': holdout_mape,
+        'predictions': np.fromiter(predictions.values(), dtype=np.float64),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def blend_weights(holdout_mape, method='inverse_mape'):
+    """
+    検証MAPEからブレンドの重みを計算
+
+    Args:
+        holdout_mape (dict): {prefecture: MAPE（Noneは検証なし）}
+        method (str): BLEND_METHODSのいずれか
+
+    Returns:
+        dict: {prefecture: 重み（合計1）}
+    """
+    if method not in BLEND_METHODS:
+        raise ValueError(f"ブレンド方式は {BLEND_METHODS} のいずれかを指定してください: {method}")
+
+    prefectures = list(holdout_mape)
+    if method == 'mean' or any(mape is None for mape in holdout_mape.values()):
+        return {prefecture: 1 / len(prefectures) for prefecture in prefectures}
+    if method == 'best':
+        best = min(prefectures, key=holdout_mape.get)
+        return {prefecture: float(prefecture == best) for prefecture in prefectures}
+
+    inverse = np.array([1 / max(holdout_mape[prefecture], 1e-6) for prefecture in prefectures])
+    return dict(zip(prefectures, inverse / inverse.sum()))
+
+
+def run_prefecture_forecast(run_date=None, horizon_days=14, prefectures=None, workers=None, client=None,
+                            blend='inverse_mape', holdout_days=HOLDOUT_DAYS, min_coverage=0.9, output_path=None):
+    """
+    都県別気象フィードのモデルを並列に学習・予測し、比較・ブレンド結果を保存
+
+    Args:
+        run_date (date | str): 予測実行日（Noneの場合は今日）
+        horizon_days (int): 予測日数
+        prefectures (list): 都県名（Noneの場合はWeatherProcessor.VALID_PREFECTURES）
+        workers (int): 並列プロセス数（Noneの場合はmin(都県数, CPUコア数)）
+        client: BigQueryクライアント（Noneの場合は新規作成）
+        blend (str): ブレンド方式（BLEND_METHODS）
+        holdout_days (int): 検証期間の日数（0の場合は検証せず単純平均）
+        min_coverage (float): 学習期間・予測期間の気象データ充足率の下限（どちらかが未満の都県は除外）
+        output_path (str): 出力先（Noneの場合はdata/prefecture_forecast配下）
+
+    Returns:
+        tuple: (予測結果DataFrame, 比較結果DataFrame, 出力パス)
+    """
+    from src.prediction.iterative_inference import FEATURES, LAG_FEATURES
+    from src.prediction.lag_resolver import BUSINESS_DAY_LOOKBACK
+    from src.prediction.prediction_iterative_with_export import (
+        load_forecast_inputs, load_xgb_params, prepare_business_days
+    )
+
+    if blend not in BLEND_METHODS:
+        raise ValueError(f"ブレンド方式は {BLEND_METHODS} のいずれかを指定してください: {blend}")
+    if run_date is None:
+        run_date = datetime.now().date()
+    elif isinstance(run_date, str):
+        run_date = datetime.strptime(run_date, '%Y-%m-%d').date()
+    if prefectures is None:
+        from src.data_processing.weather_processor import WeatherProcessor
+        prefectures = list(WeatherProcessor.VALID_PREFECTURES)
+    if client is None:
+        from google.cloud import bigquery
+        client = bigquery.Client(project='energy-env')
+
+    started = time.perf_counter()
+    ml_features_train, calendar_data, future_features, _ = load_forecast_inputs(client, run_date, horizon_days)
+    weather = load_prefecture_weather(
+        client, prefectures, ml_features_train.index.min().date(), run_date + timedelta(days=horizon_days - 1)
+    )
+    business_days_train, business_days_future = prepare_business_days(ml_features_train, calendar_data, run_date)
+    xgb_params, xgb_params_source = load_xgb_params()
+    load_seconds = time.perf_counter() - started
+
+    start_date = pd.Timestamp(run_date)
+    tail_start = start_date - pd.Timedelta(days=BUSINESS_DAY_LOOKBACK)
+    context = {
+        'features': FEATURES,
+        'start_date': start_date,
+        'days': horizon_days,
+        'future_features': future_features[[feature for feature in FEATURES if feature not in LAG_FEATURES]],
+        'ml_features_tail': ml_features_train[ml_features_train.index >= tail_start][['actual_power']],
+        'business_days_train': business_days_train,
+        'business_days_future': business_days_future,
+    }
+
+    energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+    cache_dir = Path(energy_env_path) / 'data' / 'cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shared_dir = Path(tempfile.mkdtemp(prefix='prefecture_features_', dir=cache_dir))
+    try:
+        coverage = write_shared_arrays(shared_dir, ml_features_train, future_features, weather, prefectures, FEATURES)
+        skipped = []
+        for prefecture in prefectures:
+            for period, label in (('train', '学習期間'), ('forecast', '予測期間')):
+                if coverage[prefecture][period] < min_coverage:
+                    print(f"警告: {prefecture} は{label}の気象データ充足率が "
+                          f"{coverage[prefecture][period]:.0%} のため除外します")
+                    skipped.append(prefecture)
+                    break
+        targets = [(k, prefecture) for k, prefecture in enumerate(prefectures) if prefecture not in skipped]
+        if not targets:
+            raise ValueError("学習期間・予測期間の気象データが揃っている都県がありません")
+
+        # ワーカー数×XGBoostスレッド数がコア数を超えないようにする
+        workers = workers or min(len(targets), os.cpu_count() or 1)
+        options = {
+            'xgb_params': xgb_params,
+            'n_jobs': max(1, (os.cpu_count() or 1) // workers),
+            'holdout_days': holdout_days,
+        }
+        tasks = [
+            {'index': k, 'prefecture': prefecture, 'shared_dir': str(shared_dir), 'context': context, 'options': options}
+            for k, prefecture in targets
+        ]
+
+        print(f"都県別予測開始: {len(tasks)}都県, 並列数: {workers}, XGBoostパラメータ: {xgb_params_source}")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(forecast_prefecture, tasks))
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    holdout_mape = {result['prefecture']: result['holdout_mape'] for result in results}
+    weights = blend_weights(holdout_mape, blend)
+
+    forecast = pd.DataFrame(
+        {result['prefecture']: result['predictions'] for result in results},
+        index=pd.date_range(start_date, periods=horizon_days * 24, freq='h', name='target_datetime')
+    )
+    forecast['blended'] = sum(forecast[prefecture] * weight for prefecture, weight in weights.items())
+    forecast = forecast.round(2).reset_index()
+
+    comparison = pd.DataFrame({
+        'prefecture': [result['prefecture'] for result in results],
+        'train_coverage': [coverage[result['prefecture']]['train'] for result in results],
+        'forecast_coverage': [coverage[result['prefecture']]['forecast'] for result in results],
+        'holdout_mape': [result['holdout_mape'] for result in results],
+        'weight': [weights[result['prefecture']] for result in results],
+        'seconds': [result['seconds'] for result in results],
+    }).sort_values('holdout_mape', na_position='last')
+
+    if output_path is None:
+        output_dir = Path(energy_env_path) / 'data' / 'prefecture_forecast'
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"prefecture_forecast_{run_date:%Y%m%d}.parquet"
+    forecast.to_parquet(output_path, index=False)
+
+    duration = time.perf_counter() - started
+    print("=" * 60)
+    print(f"{'都県':<12} {'充足率(学習)':>12} {'充足率(予測)':>12} {'検証MAPE':>10} {'重み':>8} {'処理時間':>10}")
+    for row in comparison.itertuples():
+        mape = f"{row.holdout_mape:9.2f}%" if row.holdout_mape is not None and not pd.isna(row.holdout_mape) else f"{'-':>10}"
+        print(f"{row.prefecture:<12} {row.train_coverage:>12.0%} {row.forecast_coverage:>12.0%} {mape} "
+              f"{row.weight:>8.3f} {row.seconds:>9.1f}秒")
+    print(f"ブレンド方式: {blend}")
+    print(f"保存ファイル: {output_path}")
+    print(f"処理時間: {duration:.1f}秒（データ読み込み {load_seconds:.1f}秒）")
+    print("=" * 60)
+
+    return forecast, comparison, output_path
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='都県別気象フィードによる並列予測（比較・ブレンド）')
+    parser.add_argument('--run-date', type=str, help='予測実行日 (YYYY-MM-DD形式・デフォルト: 今日)')
+    parser.add_argument('--horizon-days', type=int, default=14, help='予測日数 (デフォルト: 14)')
+    parser.add_argument('--prefectures', nargs='+', help='対象都県 (デフォルト: WeatherProcessor.VALID_PREFECTURES)')
+    parser.add_argument('--workers', type=int, help='並列プロセス数 (デフォルト: min(都県数, CPUコア数))')
+    parser.add_argument('--blend', choices=BLEND_METHODS, default='inverse_mape',
+                        help='ブレンド方式 (デフォルト: inverse_mape)')
+    parser.add_argument('--holdout-days', type=int, default=HOLDOUT_DAYS,
+                        help=f'検証期間の日数・0で検証なし (デフォルト: {HOLDOUT_DAYS})')
+    parser.add_argument('--output', type=str, help='出力先Parquetファイル')
+    args = parser.parse_args()
+
+    try:
+        run_prefecture_forecast(
+            run_date=args.run_date,
+            horizon_days=args.horizon_days,
+            prefectures=args.prefectures,
+            workers=args.workers,
+            blend=args.blend,
+            holdout_days=args.holdout_days,
+            output_path=args.output,
+        )
+    except ValueError as e:
+        print(f"都県別予測エラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+ml_features学習データのローカルParquetキャッシュ
+
+予測のたびにml_featuresテーブル全期間を読み直す代わりに、
+学習データを月単位のParquetファイルとしてローカルに保持し、差分のみBigQueryから取得する。
+
+差分取得の範囲:
+    ウォーターマーク（キャッシュ済みの最終日）の7日前 ～ 学習データ最終日
+    ※ MLFeaturesUpdaterは毎日「過去7日分を削除→再投入」するため、
+      ウォーターマーク以降の新規日に加えて直近7日分も書き換わっている可能性がある
+
+保存先:
+    {ENERGY_ENV_PATH}/data/cache/ml_features/{YYYYMM}.parquet  # 月単位パーティション
+    {ENERGY_ENV_PATH}/data/cache/ml_features/manifest.json     # ウォーターマーク・件数
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.bq_reader import read_job_dataframe
+
+# MLFeaturesUpdaterが毎日再投入する日数
+REWRITTEN_TAIL_DAYS = 7
+
+# 学習データとして取得するカラム
+ML_FEATURES_COLUMNS = [
+    'date',
+    'hour',
+    'actual_power',
+    'supply_capacity',
+    'temperature_2m',
+    'relative_humidity_2m',
+    'precipitation',
+    'weather_code',
+    'day_of_week',
+    'is_weekend',
+    'is_holiday',
+    'month',
+    'hour_sin',
+    'hour_cos',
+    'lag_1_day',
+    'lag_7_day',
+    'lag_1_business_day',
+]
+
+
+def fetch_ml_features(client, date_to, date_from=None):
+    """
+    ml_featuresテーブルから学習データを取得
+
+    Args:
+        client: BigQueryクライアント
+        date_to (date): 取得終了日（この日を含む）
+        date_from (date): 取得開始日（この日を含む・Noneの場合は全期間）
+
+    Returns:
+        tuple: (DataFrame, 処理バイト数)
+    """
+    where = f"date <= '{date_to:%Y-%m-%d}'"
+    if date_from is not None:
+        where += f" AND date >= '{date_from:%Y-%m-%d}'"
+
+    columns = ',\n        '.join(ML_FEATURES_COLUMNS)
+    query = f"""
+    SELECT
+        {columns}
+    FROM `energy-env.prod_energy_data.ml_features`
+    WHERE {where}
+    ORDER BY date, hour
+    """
+    job = client.query(query)
+    df = read_job_dataframe(job)
+    return df, job.total_bytes_processed
+
+
+class TrainingDataCache:
+    """ml_features学習データキャッシュクラス"""
+
+    def __init__(self, cache_dir=None):
+        """
+        初期化
+
+        Args:
+            cache_dir (str): キャッシュディレクトリ
+                           Noneの場合は環境変数ENERGY_ENV_PATHから取得
+        """
+        if cache_dir is None:
+            energy_env_path = os.getenv('ENERGY_ENV_PATH', '.')
+            cache_dir = Path(energy_env_path) / 'data' / 'cache' / 'ml_features'
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.cache_dir / 'manifest.json'
+
+    def _read_manifest(self):
+        """マニフェスト読み込み（存在しない・破損時はNone）"""
+        if not self.manifest_path.exists():
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest['watermark'] = datetime.strptime(manifest['watermark'], '%Y-%m-%d').date()
+            return manifest
+        except Exception as e:
+            print(f"学習データキャッシュのマニフェスト読み込み失敗（全件再取得します）: {e}")
+            return None
+
+    def _write_manifest(self, watermark, row_count):
+        """マニフェスト書き込み（パーティション書き込み完了後に呼ぶ）"""
+        manifest = {
+            'watermark': watermark.strftime('%Y-%m-%d'),
+            'row_count': row_count,
+            'updated_at': datetime.now().isoformat(),
+        }
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def partition_paths(self):
+        """月単位パーティションファイル一覧（古い順）"""
+        return sorted(self.cache_dir.glob('[0-9]' * 6 + '.parquet'))
+
+    def _read_partitions(self, months=None):
+        """パーティションを読み込んで結合（monthsがNoneなら全件）"""
+        paths = [p for p in self.partition_paths() if months is None or p.stem in months]
+        if not paths:
+            return pd.DataFrame(columns=ML_FEATURES_COLUMNS)
+        return pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+
+    def iter_batches(self, until_date=None, columns=None, batch_rows=8192):
+        """
+        パーティションを行グループ単位で読み、batch_rows行程度ずつDataFrameを返す（全期間を結合しない）
+
+        Args:
+            until_date (date): 学習データ最終日（この日を含む・Noneの場合は全件）
+            columns (list): 読み込むカラム（Noneの場合は全カラム）
+            batch_rows (int): 1バッチの目安行数（行グループ単位で区切るため前後する）
+
+        Yields:
+            DataFrame: date列を含むバッチ（古い順）
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        if columns is not None and 'date' not in columns:
+            columns = ['date', *columns]
+
+        buffer, buffered = [], 0
+        for path in self.partition_paths():
+            parquet_file = pq.ParquetFile(path)
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i, columns=columns)
+                if until_date is not None:
+                    table = table.filter(pc.less_equal(table['date'], pa.scalar(until_date, pa.date32())))
+                if table.num_rows == 0:
+                    continue
+                buffer.append(table)
+                buffered += table.num_rows
+                if buffered >= batch_rows:
+                    yield pa.concat_tables(buffer).to_pandas()
+                    buffer, buffered = [], 0
+        if buffer:
+            yield pa.concat_tables(buffer).to_pandas()
+
+    def _write_partitions(self, df, months):
+        """指定月のパーティションを書き換え（一時ファイル経由で置換）"""
+        month_keys = pd.to_datetime(df['date']).dt.strftime('%Y%m')
+        for month in months:
+            part = df[month_keys == month]
+            path = self.cache_dir / f"{month}.parquet"
+            if part.empty:
+                path.unlink(missing_ok=True)
+                continue
+            tmp_path = path.with_suffix('.parquet.tmp')
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _normalize(df):
+        """カラム順・型を揃える（date列はdate型）"""
+        df = df[ML_FEATURES_COLUMNS].copy()
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        return df
+
+    def load(self, client, until_date, force_refresh=False):
+        """
+        学習データ（until_dateまで）を取得し、キャッシュを差分更新
+
+        Args:
+            client: BigQueryクライアント
+            until_date (date): 学習データ最終日（この日を含む）
+            force_refresh (bool): Trueの場合はキャッシュを破棄して全件再取得
+
+        Returns:
+            tuple: (学習データDataFrame, 取得統計dict)
+                取得統計: {'mode': 'FULL'|'INCREMENTAL'|'CACHED', 'fetched_rows', 'bytes_processed', 'watermark'}
+        """
+        manifest = None if force_refresh else self._read_manifest()
+        if manifest is not None and not self.partition_paths():
+            manifest = None
+
+        if manifest is None:
+            # 初回（またはキャッシュ破損）: 全期間取得
+            fetched, bytes_processed = fetch_ml_features(client, until_date)
+            fetched = self._normalize(fetched)
+            for path in self.partition_paths():
+                path.unlink()
+            months = set(pd.to_datetime(fetched['date']).dt.strftime('%Y%m'))
+            self._write_partitions(fetched, months)
+            merged = fetched
+            mode = 'FULL'
+        else:
+            # 差分取得: ウォーターマークを含む直近7日分（再投入される範囲）以降＋新規日
+            refetch_from = manifest['watermark'] - timedelta(days=REWRITTEN_TAIL_DAYS - 1)
+            if until_date < refetch_from:
+                # キャッシュ済み期間内の過去日（再投入対象外）はBigQueryを参照しない
+                merged = self._read_partitions()
+                fetched = merged.iloc[0:0]
+                bytes_processed = 0
+                mode = 'CACHED'
+            else:
+                fetched, bytes_processed = fetch_ml_features(client, until_date, refetch_from)
+                fetched = self._normalize(fetched)
+
+                # 差分取得範囲にかかる月だけ読み直して置き換える
+                affected_months = {
+                    d.strftime('%Y%m') for d in pd.date_range(refetch_from, max(until_date, manifest['watermark']), freq='D')
+                }
+                cached = self._read_partitions()
+                cached_dates = pd.to_datetime(cached['date'])
+                kept = cached[(cached_dates < pd.Timestamp(refetch_from)) | (cached_dates > pd.Timestamp(until_date))]
+                merged = pd.concat([kept, fetched], ignore_index=True)
+                self._write_partitions(merged, affected_months)
+                mode = 'INCREMENTAL'
+
+        merged = self._normalize(merged).sort_values(['date', 'hour']).reset_index(drop=True)
+        watermark = merged['date'].max() if not merged.empty else until_date
+        if mode != 'CACHED':
+            self._write_manifest(watermark, len(merged))
+
+        # until_dateより後のデータ（過去日指定での再実行時）は除外
+        train = merged[merged['date'] <= until_date].reset_index(drop=True)
+
+        stats = {
+            'mode': mode,
+            'fetched_rows': len(fetched),
+            'bytes_processed': bytes_processed,
+            'watermark': str(watermark),
+        }
+        return train, stats
@@ -0,0 +1,323 @@
+"""
+XGBoostモデルの学習エンジン
+
+学習方式（training_engine）:
+    sklearn: XGBRegressor.fit()（従来方式・固定本数）
+    hist   : xgb.train()＋QuantileDMatrix（tree_method='hist'）
+             直近train_window_days日の学習データのうち、末尾valid_days日を検証用に分けて
+             early stoppingで木の本数を決め、検証期間を除いて学習したモデルをそのまま使う
+             （refit=Trueの場合はその本数で検証期間を含めて再学習する・学習時間は約2倍）
+
+             学習時間が学習データの年数に比例して伸びないよう、学習に使う期間（train_window_days）と
+             木の本数の上限（max_boost_rounds・デフォルトはXGBoostパラメータのn_estimators）で上限を設ける。
+    out_of_core: 学習データキャッシュ（月単位Parquet）をバッチ単位でDataIterに流してQuantileDMatrix
+             （matrix='external'ではExtMemQuantileDMatrix）を作り、固定本数で学習する（src.prediction.out_of_core）。
+             学習データのDataFrameからXGBoost用の行列を作らない。キャッシュの行数が学習データと一致しない場合は
+             エラーにする（学習データキャッシュを使わない実行では使えない）。
+
+histエンジンはフェーズごと（行列作成・ブースティング・評価・再学習）の処理時間を返し、
+呼び出し側（train_or_load_model）がログに記録する。
+学習結果はどちらもXGBRegressorとして返すため、予測・モデルキャッシュ側の処理は共通。
+
+差分学習（warm start）:
+    前日のモデル（モデルキャッシュ内の、より前の学習データで学習した最新モデル）を起点に、
+    直近window_days日（ml_featuresが再書き込みされる範囲）で木をrounds本だけ追加学習する（xgb_model=による継続）。
+    追加学習も全期間学習と同じ学習エンジン（sklearn: XGBRegressor.fit / hist: xgb.train＋QuantileDMatrix）で行う。
+    次の場合は全期間で学習し直す（plan_warm_start）:
+        - 起点となる前回モデルがない
+        - 前回の全期間学習からfull_retrain_days日以上経過した（木の本数が増え続けないよう定期的にリセット）
+        - 前回モデルの新着期間（前回の学習データ以降）でのMAPEがdrift_mape[%]を超えた
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+TRAINING_ENGINES = ('sklearn', 'hist', 'out_of_core')
+
+# histエンジンの設定
+# （nthread=NoneはCPUコア数・max_boost_rounds=NoneはXGBoostパラメータのn_estimators・train_window_days=Noneは全期間）
+HIST_ENGINE_DEFAULTS = {
+    'max_bin': 256,
+    'nthread': None,
+    'train_window_days': 730,
+    'valid_days': 28,
+    'early_stopping_rounds': 50,
+    'max_boost_rounds': None,
+    'refit': False,
+}
+
+# out_of_coreエンジンの設定（nthread=NoneはCPUコア数・matrixはout_of_core.OUT_OF_CORE_MATRICES）
+OUT_OF_CORE_ENGINE_DEFAULTS = {
+    'max_bin': 256,
+    'nthread': None,
+    'matrix': 'quantile',
+    'batch_rows': 8192,
+}
+
+
+# 差分学習（warm start）の設定
+WARM_START_DEFAULTS = {
+    'window_days': 7,
+    'rounds': 20,
+    'full_retrain_days': 7,
+    'drift_mape': 5.0,
+}
+
+
+def load_engine_config(engine='sklearn', **overrides):
+    """
+    学習エンジン設定を作成
+
+    Args:
+        engine (str): TRAINING_ENGINESのいずれか
+        **overrides: HIST_ENGINE_DEFAULTS / OUT_OF_CORE_ENGINE_DEFAULTSの上書き（値がNoneの項目は無視）
+
+    Returns:
+        dict: {'engine', 'nthread', ...}（sklearnは'engine'と'nthread'のみ）
+    """
+    if engine not in TRAINING_ENGINES:
+        raise ValueError(f"学習エンジンは {TRAINING_ENGINES} のいずれかを指定してください: {engine}")
+
+    defaults = OUT_OF_CORE_ENGINE_DEFAULTS if engine == 'out_of_core' else HIST_ENGINE_DEFAULTS
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    unknown = set(overrides) - set(defaults)
+    if unknown:
+        raise ValueError(f"不明な学習エンジン設定です: {sorted(unknown)}")
+
+    if engine == 'sklearn':
+        return {'engine': engine, 'nthread': overrides.get('nthread')}
+    return {'engine': engine, **defaults, **overrides}
+
+
+def train_model(X_train, y_train, xgb_params, engine_config=None):
+    """
+    学習エンジン設定に従ってモデルを学習
+
+    Args:
+        X_train (DataFrame): 学習用特徴量（datetimeインデックス）
+        y_train (Series): 学習用目的変数
+        xgb_params (dict): XGBRegressorパラメータ
+        engine_config (dict): load_engine_config() の戻り値（Noneの場合はsklearn）
+
+    Returns:
+        tuple: (XGBRegressor, 学習統計dict {'engine', 'timings', 'boost_rounds', ...})
+    """
+    import xgboost as xgb
+
+    engine_config = engine_config or load_engine_config()
+
+    if engine_config['engine'] == 'sklearn':
+        started = time.perf_counter()
+        model = xgb.XGBRegressor(**xgb_params, n_jobs=engine_config.get('nthread'))
+        model.fit(X_train, y_train)
+        return model, {
+            'engine': 'sklearn',
+            'timings': {'fit': round(time.perf_counter() - started, 3)},
+            'boost_rounds': xgb_params.get('n_estimators'),
+        }
+
+    if engine_config['engine'] == 'out_of_core':
+        return _train_out_of_core(X_train, y_train, xgb_params, engine_config)
+    return _train_hist(X_train, y_train, xgb_params, engine_config)
+
+
+def _train_out_of_core(X_train, y_train, xgb_params, config):
+    """out_of_coreエンジン（学習データキャッシュをストリーミング・X_trainは行数の照合のみに使う）"""
+    from src.prediction.out_of_core import train_out_of_core
+
+    model, stats = train_out_of_core(
+        xgb_params, features=list(X_train.columns), until_date=X_train.index.max().date(),
+        matrix=config['matrix'], batch_rows=config['batch_rows'], max_bin=config['max_bin'], nthread=config['nthread']
+    )
+    # モデルキャッシュの指紋（X_train）と実際に学習したデータ（キャッシュ）が同じであることを確認
+    expected_rows = int(y_train.notna().sum())
+    if stats['rows'] != expected_rows:
+        raise ValueError(f"学習データキャッシュの行数が学習データと一致しません: {stats['rows']:,} != {expected_rows:,}"
+                         f"（out_of_coreエンジンは学習データキャッシュを使う実行でのみ使えます）")
+    return model, {'engine': 'out_of_core', **stats}
+
+
+def _train_hist(X_train, y_train, xgb_params, config):
+    """histエンジン（QuantileDMatrix＋直近期間でのearly stopping）"""
+    import xgboost as xgb
+    from src.prediction.tuning import MAX_BOOST_ROUNDS, to_booster_params
+
+    nthread = config['nthread'] or os.cpu_count() or 1
+    max_boost_rounds = config['max_boost_rounds'] or xgb_params.get('n_estimators') or MAX_BOOST_ROUNDS
+    booster_params = {**to_booster_params(xgb_params, nthread), 'max_bin': config['max_bin']}
+    timings = {}
+
+    # 目的変数が欠損の行は学習に使えない
+    labeled = y_train.notna().to_numpy()
+    if config['train_window_days']:
+        # 直近train_window_days日のみ（学習データが増えても学習時間を一定に保つ）
+        window_start = X_train.index.max().normalize() - pd.Timedelta(days=config['train_window_days'] - 1)
+        labeled = labeled & (X_train.index >= window_start)
+    X_train, y_train = X_train[labeled], y_train[labeled]
+
+    # 直近valid_days日を検証期間に分ける
+    valid_start = X_train.index.max().normalize() - pd.Timedelta(days=config['valid_days'] - 1)
+    is_valid = (X_train.index >= valid_start)
+
+    started = time.perf_counter()
+    dtrain = xgb.QuantileDMatrix(X_train[~is_valid], y_train[~is_valid],
+                                 max_bin=config['max_bin'], nthread=nthread)
+    dvalid = xgb.QuantileDMatrix(X_train[is_valid], y_train[is_valid], ref=dtrain, nthread=nthread)
+    timings['matrix'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    booster = xgb.train(
+        booster_params, dtrain,
+        num_boost_round=max_boost_rounds,
+        evals=[(dvalid, 'valid')],
+        early_stopping_rounds=config['early_stopping_rounds'],
+        verbose_eval=False,
+    )
+    boost_rounds = booster.best_iteration + 1
+    timings['boost'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    y_valid = y_train[is_valid].to_numpy()
+    predicted = booster.predict(dvalid, iteration_range=(0, boost_rounds))
+    nonzero = y_valid != 0
+    valid_mape = float(np.mean(np.abs(predicted[nonzero] - y_valid[nonzero]) / y_valid[nonzero]) * 100)
+    timings['evaluate'] = time.perf_counter() - started
+
+    if config['refit']:
+        # early stoppingで決まった本数で全期間（検証期間を含む）を再学習
+        started = time.perf_counter()
+        dfull = xgb.QuantileDMatrix(X_train, y_train, max_bin=config['max_bin'], nthread=nthread)
+        booster = xgb.train(booster_params, dfull, num_boost_round=boost_rounds)
+        timings['refit'] = time.perf_counter() - started
+    else:
+        # 予測（inplace_predict）が最良イテレーション以降の木を使わないよう切り詰める
+        booster = booster[:boost_rounds]
+
+    # 予測・モデルキャッシュ側と同じくXGBRegressorとして扱う
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+
+    return model, {
+        'engine': 'hist',
+        'timings': {phase: round(seconds, 3) for phase, seconds in timings.items()},
+        'boost_rounds': boost_rounds,
+        'valid_mape': round(valid_mape, 3),
+        'train_rows': int((~is_valid).sum()),
+        'valid_rows': int(is_valid.sum()),
+        'nthread': nthread,
+    }
+
+
+def load_warm_start_config(**overrides):
+    """
+    差分学習設定を作成
+
+    Args:
+        **overrides: WARM_START_DEFAULTSの上書き（値がNoneの項目は無視）
+
+    Returns:
+        dict: 差分学習設定
+    """
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    unknown = set(overrides) - set(WARM_START_DEFAULTS)
+    if unknown:
+        raise ValueError(f"不明な差分学習設定です: {sorted(unknown)}")
+    return {**WARM_START_DEFAULTS, **overrides}
+
+
+def _mape(model, X, y):
+    """MAPE[%]（実績値0の行は除く）"""
+    y = y.to_numpy(dtype=np.float64)
+    nonzero = y != 0
+    if not nonzero.any():
+        return None
+    predicted = model.predict(X[nonzero])
+    return float(np.mean(np.abs(predicted - y[nonzero]) / y[nonzero]) * 100)
+
+
+def plan_warm_start(previous_model, previous_fingerprint, X_train, y_train, config):
+    """
+    前回モデルから差分学習するか、全期間で学習し直すかを判定
+
+    Args:
+        previous_model (XGBRegressor | None): 前回モデル（ModelCache.load_previous()）
+        previous_fingerprint (dict | None): 前回モデルの指紋（'lineage'を含む場合あり）
+        X_train (DataFrame): 今回の学習用特徴量（datetimeインデックス）
+        y_train (Series): 今回の学習用目的変数
+        config (dict): load_warm_start_config() の戻り値
+
+    Returns:
+        dict: {'mode': 'warm_start' | 'full', 'reason', 'days_since_full', 'drift_mape', 'new_rows', 'timings'}
+    """
+    plan = {'mode': 'full', 'days_since_full': None, 'drift_mape': None, 'new_rows': 0, 'timings': {}}
+    if previous_model is None:
+        return {**plan, 'reason': '前回モデルなし'}
+
+    # 全期間学習の時点（差分学習済みモデルは系譜から引き継ぐ）
+    lineage = previous_fingerprint.get('lineage') or {}
+    full_max_datetime = pd.Timestamp(lineage.get('full_max_datetime', previous_fingerprint['max_datetime']))
+    days_since_full = (X_train.index.max() - full_max_datetime) / pd.Timedelta(days=1)
+    plan['days_since_full'] = round(days_since_full, 2)
+    if days_since_full >= config['full_retrain_days']:
+        return {**plan, 'reason': f"前回の全期間学習から{days_since_full:.0f}日経過"}
+
+    # 前回モデルの新着期間（前回の学習データ以降・実績値あり）での誤差
+    started = time.perf_counter()
+    is_new = (X_train.index > pd.Timestamp(previous_fingerprint['max_datetime'])) & y_train.notna().to_numpy()
+    plan['new_rows'] = int(is_new.sum())
+    if plan['new_rows']:
+        drift_mape = _mape(previous_model, X_train[is_new], y_train[is_new])
+        plan['drift_mape'] = round(drift_mape, 3) if drift_mape is not None else None
+    plan['timings']['check'] = round(time.perf_counter() - started, 3)
+    if plan['drift_mape'] is not None and plan['drift_mape'] > config['drift_mape']:
+        return {**plan, 'reason': f"新着期間MAPEがしきい値{config['drift_mape']}%を超過"}
+
+    return {**plan, 'mode': 'warm_start', 'reason': '差分学習'}
+
+
+def warm_start_model(previous_model, X_train, y_train, xgb_params, config, engine_config=None):
+    """
+    前回モデルを起点に、直近window_days日で木をrounds本追加学習
+
+    Args:
+        previous_model (XGBRegressor): 起点のモデル
+        X_train (DataFrame): 今回の学習用特徴量（datetimeインデックス・全期間）
+        y_train (Series): 今回の学習用目的変数
+        xgb_params (dict): XGBRegressorパラメータ（n_estimatorsはroundsで置き換え）
+        config (dict): load_warm_start_config() の戻り値
+        engine_config (dict): load_engine_config() の戻り値（Noneの場合はsklearn）
+
+    Returns:
+        tuple: (XGBRegressor, 学習統計dict {'engine', 'training_engine', 'timings', 'boost_rounds', 'window_rows'})
+    """
+    import xgboost as xgb
+
+    engine_config = engine_config or load_engine_config()
+    window_start = X_train.index.max().normalize() - pd.Timedelta(days=config['window_days'] - 1)
+    in_window = (X_train.index >= window_start) & y_train.notna().to_numpy()
+
+    started = time.perf_counter()
+    if engine_config['engine'] == 'sklearn':
+        model = xgb.XGBRegressor(**{**xgb_params, 'n_estimators': config['rounds']}, n_jobs=engine_config.get('nthread'))
+        model.fit(X_train[in_window], y_train[in_window], xgb_model=previous_model.get_booster())
+    else:
+        from src.prediction.tuning import to_booster_params
+
+        nthread = engine_config['nthread'] or os.cpu_count() or 1
+        booster_params = {**to_booster_params(xgb_params, nthread), 'max_bin': engine_config['max_bin']}
+        dwindow = xgb.QuantileDMatrix(X_train[in_window], y_train[in_window],
+                                      max_bin=engine_config['max_bin'], nthread=nthread)
+        booster = xgb.train(booster_params, dwindow, num_boost_round=config['rounds'],
+                            xgb_model=previous_model.get_booster())
+        model = xgb.XGBRegressor()
+        model.load_model(bytearray(booster.save_raw('ubj')))
+    return model, {
+        'engine': 'warm_start',
+        'training_engine': engine_config['engine'],
+        'timings': {'boost': round(time.perf_counter() - started, 3)},
+        'boost_rounds': model.get_booster().num_boosted_rounds(),
+        'window_rows': int(in_window.sum()),
+    }
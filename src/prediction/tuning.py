@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+XGBoostハイパーパラメータの時系列交差検証チューニング
+
+ml_featuresを時系列順に分割したrolling-origin（学習: 起点より前 / 検証: 起点から14日間）の
+複数foldで候補パラメータを評価し、検証MAPEが最小の設定をファイルに保存する。
+日次予測（prediction_iterative_with_export）は保存された設定を読み込んで学習する。
+
+高速化:
+    - foldごとの学習・検証データ（QuantileDMatrix）は最初に1回だけ作成し、全候補で使い回す
+    - 1候補の全foldをスレッドで並列学習（XGBoostの学習中はGILを解放する）
+    - 各foldはearly stoppingで木の本数を決定し、候補が一定数続けて改善しなければ探索を打ち切る
+
+評価について:
+    early stoppingは学習期間末尾のearly_stopping_days日間（内側の検証データ）で行い、
+    検証期間は評価にのみ使う（検証期間で木の本数を決めるとCV MAPEが楽観的になるため）。
+    検証期間のlag特徴量はml_featuresの実績値ベース（段階的予測の誤差蓄積は含まない）。
+    段階的予測での精度は src.prediction.backtest で確認する。
+
+実行方法:
+    python -m src.prediction.tuning
+    python -m src.prediction.tuning --until 2025-06-30 --folds 8 --max-trials 40 --workers 4
+
+出力:
+    {ENERGY_ENV_PATH}/data/tuning/xgb_params.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 探索範囲（XGBRegressorのパラメータ名）
+SEARCH_SPACE = {
+    'max_depth': [4, 6, 8, 10],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'min_child_weight': [1, 5, 10],
+    'subsample': [0.7, 0.85, 1.0],
+    'colsample_bytree': [0.7, 0.85, 1.0],
+}
+
+# XGBoostのデフォルト値（現在の設定で未指定のパラメータ）
+XGB_DEFAULTS = {
+    'min_child_weight': 1,
+    'subsample': 1.0,
+    'colsample_bytree': 1.0,
+}
+
+# early stoppingの木の本数上限・打ち切りラウンド数
+MAX_BOOST_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 50
+
+
+def build_folds(frame, features, n_folds=6, valid_days=14, step_days=28, train_window_days=None,
+                early_stopping_days=14):
+    """
+    rolling-origin foldの学習・early stopping用・検証データ（QuantileDMatrix）を作成
+
+    最新の起点から過去に向かってstep_days間隔でn_folds個の起点を取る。
+    起点より前のデータのうち末尾early_stopping_days日間をearly stopping用に分ける。
+
+    Args:
+        frame (DataFrame): ml_features（datetimeインデックス）
+        features (list): 特徴量名リスト
+        n_folds (int): fold数
+        valid_days (int): 検証期間（日）
+        step_days (int): 起点の間隔（日）
+        train_window_days (int): 学習データの日数上限（Noneの場合は起点より前の全期間）
+        early_stopping_days (int): early stopping用データの日数（学習データの末尾）
+
+    Returns:
+        list: [{'origin', 'dtrain', 'dstop', 'dvalid', 'y_valid', 'train_rows'}, ...]（古い順）
+    """
+    import xgboost as xgb
+
+    last_origin = frame.index.max().normalize() - pd.Timedelta(days=valid_days - 1)
+    folds = []
+    for k in range(n_folds):
+        origin = last_origin - pd.Timedelta(days=step_days * k)
+        train = frame[frame.index < origin]
+        if train_window_days:
+            train = train[train.index >= origin - pd.Timedelta(days=train_window_days)]
+        train = train.dropna(subset=['actual_power'])
+        stop_from = origin - pd.Timedelta(days=early_stopping_days)
+        stop = train[train.index >= stop_from]
+        train = train[train.index < stop_from]
+        valid = frame[(frame.index >= origin) & (frame.index < origin + pd.Timedelta(days=valid_days))]
+        valid = valid.dropna(subset=['actual_power'])
+        if train.empty or stop.empty or valid.empty:
+            break
+
+        dtrain = xgb.QuantileDMatrix(train[features], train['actual_power'])
+        dstop = xgb.QuantileDMatrix(stop[features], stop['actual_power'], ref=dtrain)
+        dvalid = xgb.QuantileDMatrix(valid[features], valid['actual_power'], ref=dtrain)
+        folds.append({
+            'origin': origin,
+            'dtrain': dtrain,
+            'dstop': dstop,
+            'dvalid': dvalid,
+            'y_valid': valid['actual_power'].to_numpy(),
+            'train_rows': len(train),
+        })
+
+    return folds[::-1]
+
+
+def to_booster_params(params, nthread):
+    """XGBRegressorのパラメータをxgb.train()用に変換"""
+    return {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        'eval_metric': 'mape',
+        'max_depth': params['max_depth'],
+        'eta': params['learning_rate'],
+        'min_child_weight': params.get('min_child_weight', 1),
+        'subsample': params.get('subsample', 1.0),
+        'colsample_bytree': params.get('colsample_bytree', 1.0),
+        'seed': params.get('random_state', 42),
+        'nthread': nthread,
+    }
+
+
+def evaluate_fold(fold, params, nthread):
+    """
+    1foldを学習・評価（early stoppingはdstop、MAPEはdvalidで計算）
+
+    Returns:
+        tuple: (検証MAPE[%], 最良の木の本数)
+    """
+    import xgboost as xgb
+
+    booster = xgb.train(
+        to_booster_params(params, nthread),
+        fold['dtrain'],
+        num_boost_round=MAX_BOOST_ROUNDS,
+        evals=[(fold['dstop'], 'stop')],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        verbose_eval=False,
+    )
+    best_rounds = booster.best_iteration + 1
+    predicted = booster.predict(fold['dvalid'], iteration_range=(0, best_rounds))
+    y_valid = fold['y_valid']
+    mape = float(np.mean(np.abs(predicted - y_valid) / y_valid) * 100)
+    return mape, best_rounds
+
+
+def sample_candidates(base_params, max_trials, seed=42):
+    """探索候補を生成（1件目は現在の設定・以降は探索範囲からランダム抽出・重複なし）"""
+    rng = random.Random(seed)
+    keys = list(SEARCH_SPACE)
+    candidates = [{k: base_params.get(k, XGB_DEFAULTS.get(k)) for k in keys}]
+    seen = {tuple(candidates[0][k] for k in keys)}
+
+    total = int(np.prod([len(v) for v in SEARCH_SPACE.values()]))
+    while len(candidates) < min(max_trials, total):
+        candidate = {k: rng.choice(SEARCH_SPACE[k]) for k in keys}
+        signature = tuple(candidate[k] for k in keys)
+        if signature not in seen:
+            seen.add(signature)
+            candidates.append(candidate)
+    return candidates
+
+
+def run_tuning(frame, n_folds=6, valid_days=14, step_days=28, train_window_days=None,
+               max_trials=30, patience=8, workers=None, output_path=None, early_stopping_days=14):
+    """
+    ハイパーパラメータ探索を実行し、最良の設定を保存
+
+    Args:
+        frame (DataFrame): ml_features（datetimeインデックス）
+        n_folds (int): fold数
+        valid_days (int): 検証期間（日）
+        step_days (int): foldの起点の間隔（日）
+        train_window_days (int): 学習データの日数上限
+        max_trials (int): 評価する候補数の上限
+        patience (int): 最良値が更新されない候補がこの数続いたら打ち切り
+        workers (int): foldの並列数（Noneの場合はfold数とCPUコア数の小さい方）
+        output_path (str): 出力ファイル（Noneの場合はget_tuned_params_path()）
+        early_stopping_days (int): early stopping用データの日数（各foldの学習データの末尾）
+
+    Returns:
+        dict: 保存した内容 {'params', 'cv_mape', 'baseline_cv_mape', ...}
+    """
+    from src.prediction.iterative_inference import FEATURES
+    from src.prediction.prediction_iterative_with_export import XGB_PARAMS, get_tuned_params_path
+
+    started = time.perf_counter()
+
+    folds = build_folds(frame, FEATURES, n_folds, valid_days, step_days, train_window_days, early_stopping_days)
+    if not folds:
+        raise ValueError("foldを作成できません（学習・検証データが不足しています）")
+    print(f"fold作成完了: {len(folds)}件 (起点: {folds[0]['origin'].date()} ～ {folds[-1]['origin'].date()}, "
+          f"{time.perf_counter() - started:.1f}秒)")
+
+    cpu_count = os.cpu_count() or 1
+    workers = workers or min(len(folds), cpu_count)
+    nthread = max(1, cpu_count // workers)
+
+    candidates = sample_candidates(XGB_PARAMS, max_trials)
+    trials = []
+    best = None
+    since_improved = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, params in enumerate(candidates, start=1):
+            scores = list(executor.map(lambda fold: evaluate_fold(fold, params, nthread), folds))
+            cv_mape = float(np.mean([mape for mape, _ in scores]))
+            n_estimators = int(np.mean([rounds for _, rounds in scores]))
+            trial = {'params': {**params, 'n_estimators': n_estimators}, 'cv_mape': cv_mape,
+                     'fold_mape': [round(mape, 4) for mape, _ in scores]}
+            trials.append(trial)
+
+            if best is None or cv_mape < best['cv_mape']:
+                best = trial
+                since_improved = 0
+                mark = ' *'
+            else:
+                since_improved += 1
+                mark = ''
+            print(f"  候補{i:3d}: CV MAPE {cv_mape:6.3f}% (木 {n_estimators:4d}本) {params}{mark}")
+
+            if since_improved >= patience:
+                print(f"{patience}候補続けて改善なし → 探索打ち切り")
+                break
+
+    result = {
+        'params': {**XGB_PARAMS, **best['params']},
+        'cv_mape': round(best['cv_mape'], 4),
+        'baseline_cv_mape': round(trials[0]['cv_mape'], 4),
+        'fold_origins': [str(fold['origin'].date()) for fold in folds],
+        'valid_days': valid_days,
+        'early_stopping_days': early_stopping_days,
+        'trials_evaluated': len(trials),
+        'training_max_datetime': str(frame.index.max()),
+        'tuned_at': datetime.now().isoformat(),
+    }
+
+    output_path = output_path or get_tuned_params_path()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print("=" * 60)
+    print(f"最良CV MAPE: {result['cv_mape']:.3f}% (現在の設定: {result['baseline_cv_mape']:.3f}%)")
+    print(f"最良パラメータ: {result['params']}")
+    print(f"保存先: {output_path}")
+    print(f"処理時間: {time.perf_counter() - started:.1f}秒 ({len(trials)}候補 × {len(folds)}fold)")
+    print("=" * 60)
+
+    return result
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='XGBoostハイパーパラメータの時系列交差検証チューニング')
+    parser.add_argument('--until', type=str, help='使用するデータの最終日 YYYY-MM-DD (デフォルト: 昨日)')
+    parser.add_argument('--folds', type=int, default=6, help='fold数 (デフォルト: 6)')
+    parser.add_argument('--valid-days', type=int, default=14, help='検証期間（日） (デフォルト: 14)')
+    parser.add_argument('--step-days', type=int, default=28, help='foldの起点の間隔（日） (デフォルト: 28)')
+    parser.add_argument('--train-window-days', type=int, help='学習データの日数上限 (デフォルト: 全期間)')
+    parser.add_argument('--early-stopping-days', type=int, default=14,
+                        help='early stopping用に学習データ末尾から分ける日数 (デフォルト: 14)')
+    parser.add_argument('--max-trials', type=int, default=30, help='評価する候補数の上限 (デフォルト: 30)')
+    parser.add_argument('--patience', type=int, default=8, help='改善なしで打ち切る候補数 (デフォルト: 8)')
+    parser.add_argument('--workers', type=int, help='foldの並列数 (デフォルト: fold数とCPUコア数の小さい方)')
+    parser.add_argument('--output', type=str, help='出力ファイル (デフォルト: data/tuning/xgb_params.json)')
+    args = parser.parse_args()
+
+    if args.until:
+        try:
+            until_date = datetime.strptime(args.until, '%Y-%m-%d').date()
+        except ValueError:
+            print("日付形式が正しくありません。YYYY-MM-DD形式で指定してください。")
+            sys.exit(1)
+    else:
+        until_date = datetime.now().date() - timedelta(days=1)
+
+    from google.cloud import bigquery
+    from src.prediction.feature_frame import to_feature_frame
+    from src.prediction.training_data_cache import TrainingDataCache
+
+    client = bigquery.Client(project='energy-env')
+    frame, _ = TrainingDataCache().load(client, until_date)
+    frame = to_feature_frame(frame)
+    print(f"ml_features取得完了: {len(frame):,}件 ({frame.index.min()} ～ {frame.index.max()})")
+
+    run_tuning(
+        frame,
+        n_folds=args.folds,
+        valid_days=args.valid_days,
+        step_days=args.step_days,
+        train_window_days=args.train_window_days,
+        early_stopping_days=args.early_stopping_days,
+        max_trials=args.max_trials,
+        patience=args.patience,
+        workers=args.workers,
+        output_path=args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
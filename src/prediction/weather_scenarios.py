@@ -0,0 +1,125 @@
+"""
+気象シナリオアンサンブル予測
+
+千葉県の気象予報（Open-Meteo）に気温・湿度の摂動を加えた複数シナリオを
+シナリオ数 × 予測時間数 × 気象特徴量数 のテンソルとして作成し、
+iterative_inference.predict_scenarios() で全シナリオを同時に段階的予測する。
+結果は時間ごとのパーセンタイル帯（P10/P50/P90・最小・最大）に集約する。
+
+シナリオ定義（JSONファイルでも指定可能）:
+    {"シナリオ名": {"temperature_2m": 気温の加算値[℃], "relative_humidity_2m": 湿度の加算値[%]}, ...}
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# シナリオで摂動させる気象特徴量
+WEATHER_FEATURES = ['temperature_2m', 'relative_humidity_2m', 'precipitation']
+
+# 値の範囲（摂動後にクリップ）
+WEATHER_LIMITS = {
+    'relative_humidity_2m': (0.0, 100.0),
+    'precipitation': (0.0, None),
+}
+
+# 標準シナリオ（baseは予報そのまま）
+DEFAULT_WEATHER_SCENARIOS = {
+    'base': {},
+    'temp_minus_2': {'temperature_2m': -2.0},
+    'temp_minus_1': {'temperature_2m': -1.0},
+    'temp_plus_1': {'temperature_2m': 1.0},
+    'temp_plus_2': {'temperature_2m': 2.0},
+    'heatwave': {'temperature_2m': 4.0, 'relative_humidity_2m': -10.0},
+    'humid': {'relative_humidity_2m': 15.0},
+}
+
+# 出力するパーセンタイル
+BAND_PERCENTILES = (10, 50, 90)
+
+
+def load_weather_scenarios(path=None):
+    """
+    シナリオ定義を取得
+
+    Args:
+        path (str): シナリオ定義JSONファイル（Noneの場合は標準シナリオ）
+
+    Returns:
+        dict: {シナリオ名: {気象特徴量: 加算値}}
+    """
+    if path is None:
+        return dict(DEFAULT_WEATHER_SCENARIOS)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        scenarios = json.load(f)
+
+    unknown = {feature for deltas in scenarios.values() for feature in deltas} - set(WEATHER_FEATURES)
+    if unknown:
+        raise ValueError(f"シナリオで指定できる特徴量は {WEATHER_FEATURES} です: {sorted(unknown)}")
+    return scenarios
+
+
+def build_weather_tensor(future_features, start_date, days, scenarios):
+    """
+    予測期間の気象予報にシナリオごとの摂動を加えたテンソルを作成
+
+    Args:
+        future_features (DataFrame): 予測期間の気象・カレンダー特徴量（datetimeインデックス）
+        start_date (Timestamp): 予測開始日（0時）
+        days (int): 予測日数
+        scenarios (dict): load_weather_scenarios() の戻り値
+
+    Returns:
+        ndarray: シナリオ数 × 予測時間数 × len(WEATHER_FEATURES)（float32）
+    """
+    hours = pd.date_range(start_date, periods=days * 24, freq='h')
+    missing = hours.difference(future_features.index)
+    if len(missing) > 0:
+        raise ValueError(f"予測対象日時 {missing[0]} が future_features に見つかりません")
+
+    forecast = future_features.loc[hours, WEATHER_FEATURES].to_numpy(dtype=np.float32, na_value=np.nan)
+    deltas = np.array(
+        [[deltas.get(feature, 0.0) for feature in WEATHER_FEATURES] for deltas in scenarios.values()],
+        dtype=np.float32
+    )
+
+    # (シナリオ, 1, 特徴量) + (1, 時間, 特徴量)
+    tensor = deltas[:, np.newaxis, :] + forecast[np.newaxis, :, :]
+    for feature, (lower, upper) in WEATHER_LIMITS.items():
+        k = WEATHER_FEATURES.index(feature)
+        tensor[:, :, k] = np.clip(tensor[:, :, k], lower, upper)
+    return tensor
+
+
+def summarize_scenario_bands(values, index, scenario_names):
+    """
+    シナリオ別予測値を時間ごとのパーセンタイル帯に集約
+
+    Args:
+        values (ndarray): シナリオ数 × 予測時間数の予測値
+        index (DatetimeIndex): 予測対象時刻
+        scenario_names (list): シナリオ名（valuesの行順）
+
+    Returns:
+        DataFrame: prediction_date, prediction_hour, scenario_count, base_power_kwh,
+                   p10_power_kwh, p50_power_kwh, p90_power_kwh, min_power_kwh, max_power_kwh
+    """
+    bands = pd.DataFrame({
+        'prediction_date': index.date,
+        'prediction_hour': index.hour,
+        'scenario_count': len(scenario_names),
+    })
+    names = list(scenario_names)
+    bands['base_power_kwh'] = values[names.index('base')] if 'base' in names else np.nan
+
+    percentiles = np.percentile(values, BAND_PERCENTILES, axis=0)
+    for percentile, row in zip(BAND_PERCENTILES, percentiles):
+        bands[f"p{percentile}_power_kwh"] = row
+    bands['min_power_kwh'] = values.min(axis=0)
+    bands['max_power_kwh'] = values.max(axis=0)
+
+    power_columns = [c for c in bands.columns if c.endswith('_power_kwh')]
+    bands[power_columns] = bands[power_columns].round(2)
+    return bands
@@ -2,7 +2,7 @@
 都県別電力×気象データ自動生成スクリプト（調査用・書き捨て）
 
 用途: 気温×祝日×都県別分析のための一時的データ生成
-実行: python src/scripts/prefecture_data_generator.py
+実行: python -m src.scripts.prefecture_data_generator
 
 注意: 探索的データ分析用の使い捨てスクリプトです
 """
@@ -13,6 +13,8 @@ from google.cloud import bigquery
 from pathlib import Path
 from logging import getLogger
 
+from src.utils.bq_reader import read_query_dataframe
+
 # ログ設定
 logger = getLogger(__name__)
 
@@ -79,7 +81,7 @@ class PrefectureDataGenerator:
             
             # クエリ実行
             query = self.create_prefecture_query(prefecture)
-            df = self.client.query(query).to_dataframe()
+            df = read_query_dataframe(self.client, query)
             
             # データ確認
             logger.info(f"{prefecture}: {len(df)} records retrieved")
@@ -0,0 +1,81 @@
+# src/utils/bq_reader.py
+
+"""
+BigQueryクエリ結果の高速読み込みユーティリティ
+
+BigQuery Storage Read APIが利用可能な場合は、クエリ結果を複数ストリームから
+Arrowレコードバッチとして並列に読み込む。利用できない場合（パッケージ未インストール・
+権限不足など）は通常のREST API（ページ単位の行イテレータ）に自動でフォールバックする。
+
+使用例:
+    from src.utils.bq_reader import read_query_dataframe
+    df = read_query_dataframe(client, "SELECT ...")
+"""
+
+from logging import getLogger
+
+logger = getLogger('energy_env.bq_reader')
+
+# Storage Read APIクライアント（プロセス内で使い回す・Falseは利用不可を表す）
+_bqstorage_client = None
+
+
+def get_bqstorage_client():
+    """
+    BigQuery Storage Read APIクライアントを取得
+
+    google-cloud-bigquery-storageが未インストール、または認証に失敗した場合はNoneを返す。
+
+    Returns:
+        BigQueryReadClient | None: Storage Read APIクライアント
+    """
+    global _bqstorage_client
+
+    if _bqstorage_client is None:
+        try:
+            from google.cloud import bigquery_storage
+            _bqstorage_client = bigquery_storage.BigQueryReadClient()
+        except Exception as e:
+            logger.info(f"BigQuery Storage Read API利用不可（REST APIで読み込みます）: {e}")
+            _bqstorage_client = False
+
+    return _bqstorage_client or None
+
+
+def read_job_dataframe(job, use_storage_api=True):
+    """
+    クエリジョブの結果をDataFrameとして読み込み
+
+    Args:
+        job (QueryJob): 実行済み（または実行中）のクエリジョブ
+        use_storage_api (bool): Storage Read APIを使うか
+
+    Returns:
+        DataFrame: クエリ結果
+    """
+    bqstorage_client = get_bqstorage_client() if use_storage_api else None
+
+    if bqstorage_client is not None:
+        try:
+            return job.to_dataframe(bqstorage_client=bqstorage_client)
+        except Exception as e:
+            logger.warning(f"Storage Read APIでの読み込み失敗（REST APIで再読み込みします）: {e}")
+
+    return job.to_dataframe(create_bqstorage_client=False)
+
+
+def read_query_dataframe(client, query, job_config=None, use_storage_api=True):
+    """
+    クエリを実行して結果をDataFrameとして読み込み
+
+    Args:
+        client: BigQueryクライアント
+        query (str): SQLクエリ
+        job_config (QueryJobConfig): クエリ設定
+        use_storage_api (bool): Storage Read APIを使うか
+
+    Returns:
+        DataFrame: クエリ結果
+    """
+    job = client.query(query, job_config=job_config)
+    return read_job_dataframe(job, use_storage_api)
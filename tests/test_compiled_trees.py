@@ -0,0 +1,127 @@
+"""
+CompiledTreeEnsemble（NumPy推論バックエンド）手動テストスクリプト（BigQuery不要）
+
+小さなXGBoostモデルをNumPy配列に変換し、欠損値を含む特徴量でBooster.predictと予測値が
+一致すること・early stopping済みモデルの木の本数・非対応モデルの検出を確認する。
+
+実行方法:
+    python -m tests.test_compiled_trees
+
+    または
+    python tests/test_compiled_trees.py
+"""
+
+import numpy as np
+import xgboost as xgb
+
+from src.prediction.compiled_trees import CompiledTreeEnsemble, make_predictor
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+def make_data(rows=2000, n_features=6, missing_rate=0.1, seed=0):
+    """欠損値を含む回帰データ"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, n_features)).astype(np.float32)
+    y = 3000 + 200 * X[:, 0] - 100 * X[:, 1] * X[:, 2] + rng.normal(0, 10, rows)
+    X[rng.random(X.shape) < missing_rate] = np.nan
+    return X, y
+
+
+def test_matches_booster_predict():
+    """変換後の予測値がBooster.predictと一致（欠損値の分岐方向を含む）"""
+    print_test_header("Booster.predict 一致テスト")
+
+    X, y = make_data()
+    model = xgb.XGBRegressor(n_estimators=50, max_depth=6, learning_rate=0.1, random_state=42)
+    model.fit(X, y)
+    expected = model.get_booster().predict(xgb.DMatrix(X))
+
+    ensemble = CompiledTreeEnsemble.from_model(model)
+    for rows in (1, 24, len(X)):
+        predicted = ensemble.predict(X[:rows])
+        max_diff = float(np.max(np.abs(predicted - expected[:rows])))
+        check(np.allclose(predicted, expected[:rows], rtol=1e-5), f"{rows}行: 最大差 {max_diff:.6f}")
+
+    # 全特徴量が欠損の行も既定の分岐方向で辿る
+    all_missing = np.full((3, X.shape[1]), np.nan, dtype=np.float32)
+    check(np.allclose(ensemble.predict(all_missing), model.get_booster().predict(xgb.DMatrix(all_missing)),
+                      rtol=1e-5), "全特徴量欠損の行も一致")
+
+    # make_predictor の両バックエンドが同じ予測値
+    numpy_backend = make_predictor(model, 'numpy')(X[:24])
+    xgboost_backend = make_predictor(model, 'xgboost')(X[:24])
+    check(np.allclose(numpy_backend, xgboost_backend, rtol=1e-5), "numpy / xgboost バックエンドが一致")
+
+
+def test_early_stopped_model():
+    """early stopping済みモデルは最良イテレーションまでの木で予測"""
+    print_test_header("early stopping済みモデルテスト")
+
+    X, y = make_data(seed=1)
+    X_valid, y_valid = make_data(rows=500, seed=2)
+    model = xgb.XGBRegressor(n_estimators=300, max_depth=4, learning_rate=0.3, random_state=42,
+                             early_stopping_rounds=5)
+    model.fit(X, y, eval_set=[(X_valid, y_valid)], verbose=False)
+
+    ensemble = CompiledTreeEnsemble.from_model(model)
+    check(len(ensemble.roots) == model.best_iteration + 1,
+          f"木の本数: {len(ensemble.roots)} (best_iteration + 1 = {model.best_iteration + 1})")
+    check(np.allclose(ensemble.predict(X_valid), model.predict(X_valid), rtol=1e-5), "XGBRegressor.predictと一致")
+
+
+def test_rejects_unsupported_models():
+    """非対応モデル・特徴量数の不一致を検出"""
+    print_test_header("非対応モデル検出テスト")
+
+    X, y = make_data(rows=200)
+    cases = {
+        'gblinear': xgb.XGBRegressor(n_estimators=5, booster='gblinear'),
+        'reg:gamma（対数リンク）': xgb.XGBRegressor(n_estimators=5, objective='reg:gamma'),
+    }
+    for name, model in cases.items():
+        model.fit(X, y)
+        try:
+            CompiledTreeEnsemble.from_model(model)
+            check(False, f"{name} がエラーにならない")
+        except ValueError as e:
+            print_result(True, f"{name} を検出: {e}")
+
+    model = xgb.XGBRegressor(n_estimators=5).fit(X, y)
+    try:
+        CompiledTreeEnsemble.from_model(model).predict(X[:, :-1])
+        check(False, "特徴量数の不一致がエラーにならない")
+    except ValueError as e:
+        print_result(True, f"特徴量数の不一致を検出: {e}")
+
+    try:
+        make_predictor(model, 'onnx')
+        check(False, "未知のバックエンドがエラーにならない")
+    except ValueError:
+        print_result(True, "未知のバックエンドを検出")
+
+
+if __name__ == "__main__":
+    print("CompiledTreeEnsemble 手動テストスクリプト開始")
+
+    test_matches_booster_predict()
+    test_early_stopped_model()
+    test_rejects_unsupported_models()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)
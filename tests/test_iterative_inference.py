@@ -0,0 +1,146 @@
+"""
+段階的予測 推論モード 手動テストスクリプト（BigQuery不要）
+
+合成データで学習した小さなモデルを使い、batchモードとhourlyモードの予測が一致することと、
+LagResolverのラグ特徴量が時刻ベースの素朴な参照と一致することを確認する。
+
+実行方法:
+    python -m tests.test_iterative_inference
+
+    または
+    python tests/test_iterative_inference.py
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from scripts.benchmark_batch_inference import make_synthetic_inputs
+from src.prediction.iterative_inference import FEATURES, build_lag_resolver, predict_batched, predict_hourly
+from src.prediction.lag_resolver import BUSINESS_DAY_LOOKBACK
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+def make_inputs(forecast_days=14):
+    """合成データと小さな学習済みモデル"""
+    ml_features_train, future_features, business_days_train, business_days_future, start_date = \
+        make_synthetic_inputs(train_days=60, forecast_days=forecast_days)
+    train = ml_features_train.dropna(subset=FEATURES)
+    model = xgb.XGBRegressor(n_estimators=30, max_depth=4, random_state=42)
+    model.fit(train[FEATURES], train['actual_power'])
+    return model, (start_date, forecast_days, future_features, ml_features_train,
+                   business_days_train, business_days_future)
+
+
+def test_batch_matches_hourly():
+    """batchモード（1日24時間一括）とhourlyモード（1時間ずつ）の予測一致"""
+    print_test_header("batch / hourly 予測一致テスト")
+
+    model, inputs = make_inputs()
+    with contextlib.redirect_stdout(io.StringIO()):
+        hourly = predict_hourly(model, *inputs)
+        batched = predict_batched(model, *inputs)
+
+    check(list(hourly) == list(batched) and len(hourly) == 14 * 24, f"予測対象時刻が一致: {len(batched)}時間")
+    hourly_values = np.array(list(hourly.values()))
+    batched_values = np.array(list(batched.values()))
+    max_diff = float(np.max(np.abs(hourly_values - batched_values)))
+    # hourlyはfloat64のDataFrame・batchはfloat32行列のため、float32の丸め誤差まで許容
+    check(np.allclose(hourly_values, batched_values, rtol=1e-5), f"予測値が一致: 最大差 {max_diff:.6f}")
+    check(not np.isnan(batched_values).any(), "予測値にNaNがない（ラグが14日先まで伝播）")
+
+
+def reference_lags(target, series, business_hours, business_days_future, start_date):
+    """時刻で直接引く素朴なラグ参照（LagResolverの期待値）"""
+    def value(at):
+        return series.get(at, np.nan)
+
+    business = np.nan
+    for days_back in range(1, BUSINESS_DAY_LOOKBACK + 1):
+        candidate = target - pd.Timedelta(days=days_back)
+        is_business = (candidate in business_hours) if candidate < start_date \
+            else candidate.date() in business_days_future
+        if is_business:
+            business = value(candidate)
+            break
+    return {
+        'lag_1_day': value(target - pd.Timedelta(days=1)),
+        'lag_7_day': value(target - pd.Timedelta(days=7)),
+        'lag_1_business_day': business,
+    }
+
+
+def test_lag_resolver_matches_reference():
+    """LagResolver: 実績値＋予測値バッファの位置参照が時刻ベースの参照と一致"""
+    print_test_header("LagResolver 参照一致テスト")
+
+    _, (start_date, days, future_features, ml_features_train, business_days_train, business_days_future) = \
+        make_inputs()
+    resolver = build_lag_resolver(start_date, days, ml_features_train, business_days_train, business_days_future)
+
+    # 予測期間に既知の値（予測値の代わり）を書き込む
+    forecast_index = pd.date_range(start_date, periods=days * 24, freq='h')
+    predicted = pd.Series(np.arange(len(forecast_index), dtype=float) + 10000, index=forecast_index)
+    resolver.set_prediction(resolver.positions(forecast_index), predicted.to_numpy())
+    series = pd.concat([ml_features_train['actual_power'], predicted])
+
+    positions = resolver.positions(forecast_index)
+    lags = resolver.lags(positions)
+    mismatches = 0
+    for i, target in enumerate(forecast_index):
+        expected = reference_lags(target, series, business_days_train.index, business_days_future, start_date)
+        for feature, value in expected.items():
+            if not np.isclose(lags[feature][i], value, equal_nan=True):
+                mismatches += 1
+    check(mismatches == 0, f"{len(forecast_index)}時間 × 3ラグ特徴量が一致 (不一致: {mismatches})")
+
+    # 単一位置の参照も配列参照と同じ
+    single = resolver.lags(resolver.position(forecast_index[30]))
+    check(all(np.isclose(single[f], lags[f][30], equal_nan=True) for f in single), "単一位置と配列参照が一致")
+
+    # 予測期間外はエラー
+    try:
+        resolver.position(start_date - pd.Timedelta(hours=1))
+        check(False, "予測期間外がエラーにならない")
+    except ValueError:
+        print_result(True, "予測期間外の時刻を検出")
+
+    # シナリオ指定時（シナリオ数×時間の2次元バッファ）も予測期間の最終時刻まで参照できる
+    scenario_resolver = build_lag_resolver(start_date, days, ml_features_train, business_days_train,
+                                           business_days_future, scenarios=3)
+    last = scenario_resolver.position(forecast_index[-1])
+    check(last == positions[-1], f"シナリオ指定時の最終時刻の位置: {last}")
+    try:
+        scenario_resolver.position(forecast_index[-1] + pd.Timedelta(hours=1))
+        check(False, "シナリオ指定時に予測期間後がエラーにならない")
+    except ValueError:
+        print_result(True, "シナリオ指定時も予測期間後の時刻を検出")
+
+
+if __name__ == "__main__":
+    print("段階的予測 推論モード 手動テストスクリプト開始")
+
+    test_batch_matches_hourly()
+    test_lag_resolver_matches_reference()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)
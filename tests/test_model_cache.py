@@ -0,0 +1,200 @@
+"""
+ModelCache 手動テストスクリプト（BigQuery不要）
+
+学習データの指紋・保存/読み込み・古いモデルの削除・差分学習の起点探索を、
+一時ディレクトリのキャッシュで確認する。
+
+実行方法:
+    python -m tests.test_model_cache
+
+    または
+    python tests/test_model_cache.py
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.prediction.model_cache import ModelCache, compute_training_fingerprint
+
+MODEL_PARAMS = {'n_estimators': 5, 'max_depth': 3}
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+def make_training_data(days=10, end='2025-06-30 23:00'):
+    """小さな学習データ（datetimeインデックス）"""
+    index = pd.date_range(end=end, periods=days * 24, freq='h')
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'hour': index.hour, 'temperature_2m': rng.normal(20, 5, len(index))}, index=index)
+    y = pd.Series(3000 + 50 * X['hour'] + rng.normal(0, 10, len(index)), index=index)
+    return X, y
+
+def train(X, y):
+    """小さなモデルを学習"""
+    model = xgb.XGBRegressor(**MODEL_PARAMS)
+    model.fit(X, y)
+    return model
+
+def touch_later(paths, seconds):
+    """更新時刻を進める（保存順をmtimeで区別するため）"""
+    modified = time.time() + seconds
+    for path in paths:
+        os.utime(path, (modified, modified))
+
+
+def test_fingerprint():
+    """指紋: 同じデータは同じキー・値/パラメータ/期間が変わればキーが変わる"""
+    print_test_header("学習データ指紋テスト")
+
+    X, y = make_training_data()
+    base = compute_training_fingerprint(X, y, MODEL_PARAMS)
+    check(base == compute_training_fingerprint(X.copy(), y.copy(), dict(MODEL_PARAMS)), "同じデータ・設定は同じ指紋")
+    check(len(base['key']) == 16 and base['row_count'] == len(X), f"キー: {base['key']}, 行数: {base['row_count']}")
+
+    y_changed = y.copy()
+    y_changed.iloc[5] += 1
+    changed = compute_training_fingerprint(X, y_changed, MODEL_PARAMS)
+    check(changed['content_hash'] != base['content_hash'] and changed['key'] != base['key'], "実績値の変更でキーが変わる")
+
+    params_changed = compute_training_fingerprint(X, y, {**MODEL_PARAMS, 'max_depth': 4})
+    check(params_changed['key'] != base['key'] and params_changed['content_hash'] == base['content_hash'],
+          "パラメータの変更はキーのみ変わる")
+
+    X_more, y_more = make_training_data(days=11, end='2025-07-01 23:00')
+    later = compute_training_fingerprint(X_more, y_more, MODEL_PARAMS)
+    check(later['max_datetime'] > base['max_datetime'] and later['key'] != base['key'], "学習期間の延長でキーが変わる")
+
+
+def test_save_load_and_prune():
+    """保存・読み込み・上限超過分の削除（キャッシュ以外のファイルは対象外）"""
+    print_test_header("保存・読み込み・削除テスト")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ModelCache(cache_dir, max_entries=3)
+
+        # 同じディレクトリにあるキャッシュ以外のファイル
+        foreign = [Path(cache_dir) / 'xgb_params.json', Path(cache_dir) / 'xgb_out_of_core_20250630.json']
+        for path in foreign:
+            path.write_text(json.dumps({'params': MODEL_PARAMS}), encoding='utf-8')
+        touch_later(foreign, -100)
+
+        X, y = make_training_data()
+        fingerprint = compute_training_fingerprint(X, y, MODEL_PARAMS)
+        check(cache.load(fingerprint) is None, "保存前はキャッシュミス")
+
+        model = train(X, y)
+        cache.save(model, fingerprint)
+        loaded = cache.load(fingerprint)
+        check(loaded is not None and np.allclose(loaded.predict(X), model.predict(X)), "保存したモデルを読み込み・予測一致")
+
+        # キーが同じでも内容ハッシュが違えばミス
+        check(cache.load({**fingerprint, 'content_hash': 'x' * 64}) is None, "内容ハッシュ不一致はキャッシュミス")
+
+        # 上限（3件）を超えたら古いものから削除
+        for i in range(1, 6):
+            Xi, yi = make_training_data(days=10 + i, end=str(pd.Timestamp('2025-06-30 23:00') + pd.Timedelta(days=i)))
+            touch_later(cache.meta_files(), -10 * (6 - i))
+            cache.save(train(Xi, yi), compute_training_fingerprint(Xi, yi, MODEL_PARAMS))
+
+        check(len(cache.meta_files()) == 3 and len(list(Path(cache_dir).glob('xgb_*.ubj'))) == 3,
+              f"保持数は上限の3件: {len(cache.meta_files())}件")
+        check(cache.load(fingerprint) is None, "最も古いモデルは削除済み")
+        check(all(path.exists() for path in foreign), "xgb_params.json等のキャッシュ以外のファイルは削除しない")
+
+
+def test_prune_per_horizon_bucket():
+    """上限は再帰予測のモデルと直接予測の区間ごとに別々（区間モデルで再帰予測のモデルを押し出さない）"""
+    print_test_header("区間ごとの削除テスト")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ModelCache(cache_dir, max_entries=2)
+        buckets = ['d0-0', 'd1-1', 'd2-3', 'd4-6', 'd7-13']
+
+        recursive = []
+        for i in range(2):
+            Xi, yi = make_training_data(days=10 + i, end=str(pd.Timestamp('2025-06-30 23:00') + pd.Timedelta(days=i)))
+            recursive.append(compute_training_fingerprint(Xi, yi, MODEL_PARAMS))
+            cache.save(train(Xi, yi), recursive[-1])
+            touch_later(cache.meta_files()[:1], -100 + 10 * i)
+
+        # 直接予測3回分（区間モデル 5個 × 3回）
+        direct_keys = []
+        for run in range(3):
+            Xi, yi = make_training_data(days=20 + run)
+            fingerprint = compute_training_fingerprint(Xi, yi, MODEL_PARAMS)
+            for bucket in buckets:
+                cache.save(train(Xi, yi), {**fingerprint, 'key': f"{fingerprint['key']}_{bucket}"})
+            touch_later(cache.meta_files()[:len(buckets)], -50 + 10 * run)
+            direct_keys.append(fingerprint['key'])
+
+        check(all(cache.load(fingerprint) is not None for fingerprint in recursive),
+              "区間モデルの保存後も再帰予測のモデル2件を保持")
+        check(len(cache.meta_files(include_horizon_models=False)) == 2, "再帰予測のモデルは2件")
+        stems = {path.stem for path in cache.meta_files()}
+        check(all(f"xgb_{key}_{bucket}" in stems for key in direct_keys[1:] for bucket in buckets),
+              "各区間は直近2回分を保持")
+        check(not any(stem.startswith(f"xgb_{direct_keys[0]}") for stem in stems), "最も古い直接予測の区間モデルは削除済み")
+        check(len(stems) == 2 + 2 * len(buckets), f"保持数: {len(stems)}件")
+
+
+def test_load_previous():
+    """差分学習の起点: 同じ設定・より前の学習データの最新モデル（キャッシュ以外・区間モデルは対象外）"""
+    print_test_header("差分学習の起点探索テスト")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ModelCache(cache_dir)
+        (Path(cache_dir) / 'xgb_params.json').write_text(json.dumps({'params': MODEL_PARAMS}), encoding='utf-8')
+
+        X_old, y_old = make_training_data(days=10, end='2025-06-28 23:00')
+        X_prev, y_prev = make_training_data(days=10, end='2025-06-29 23:00')
+        X_now, y_now = make_training_data(days=10, end='2025-06-30 23:00')
+        old = compute_training_fingerprint(X_old, y_old, MODEL_PARAMS)
+        prev = compute_training_fingerprint(X_prev, y_prev, MODEL_PARAMS)
+        now = compute_training_fingerprint(X_now, y_now, MODEL_PARAMS)
+
+        cache.save(train(X_old, y_old), old)
+        cache.save(train(X_prev, y_prev), prev)
+        # 直接予測の区間モデル（同じ指紋・キー末尾に区間）は起点にしない
+        cache.save(train(X_prev, y_prev), {**prev, 'key': f"{prev['key']}_d0-0", 'max_datetime': '2025-06-30 00:00:00'})
+        # パラメータ違いは対象外
+        other = compute_training_fingerprint(X_prev, y_prev, {**MODEL_PARAMS, 'max_depth': 4})
+        cache.save(train(X_prev, y_prev), other)
+
+        model, previous = cache.load_previous(now)
+        check(model is not None and previous['key'] == prev['key'],
+              f"直前の学習データのモデルを選択: {previous and previous['key']}")
+        check(cache.load_previous(old) == (None, None), "より前のモデルがなければNone")
+
+
+if __name__ == "__main__":
+    print("ModelCache 手動テストスクリプト開始")
+
+    test_fingerprint()
+    test_save_load_and_prune()
+    test_prune_per_horizon_bucket()
+    test_load_previous()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)
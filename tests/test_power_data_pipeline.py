@@ -0,0 +1,376 @@
+"""
+電力データ取得・投入 手動テストスクリプト（ネットワーク・BigQuery不要）
+
+ローカルのhttp.serverにでんき予報形式の月別ZIPを置き、BigQueryクライアントは呼び出しを記録する
+偽クライアントに差し替えて、ダウンローダー・投入処理の動作を確認する。
+
+実行方法:
+    python -m tests.test_power_data_pipeline
+
+    または
+    python tests/test_power_data_pipeline.py
+"""
+
+import calendar
+import functools
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from src.utils.logging_config import setup_logging
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+
+class FakeJob:
+    """BigQueryジョブの代わり（結果は空）"""
+    num_dml_affected_rows = 0
+    output_rows = 0
+
+    def result(self):
+        return []
+
+
+class FakeBigQueryClient:
+    """BigQueryクライアントの代わり（インサート・クエリ・ロードジョブを記録するだけ）"""
+
+    def __init__(self, *args, **kwargs):
+        self.inserted = []
+        self.queries = []
+        self.loaded = []
+
+    def insert_rows_json(self, table, rows):
+        self.inserted.append((table, rows))
+        return []
+
+    def query(self, sql):
+        self.queries.append(sql)
+        return FakeJob()
+
+    def get_table(self, table):
+        return mock.Mock(schema=[])
+
+    def load_table_from_json(self, rows, table, job_config=None):
+        self.loaded.append((table, list(rows)))
+        return FakeJob()
+
+    def log_rows(self, process_type):
+        """process_execution_logに記録された行（additional_infoは辞書に変換）"""
+        return [
+            {**row, 'additional_info': json.loads(row['additional_info'])}
+            for table, rows in self.inserted if table.endswith('process_execution_log')
+            for row in rows if row['process_type'] == process_type
+        ]
+
+
+def power_csv(year, month, day, completed_hours=24):
+    """でんき予報形式の1日分のCSV（completed_hours以降の時間帯は実績0＝未確定）"""
+    lines = [
+        'ピーク時供給力(万kW),時台,供給力情報更新日,供給力情報更新時刻',
+        '5000,18:00,2025/1/1,8:30',
+        '',
+        'DATE,TIME,当日実績(万kW),予測値(万kW),使用率(%),供給力(万kW)',
+    ]
+    lines += [
+        f"{year}/{month}/{day},{hour}:00,{3000 + day * 10 + hour if hour < completed_hours else 0},3000,80,4500"
+        for hour in range(24)
+    ]
+    lines += ['', 'DATE,TIME,当日実績(５分間隔値)(万kW)', f"{year}/{month}/{day},0:00,2900"]
+    return '\r\n'.join(lines).encode('shift_jis')
+
+def write_month_zip(directory, yyyymm, last_day=None, completed_hours=24, mtime_offset=0):
+    """月別ZIPを作成（last_dayの日だけcompleted_hours時間分の実績）"""
+    year, month = int(yyyymm[:4]), int(yyyymm[4:])
+    last_day = last_day or calendar.monthrange(year, month)[1]
+    zip_path = Path(directory) / f"{yyyymm}_power_usage.zip"
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for day in range(1, last_day + 1):
+            hours = completed_hours if day == last_day else 24
+            zip_ref.writestr(f"{yyyymm}{day:02d}_power_usage.csv", power_csv(year, month, day, hours))
+    # Last-Modifiedは秒単位のため、更新を検出させる場合は時刻をずらす
+    modified = time.time() + mtime_offset
+    os.utime(zip_path, (modified, modified))
+    return zip_path
+
+def start_server(directory):
+    """ZIPを配信するローカルHTTPサーバー（If-Modified-Sinceに304を返す）"""
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), functools.partial(QuietHandler, directory=str(directory))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def make_downloader(env_dir, base_url, **kwargs):
+    """偽BigQueryクライアント・ローカルサーバーを使うダウンローダー"""
+    from src.data_processing.data_downloader import PowerDataDownloader
+
+    with mock.patch('google.cloud.bigquery.Client', FakeBigQueryClient):
+        downloader = PowerDataDownloader(str(Path(env_dir) / 'data' / 'raw'), **kwargs)
+    downloader.BASE_URL = base_url
+    return downloader
+
+def make_loader(env_dir):
+    """偽BigQueryクライアントを使う投入クラス"""
+    from src.data_processing.power_bigquery_loader import PowerBigQueryLoader
+
+    with mock.patch.dict(os.environ, {'ENERGY_ENV_PATH': str(env_dir)}), \
+            mock.patch('google.cloud.bigquery.Client', FakeBigQueryClient):
+        return PowerBigQueryLoader(raw_data_dir=str(Path(env_dir) / 'data' / 'raw'))
+
+def loaded_rows(loader):
+    """energy_data_hourlyにロードジョブで投入された行"""
+    return [row for table, rows in loader.bq_client.loaded if table.endswith('energy_data_hourly') for row in rows]
+
+def csv_names(month_dir):
+    """解凍済みCSVのファイル名（昇順）"""
+    return sorted(path.name for path in Path(month_dir).glob('*_power_usage.csv'))
+
+
+def test_conditional_get_extracts_from_cached_zip():
+    """条件付きGET: 304でも保存済みZIPから対象日を解凍する"""
+    print_test_header("条件付きGET（304）と解凍テスト")
+
+    with tempfile.TemporaryDirectory() as env_dir, tempfile.TemporaryDirectory() as serve_dir:
+        server, base_url = start_server(serve_dir)
+        try:
+            write_month_zip(serve_dir, '202505')
+            downloader = make_downloader(env_dir, base_url)
+            month_dir = downloader.base_dir / '202505'
+            dates = {'20250501', '20250502'}
+
+            check(downloader.download_month_data('202505', dates=dates), "初回取得成功")
+            first = downloader.bq_client.log_rows('TEPCO_API')[-1]['additional_info']
+            check(first['http_status'] == 200 and not first['cache_hit'], f"初回は200: {first['http_status']}")
+            check(csv_names(month_dir) == ['20250501_power_usage.csv', '20250502_power_usage.csv'],
+                  f"対象日のみ解凍: {csv_names(month_dir)}")
+
+            # POWER_BQ_LOADは投入後にCSVを削除する
+            for path in month_dir.glob('*_power_usage.csv'):
+                path.unlink()
+
+            check(downloader.download_month_data('202505', dates=dates), "再取得成功")
+            second = downloader.bq_client.log_rows('TEPCO_API')[-1]['additional_info']
+            check(second['http_status'] == 304 and second['cache_hit'] and second['bytes_transferred'] == 0,
+                  f"更新なしは304・転送0バイト: {second['http_status']}, {second['bytes_transferred']}")
+            check(second['extracted_files'] == 2 and len(csv_names(month_dir)) == 2,
+                  f"304でも保存済みZIPから解凍: {csv_names(month_dir)}")
+
+            # ZIPが更新されたら通常のGET
+            write_month_zip(serve_dir, '202505', mtime_offset=10)
+            downloader.download_month_data('202505', dates=dates)
+            third = downloader.bq_client.log_rows('TEPCO_API')[-1]['additional_info']
+            check(third['http_status'] == 200 and not third['cache_hit'], f"更新後は200: {third['http_status']}")
+
+            # --no-cacheは常に通常のGET
+            no_cache = make_downloader(env_dir, base_url, use_cache=False)
+            no_cache.download_month_data('202505', dates=dates)
+            fourth = no_cache.bq_client.log_rows('TEPCO_API')[-1]['additional_info']
+            check(fourth['http_status'] == 200, f"--no-cacheは200: {fourth['http_status']}")
+        finally:
+            server.shutdown()
+
+
+def test_selective_extraction_and_iter_day_csvs():
+    """選択解凍: 対象日のみ解凍・対象日を増やした再取得（304）・ZIPから直接読む"""
+    print_test_header("選択解凍・iter_day_csvsテスト")
+
+    with tempfile.TemporaryDirectory() as env_dir, tempfile.TemporaryDirectory() as serve_dir:
+        server, base_url = start_server(serve_dir)
+        try:
+            write_month_zip(serve_dir, '202505')
+            downloader = make_downloader(env_dir, base_url)
+            month_dir = downloader.base_dir / '202505'
+
+            # --days 5 相当
+            days_5 = {f"202505{day:02d}" for day in range(25, 31)}
+            downloader.download_month_data('202505', dates=days_5)
+            check(len(csv_names(month_dir)) == 6, f"6日分のみ解凍: {len(csv_names(month_dir))}ファイル")
+
+            # 投入後にCSV削除 → --days 7 相当（ZIPは更新なし）
+            for path in month_dir.glob('*_power_usage.csv'):
+                path.unlink()
+            days_7 = {f"202505{day:02d}" for day in range(23, 31)}
+            downloader.download_month_data('202505', dates=days_7)
+            cache_hit = downloader.bq_client.log_rows('TEPCO_API')[-1]['additional_info']['cache_hit']
+            check(cache_hit and csv_names(month_dir) == sorted(f"{day}_power_usage.csv" for day in days_7),
+                  f"304でも追加分を含む8日分を解凍: {len(csv_names(month_dir))}ファイル")
+
+            # datesなしは全ファイル
+            check(len(downloader.extract_days('202505')) == 31, "datesなしは全31ファイル")
+
+            # 解凍せずにZIPから読む
+            for path in month_dir.glob('*_power_usage.csv'):
+                path.unlink()
+            contents = dict(downloader.iter_day_csvs('202505', dates={'20250510'}))
+            check(list(contents) == ['20250510_power_usage.csv'], f"対象日のみ読む: {list(contents)}")
+            check('DATE,TIME,当日実績(万kW)' in contents['20250510_power_usage.csv'], "shift_jisで復号")
+            check(not csv_names(month_dir), "iter_day_csvsは解凍ファイルを作らない")
+
+            check(not list((month_dir / 'zip').glob('*.part')), "一時ファイル（.part）が残っていない")
+        finally:
+            server.shutdown()
+
+
+def test_backfill_manifest_resume():
+    """バックフィル: 月単位の投入・失敗月の記録・マニフェストからの再開（ロードジョブで投入）"""
+    from src.data_processing.power_backfill import PowerBackfill
+
+    print_test_header("バックフィル 再開テスト")
+
+    with tempfile.TemporaryDirectory() as env_dir, tempfile.TemporaryDirectory() as serve_dir:
+        server, base_url = start_server(serve_dir)
+        try:
+            # 202402のZIPは未公開（404）
+            write_month_zip(serve_dir, '202401')
+            write_month_zip(serve_dir, '202403')
+            downloader = make_downloader(env_dir, base_url, max_workers=2)
+            loader = make_loader(env_dir)
+
+            results = PowerBackfill(downloader, loader).run('202401', '202403')
+            check(results['success'] == ['202401', '202403'] and results['failed'] == ['202402'],
+                  f"投入: {results['success']}, 失敗: {results['failed']}")
+            check(results['rows'] == (31 + 31) * 24 and len(loaded_rows(loader)) == results['rows'],
+                  f"ロードジョブで投入: {len(loaded_rows(loader))}行")
+            check(not [rows for table, rows in loader.bq_client.inserted if table.endswith('energy_data_hourly')],
+                  "ストリーミングインサートは使わない")
+            check(any("date >= '2024-01-01'" in sql and "date <= '2024-01-31'" in sql
+                      for sql in loader.bq_client.queries), "月の期間の既存データを削除")
+            check(not csv_names(downloader.base_dir / '202401'), "CSVは解凍しない（ZIPから直接読む）")
+
+            manifest = json.loads((downloader.base_dir / 'backfill_manifest.json').read_text(encoding='utf-8'))
+            check(sorted(manifest['months']) == ['202401', '202403'] and manifest['months']['202401']['files'] == 31,
+                  f"マニフェストに完了月を記録: {sorted(manifest['months'])}")
+
+            # 202402が公開された後、新しいインスタンスで再実行 → 完了済みの月は飛ばす
+            write_month_zip(serve_dir, '202402')
+            loader = make_loader(env_dir)
+            backfill = PowerBackfill(downloader, loader)
+            results = backfill.run('202401', '202403')
+            check(results['success'] == ['202402'] and results['skipped'] == ['202401', '202403'],
+                  f"再開: 投入 {results['success']}, スキップ {results['skipped']}")
+            check(len(loaded_rows(loader)) == 29 * 24, f"未完了の月のみ投入: {len(loaded_rows(loader))}行")
+
+            # 今月分は完了済みでも毎回投入し直す
+            current_month = datetime.now().strftime('%Y%m')
+            backfill.manifest['months'][current_month] = {'files': 1, 'rows': 24}
+            check(backfill.pending_months(['202401', current_month]) == [current_month], "今月分は常に対象")
+
+            log = loader.bq_client.log_rows('POWER_BQ_LOAD')[-1]
+            check(log['status'] == 'SUCCESS' and log['additional_info']['months_skipped'] == 2,
+                  f"実行ログ: {log['status']}, スキップ {log['additional_info']['months_skipped']}ヶ月")
+        finally:
+            server.shutdown()
+
+
+def test_parse_completed_hours():
+    """当日CSV（更新途中）から実績が確定した時間帯だけを取得"""
+    print_test_header("確定時間帯の解析テスト")
+
+    with tempfile.TemporaryDirectory() as env_dir:
+        loader = make_loader(env_dir)
+
+        rows = loader.parse_completed_hours(power_csv(2025, 5, 20, completed_hours=10).decode('shift_jis'), 'x.csv')
+        check([row['hour'] for row in rows] == list(range(10)), f"実績のある0～9時のみ: {len(rows)}行")
+        check(rows[0]['date'] == '2025-05-20' and rows[0]['actual_power'] == 3000 + 200 and rows[0]['supply_capacity'] == 4500,
+              f"日付・実績・供給力: {rows[0]['date']}, {rows[0]['actual_power']}, {rows[0]['supply_capacity']}")
+
+        full = loader.parse_completed_hours(power_csv(2025, 5, 20).decode('shift_jis'), 'x.csv')
+        check(len(full) == 24, f"確定済みの日は24時間: {len(full)}行")
+        check(loader.parse_completed_hours(power_csv(2025, 5, 20, completed_hours=0).decode('shift_jis'), 'x.csv') == [],
+              "実績なしは空")
+        check(loader.parse_completed_hours('DATE,TIME\r\n', 'x.csv') == [], "ヘッダーなしは空")
+
+
+def test_intraday_state_diff():
+    """随時取得: 新しく確定した時間帯だけ投入・更新なしは投入しない・翌朝の日次取得（304）でもCSVを解凍"""
+    from src.data_processing.power_intraday import PowerIntradayPoller
+
+    print_test_header("随時取得 状態差分テスト")
+
+    now = datetime(2025, 5, 20, 10, 30)
+    with tempfile.TemporaryDirectory() as env_dir, tempfile.TemporaryDirectory() as serve_dir:
+        server, base_url = start_server(serve_dir)
+        try:
+            write_month_zip(serve_dir, '202505', last_day=20, completed_hours=10)
+            downloader = make_downloader(env_dir, base_url)
+            loader = make_loader(env_dir)
+            poller = PowerIntradayPoller(downloader, loader)
+
+            result = poller.poll_once(now)
+            check(result['pushed_rows'] == 10 and len(loaded_rows(loader)) == 10,
+                  f"初回は確定済みの10時間を投入: {result['pushed_rows']}行")
+            check("hour IN (0, 1, 2, 3, 4, 5, 6, 7, 8, 9)" in loader.bq_client.queries[-1], "投入する日時のみ削除")
+
+            # ZIP更新なし（304）→ 投入なし
+            result = poller.poll_once(now)
+            check(result['pushed_rows'] == 0 and result['changed_files'] == 0 and len(loaded_rows(loader)) == 10,
+                  "更新なしは投入しない")
+
+            # 2時間分確定 → 差分のみ
+            write_month_zip(serve_dir, '202505', last_day=20, completed_hours=12, mtime_offset=10)
+            result = poller.poll_once(now)
+            check(result['pushed_hours'] == ['2025-05-20 10:00', '2025-05-20 11:00'],
+                  f"新しく確定した時間帯のみ投入: {result['pushed_hours']}")
+            check(loader.bq_client.log_rows('POWER_BQ_LOAD')[-1]['additional_info']['mode'] == 'intraday',
+                  "随時投入のログ（mode=intraday）")
+
+            # 状態ファイルから再開（新しいインスタンス）
+            state = json.loads((downloader.base_dir / 'intraday_state.json').read_text(encoding='utf-8'))
+            check(len(state['2025-05-20']['hours']) == 12, f"状態ファイル: {len(state['2025-05-20']['hours'])}時間")
+            check(PowerIntradayPoller(downloader, loader).poll_once(now)['pushed_rows'] == 0, "再起動後も重複投入しない")
+
+            # 前日分が24時間そろうまでは前日も対象
+            check(poller.target_dates(datetime(2025, 5, 21, 0, 30)) == [datetime(2025, 5, 20).date(),
+                                                                        datetime(2025, 5, 21).date()],
+                  "前日が未確定なら前日も対象")
+
+            # 随時取得は解凍しない → 翌朝の日次取得は304でも保存済みZIPから対象日を解凍する
+            month_dir = downloader.base_dir / '202505'
+            check(not csv_names(month_dir), "随時取得はCSVを解凍しない")
+            check(downloader.download_month_data('202505', dates={'20250519', '20250520'}), "日次取得成功")
+            cache_hit = downloader.bq_client.log_rows('TEPCO_API')[-1]['additional_info']['cache_hit']
+            check(cache_hit and csv_names(month_dir) == ['20250519_power_usage.csv', '20250520_power_usage.csv'],
+                  f"随時取得の後の日次取得（304）でも解凍: {csv_names(month_dir)}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    print("電力データ取得・投入 手動テストスクリプト開始")
+    setup_logging()
+
+    test_conditional_get_extracts_from_cached_zip()
+    test_selective_extraction_and_iter_day_csvs()
+    test_backfill_manifest_resume()
+    test_parse_completed_hours()
+    test_intraday_state_diff()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)
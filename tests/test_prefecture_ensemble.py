@@ -0,0 +1,126 @@
+"""
+都県別予測（prefecture_ensemble）手動テストスクリプト（BigQuery不要）
+
+ブレンドの重み計算と、メモリマップファイルへの書き出し・学習期間/予測期間の気象データ充足率を確認する。
+
+実行方法:
+    python -m tests.test_prefecture_ensemble
+
+    または
+    python tests/test_prefecture_ensemble.py
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.prediction.prefecture_ensemble import PREFECTURE_WEATHER_FEATURES, blend_weights, write_shared_arrays
+
+FEATURES = ['hour'] + PREFECTURE_WEATHER_FEATURES
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+
+def test_blend_weights():
+    """ブレンドの重み: inverse_mape / mean / best・検証なし・不正な方式"""
+    print_test_header("ブレンド重みテスト")
+
+    holdout_mape = {'chiba': 2.0, 'tokyo': 4.0, 'kanagawa': 4.0}
+
+    weights = blend_weights(holdout_mape, 'inverse_mape')
+    check(np.isclose(sum(weights.values()), 1.0), f"inverse_mapeの重みの合計は1: {weights}")
+    check(np.isclose(weights['chiba'], 0.5) and np.isclose(weights['tokyo'], 0.25),
+          "MAPEの逆数に比例（2%: 0.5, 4%: 0.25）")
+
+    weights = blend_weights(holdout_mape, 'mean')
+    check(all(np.isclose(weight, 1 / 3) for weight in weights.values()), "meanは均等")
+
+    weights = blend_weights(holdout_mape, 'best')
+    check(weights == {'chiba': 1.0, 'tokyo': 0.0, 'kanagawa': 0.0}, f"bestはMAPE最小の都県のみ: {weights}")
+
+    # 検証なし（holdout_days=0）は単純平均
+    weights = blend_weights({'chiba': None, 'tokyo': None}, 'inverse_mape')
+    check(weights == {'chiba': 0.5, 'tokyo': 0.5}, "検証なしは単純平均")
+
+    # MAPE 0% でもゼロ除算しない
+    weights = blend_weights({'chiba': 0.0, 'tokyo': 4.0}, 'inverse_mape')
+    check(weights['chiba'] > 0.99 and np.isclose(sum(weights.values()), 1.0), "MAPE 0%の都県に重みが集中")
+
+    try:
+        blend_weights(holdout_mape, 'median')
+        check(False, "不正なブレンド方式がエラーにならない")
+    except ValueError:
+        print_result(True, "不正なブレンド方式を検出")
+
+
+def test_shared_arrays_and_coverage():
+    """メモリマップファイルの内容と学習期間・予測期間の気象データ充足率"""
+    print_test_header("共有配列・気象データ充足率テスト")
+
+    train_index = pd.date_range('2025-06-01', periods=10 * 24, freq='h')
+    future_index = pd.date_range(train_index[-1] + pd.Timedelta(hours=1), periods=2 * 24, freq='h')
+    rng = np.random.default_rng(0)
+    ml_features_train = pd.DataFrame(rng.normal(size=(len(train_index), len(FEATURES))),
+                                     columns=FEATURES, index=train_index)
+    ml_features_train['actual_power'] = 3000.0
+    future_features = pd.DataFrame(rng.normal(size=(len(future_index), len(FEATURES))),
+                                   columns=FEATURES, index=future_index)
+
+    # chiba: 学習・予報とも揃っている / tokyo: 実績のみ（予報なし） / saitama: 学習期間の半分が欠損
+    def prefecture_weather(prefecture, index):
+        frame = pd.DataFrame(rng.normal(size=(len(index), len(PREFECTURE_WEATHER_FEATURES))),
+                             columns=PREFECTURE_WEATHER_FEATURES, index=index)
+        frame.insert(0, 'prefecture', prefecture)
+        return frame
+
+    weather = pd.concat([
+        prefecture_weather('chiba', train_index.append(future_index)),
+        prefecture_weather('tokyo', train_index),
+        prefecture_weather('saitama', train_index[len(train_index) // 2:].append(future_index)),
+    ])
+    prefectures = ['chiba', 'tokyo', 'saitama']
+
+    with tempfile.TemporaryDirectory() as directory:
+        coverage = write_shared_arrays(Path(directory), ml_features_train, future_features, weather,
+                                       prefectures, FEATURES)
+        check(coverage['chiba'] == {'train': 1.0, 'forecast': 1.0}, f"chiba: {coverage['chiba']}")
+        check(coverage['tokyo'] == {'train': 1.0, 'forecast': 0.0}, f"tokyo（予報なし）: {coverage['tokyo']}")
+        check(coverage['saitama'] == {'train': 0.5, 'forecast': 1.0}, f"saitama（学習期間の半分）: {coverage['saitama']}")
+
+        weather_array = np.load(Path(directory) / 'weather.npy', mmap_mode='r')
+        check(weather_array.shape == (3, len(train_index) + len(future_index), len(PREFECTURE_WEATHER_FEATURES)),
+              f"気象配列: {weather_array.shape}")
+        chiba = weather[weather['prefecture'] == 'chiba'][PREFECTURE_WEATHER_FEATURES].to_numpy(dtype=np.float32)
+        check(np.array_equal(weather_array[0], chiba), "都県の気象データが時刻順に格納")
+
+        train_features = np.load(Path(directory) / 'train_features.npy', mmap_mode='r')
+        check(np.allclose(train_features, ml_features_train[FEATURES].to_numpy(dtype=np.float32)),
+              f"学習用特徴量: {train_features.shape}")
+
+
+if __name__ == "__main__":
+    print("都県別予測 手動テストスクリプト開始")
+
+    test_blend_weights()
+    test_shared_arrays_and_coverage()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)
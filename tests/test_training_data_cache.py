@@ -0,0 +1,133 @@
+"""
+TrainingDataCache 手動テストスクリプト（BigQuery不要）
+
+ml_featuresテーブルの代わりにメモリ上のDataFrameから取得するようにして、
+初回の全件取得・差分取得（直近7日の書き換え＋新規日のマージ）・過去日指定・全件再取得を確認する。
+
+実行方法:
+    python -m tests.test_training_data_cache
+
+    または
+    python tests/test_training_data_cache.py
+"""
+
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.prediction.training_data_cache import ML_FEATURES_COLUMNS, REWRITTEN_TAIL_DAYS, TrainingDataCache
+
+
+def print_test_header(test_name):
+    """テスト項目のヘッダーを表示"""
+    print(f"\n{'='*60}")
+    print(f"[TEST] {test_name}")
+    print('='*60)
+
+def print_result(success, message):
+    """テスト結果を表示"""
+    status = "✓ 成功" if success else "✗ 失敗"
+    print(f"{status}: {message}")
+
+def check(success, message):
+    """結果を表示し、失敗時は以降の確認を中止"""
+    print_result(success, message)
+    assert success, message
+
+
+class FakeMLFeaturesTable:
+    """ml_featuresテーブルの代わり（fetch_ml_featuresの呼び出し範囲を記録）"""
+
+    def __init__(self, date_from, date_to):
+        self.frame = self._rows(date_from, date_to, offset=0.0)
+        self.calls = []
+
+    @staticmethod
+    def _rows(date_from, date_to, offset):
+        index = pd.date_range(date_from, pd.Timestamp(date_to) + pd.Timedelta(hours=23), freq='h')
+        frame = pd.DataFrame({column: 0.0 for column in ML_FEATURES_COLUMNS}, index=range(len(index)))
+        frame['date'] = index.date
+        frame['hour'] = index.hour
+        frame['actual_power'] = 3000 + np.arange(len(index)) % 500 + offset
+        frame['is_weekend'] = index.dayofweek >= 5
+        frame['is_holiday'] = False
+        return frame
+
+    def rewrite(self, date_from, date_to, offset):
+        """指定期間を書き換え・追加（MLFeaturesUpdaterの再投入の代わり）"""
+        new_rows = self._rows(date_from, date_to, offset)
+        kept = self.frame[(self.frame['date'] < date_from) | (self.frame['date'] > date_to)]
+        self.frame = pd.concat([kept, new_rows], ignore_index=True).sort_values(['date', 'hour'])
+
+    def fetch(self, client, date_to, date_from=None):
+        self.calls.append((date_from, date_to))
+        selected = self.frame[(self.frame['date'] <= date_to) &
+                              ((self.frame['date'] >= date_from) if date_from else True)]
+        return selected.reset_index(drop=True), len(selected) * 100
+
+    def expected(self, until_date):
+        """until_dateまでの期待値（date, hour, actual_power）"""
+        return self.frame[self.frame['date'] <= until_date][['date', 'hour', 'actual_power']].reset_index(drop=True)
+
+
+def same_rows(train, expected):
+    """学習データが期待値と一致するか"""
+    actual = train[['date', 'hour', 'actual_power']].reset_index(drop=True)
+    return len(actual) == len(expected) and actual.equals(expected)
+
+
+def test_incremental_merge():
+    """全件取得 → 差分取得（直近の書き換え・新規日・月またぎ） → 過去日 → 全件再取得"""
+    print_test_header("学習データキャッシュ マージテスト")
+
+    table = FakeMLFeaturesTable(date(2025, 5, 1), date(2025, 6, 28))
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            mock.patch('src.prediction.training_data_cache.fetch_ml_features', table.fetch):
+        cache = TrainingDataCache(cache_dir)
+
+        # 初回: 全期間取得
+        train, stats = cache.load(None, date(2025, 6, 28))
+        check(stats['mode'] == 'FULL' and table.calls[-1] == (None, date(2025, 6, 28)), f"初回は全件取得: {stats['mode']}")
+        check(same_rows(train, table.expected(date(2025, 6, 28))), f"全件取得の内容一致: {len(train)}行")
+        check([p.stem for p in cache.partition_paths()] == ['202505', '202506'], "月単位パーティション")
+
+        # 直近3日の書き換え＋月をまたいで3日追加
+        table.rewrite(date(2025, 6, 26), date(2025, 7, 1), offset=1000.0)
+        train, stats = cache.load(None, date(2025, 7, 1))
+        refetch_from = date(2025, 6, 28) - timedelta(days=REWRITTEN_TAIL_DAYS - 1)
+        check(stats['mode'] == 'INCREMENTAL' and table.calls[-1] == (refetch_from, date(2025, 7, 1)),
+              f"差分取得範囲: {table.calls[-1][0]} ～ {table.calls[-1][1]}")
+        check(stats['fetched_rows'] == (date(2025, 7, 1) - refetch_from).days * 24 + 24,
+              f"取得は直近7日＋新規日のみ: {stats['fetched_rows']}行")
+        check(same_rows(train, table.expected(date(2025, 7, 1))), "書き換え・新規日をマージした内容が一致")
+        check(not train.duplicated(['date', 'hour']).any(), "重複行なし")
+        check(stats['watermark'] == '2025-07-01' and [p.stem for p in cache.partition_paths()][-1] == '202507',
+              f"ウォーターマーク更新・新しい月のパーティション: {stats['watermark']}")
+
+        # 再投入範囲より前の過去日はBigQueryを参照しない
+        calls = len(table.calls)
+        train, stats = cache.load(None, date(2025, 6, 10))
+        check(stats['mode'] == 'CACHED' and len(table.calls) == calls, "過去日はキャッシュのみ")
+        check(same_rows(train, table.expected(date(2025, 6, 10))), f"過去日の内容一致: {len(train)}行")
+
+        # 新しいインスタンス（マニフェストから再開）でも同じ結果
+        train, stats = TrainingDataCache(cache_dir).load(None, date(2025, 7, 1))
+        check(stats['mode'] == 'INCREMENTAL' and same_rows(train, table.expected(date(2025, 7, 1))),
+              "マニフェストから差分取得を再開")
+
+        # 全件再取得
+        train, stats = cache.load(None, date(2025, 7, 1), force_refresh=True)
+        check(stats['mode'] == 'FULL' and same_rows(train, table.expected(date(2025, 7, 1))), "force_refreshは全件取得")
+
+
+if __name__ == "__main__":
+    print("TrainingDataCache 手動テストスクリプト開始")
+
+    test_incremental_merge()
+
+    print(f"\n{'='*60}")
+    print("全テスト完了")
+    print('='*60)